@@ -15,8 +15,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import os
 import socket
+import time
 import uuid
 
 import eventlet
@@ -45,22 +47,39 @@ class DhcpAgent(object):
     OPTS = [
         cfg.IntOpt('resync_interval', default=30,
                    help=_("Interval to resync.")),
+        cfg.FloatOpt('reload_allocations_delay', default=0.5,
+                     help=_("Seconds to wait after a port event before "
+                            "reloading the DHCP allocations of its network, "
+                            "so that bursts of events cause a single "
+                            "reload.")),
+        cfg.FloatOpt('lease_update_delay', default=1.0,
+                     help=_("Seconds during which the lease updates of a "
+                            "network are buffered before being sent to "
+                            "Quantum in a single call.")),
         cfg.StrOpt('dhcp_driver',
                    default='quantum.agent.linux.dhcp.Dnsmasq',
                    help=_("The driver used to manage the DHCP server.")),
         cfg.BoolOpt('use_namespaces', default=True,
-                    help=_("Allow overlapping IP."))
+                    help=_("Allow overlapping IP.")),
+        cfg.IntOpt('num_sync_threads', default=4,
+                   help=_("Number of threads to use during sync process.")),
+        cfg.IntOpt('network_info_page_size', default=100,
+                   help=_("Number of networks retrieved from Quantum per "
+                          "call during sync process.")),
     ]
 
     def __init__(self, conf):
         self.needs_resync = False
         self.conf = conf
         self.cache = NetworkCache()
+        self.pending_reloads = set()
+        self.pending_leases = {}
         self.root_helper = config.get_root_helper(conf)
 
         self.dhcp_driver_cls = importutils.import_class(conf.dhcp_driver)
         ctx = context.get_admin_context_without_session()
-        self.plugin_rpc = DhcpPluginApi(topics.PLUGIN, ctx)
+        self.plugin_rpc = DhcpPluginApi(topics.PLUGIN, ctx,
+                                        conf.network_info_page_size)
 
         self.device_manager = DeviceManager(self.conf, self.plugin_rpc)
         self.notifications = agent_rpc.NotificationDispatcher()
@@ -95,9 +114,30 @@ class DhcpAgent(object):
             LOG.exception(_('Unable to %s dhcp.'), action)
 
     def update_lease(self, network_id, ip_address, time_remaining):
+        """Buffer a lease update to send it with the network's other updates.
+
+        Only the most recent event of an IP address is kept: a release
+        reported by dnsmasq with no time remaining must win over an
+        earlier, longer lease of the same address.
+        """
+        expiration = time.time() + time_remaining
+        leases = self.pending_leases.get(network_id)
+        if leases is None:
+            self.pending_leases[network_id] = {ip_address: expiration}
+            eventlet.spawn_after(self.conf.lease_update_delay,
+                                 self._send_lease_updates, network_id)
+        else:
+            leases[ip_address] = expiration
+
+    def _send_lease_updates(self, network_id):
+        leases = self.pending_leases.pop(network_id, {})
+        now = time.time()
+        lease_remaining = dict(
+            (ip_address, max(int(round(expiration - now)), 0))
+            for ip_address, expiration in leases.iteritems())
         try:
-            self.plugin_rpc.update_lease_expiration(network_id, ip_address,
-                                                    time_remaining)
+            self.plugin_rpc.update_leases_expiration(network_id,
+                                                     lease_remaining)
         except:
             self.needs_resync = True
             LOG.exception(_('Unable to update lease'))
@@ -108,12 +148,23 @@ class DhcpAgent(object):
         known_networks = set(self.cache.get_network_ids())
 
         try:
-            active_networks = set(self.plugin_rpc.get_active_networks())
-            for deleted_id in known_networks - active_networks:
+            try:
+                active_networks = dict(
+                    (network.id, network) for network in
+                    self.plugin_rpc.get_active_networks_info())
+            except AttributeError:
+                LOG.debug(_('Plugin does not provide active networks info, '
+                            'retrieving networks one by one.'))
+                active_networks = dict.fromkeys(
+                    self.plugin_rpc.get_active_networks())
+
+            for deleted_id in known_networks - set(active_networks):
                 self.disable_dhcp_helper(deleted_id)
 
-            for network_id in active_networks:
-                self.refresh_dhcp_helper(network_id)
+            pool = eventlet.GreenPool(self.conf.num_sync_threads)
+            for network_id, network in active_networks.iteritems():
+                pool.spawn_n(self.refresh_dhcp_helper, network_id, network)
+            pool.waitall()
         except:
             self.needs_resync = True
             LOG.exception(_('Unable to sync network state.'))
@@ -130,14 +181,20 @@ class DhcpAgent(object):
         """Spawn a thread to periodically resync the dhcp state."""
         eventlet.spawn(self._periodic_resync_helper)
 
-    def enable_dhcp_helper(self, network_id):
-        """Enable DHCP for a network that meets enabling criteria."""
-        try:
-            network = self.plugin_rpc.get_network_info(network_id)
-        except:
-            self.needs_resync = True
-            LOG.exception(_('Network %s RPC info call failed.'), network_id)
-            return
+    def enable_dhcp_helper(self, network_id, network=None):
+        """Enable DHCP for a network that meets enabling criteria.
+
+        network is the current state of the network, retrieved from the
+        plugin when not given.
+        """
+        if network is None:
+            try:
+                network = self.plugin_rpc.get_network_info(network_id)
+            except:
+                self.needs_resync = True
+                LOG.exception(_('Network %s RPC info call failed.'),
+                              network_id)
+                return
 
         if not network.admin_state_up:
             return
@@ -155,22 +212,26 @@ class DhcpAgent(object):
             if self.call_driver('disable', network):
                 self.cache.remove(network)
 
-    def refresh_dhcp_helper(self, network_id):
+    def refresh_dhcp_helper(self, network_id, network=None):
         """Refresh or disable DHCP for a network depending on the current state
         of the network.
 
+        network is the current state of the network, retrieved from the
+        plugin when not given.
         """
         old_network = self.cache.get_network_by_id(network_id)
         if not old_network:
             # DHCP current not running for network.
-            return self.enable_dhcp_helper(network_id)
+            return self.enable_dhcp_helper(network_id, network)
 
-        try:
-            network = self.plugin_rpc.get_network_info(network_id)
-        except:
-            self.needs_resync = True
-            LOG.exception(_('Network %s RPC info call failed.'), network_id)
-            return
+        if network is None:
+            try:
+                network = self.plugin_rpc.get_network_info(network_id)
+            except:
+                self.needs_resync = True
+                LOG.exception(_('Network %s RPC info call failed.'),
+                              network_id)
+                return
 
         old_cidrs = set(s.cidr for s in old_network.subnets if s.enable_dhcp)
         new_cidrs = set(s.cidr for s in network.subnets if s.enable_dhcp)
@@ -184,6 +245,24 @@ class DhcpAgent(object):
         else:
             self.disable_dhcp_helper(network.id)
 
+    def schedule_reload_allocations(self, network_id):
+        """Reload the DHCP allocations of a network after a short delay.
+
+        The port events received for the network until the reload happens
+        are coalesced into it.
+        """
+        if network_id in self.pending_reloads:
+            return
+        self.pending_reloads.add(network_id)
+        eventlet.spawn_after(self.conf.reload_allocations_delay,
+                             self._reload_allocations, network_id)
+
+    def _reload_allocations(self, network_id):
+        self.pending_reloads.discard(network_id)
+        network = self.cache.get_network_by_id(network_id)
+        if network:
+            self.call_driver('reload_allocations', network)
+
     def network_create_end(self, payload):
         """Handle the network.create.end notification event."""
         network_id = payload['network']['id']
@@ -222,7 +301,7 @@ class DhcpAgent(object):
         network = self.cache.get_network_by_id(port.network_id)
         if network:
             self.cache.put_port(port)
-            self.call_driver('reload_allocations', network)
+            self.schedule_reload_allocations(network.id)
 
     # Use the update handler for the port create event.
     port_create_end = port_update_end
@@ -231,9 +310,8 @@ class DhcpAgent(object):
         """Handle the port.delete.end notification event."""
         port = self.cache.get_port_by_id(payload['port_id'])
         if port:
-            network = self.cache.get_network_by_id(port.network_id)
             self.cache.remove_port(port)
-            self.call_driver('reload_allocations', network)
+            self.schedule_reload_allocations(port.network_id)
 
 
 class DhcpPluginApi(proxy.RpcProxy):
@@ -246,11 +324,12 @@ class DhcpPluginApi(proxy.RpcProxy):
 
     BASE_RPC_API_VERSION = '1.0'
 
-    def __init__(self, topic, context):
+    def __init__(self, topic, context, page_size=100):
         super(DhcpPluginApi, self).__init__(
             topic=topic, default_version=self.BASE_RPC_API_VERSION)
         self.context = context
         self.host = socket.gethostname()
+        self.page_size = page_size
 
     def get_active_networks(self):
         """Make a remote process call to retrieve the active networks."""
@@ -258,6 +337,25 @@ class DhcpPluginApi(proxy.RpcProxy):
                          self.make_msg('get_active_networks', host=self.host),
                          topic=self.topic)
 
+    def get_active_networks_info(self):
+        """Make remote process calls to retrieve the active networks info.
+
+        The networks are retrieved by pages of page_size networks.
+        """
+        networks = []
+        marker = None
+        while True:
+            page = self.call(self.context,
+                             self.make_msg('get_active_networks_info',
+                                           host=self.host,
+                                           limit=self.page_size,
+                                           marker=marker),
+                             topic=self.topic)
+            networks.extend(DictModel(network) for network in page)
+            if len(page) < self.page_size:
+                return networks
+            marker = page[-1]['id']
+
     def get_network_info(self, network_id):
         """Make a remote process call to retrieve network info."""
         return DictModel(self.call(self.context,
@@ -304,6 +402,18 @@ class DhcpPluginApi(proxy.RpcProxy):
                                 host=self.host),
                   topic=self.topic)
 
+    def update_leases_expiration(self, network_id, leases):
+        """Make a remote process call to update several ip leases expiration.
+
+        leases maps the ip addresses to their lease remaining time.
+        """
+        self.cast(self.context,
+                  self.make_msg('update_leases_expiration',
+                                network_id=network_id,
+                                leases=leases,
+                                host=self.host),
+                  topic=self.topic)
+
 
 class NetworkCache(object):
     """Agent cache of the current network state."""
@@ -311,6 +421,12 @@ class NetworkCache(object):
         self.cache = {}
         self.subnet_lookup = {}
         self.port_lookup = {}
+        # Per network, ports keyed by id. The ports of a cached network are
+        # a live view of its values, so port changes keep the port order and
+        # do not rebuild the list.
+        self.ports = {}
+        # Per network, port owning each fixed ip address
+        self.ip_lookup = {}
 
     def get_network_ids(self):
         return self.cache.keys()
@@ -328,16 +444,23 @@ class NetworkCache(object):
         if network.id in self.cache:
             self.remove(self.cache[network.id])
 
+        ports = collections.OrderedDict()
         self.cache[network.id] = network
+        self.ports[network.id] = ports
+        self.ip_lookup[network.id] = {}
 
         for subnet in network.subnets:
             self.subnet_lookup[subnet.id] = network.id
 
         for port in network.ports:
-            self.port_lookup[port.id] = network.id
+            ports[port.id] = port
+            self._index_port(network.id, port)
+        network.ports = ports.viewvalues()
 
     def remove(self, network):
         del self.cache[network.id]
+        self.ports.pop(network.id, None)
+        self.ip_lookup.pop(network.id, None)
 
         for subnet in network.subnets:
             del self.subnet_lookup[subnet.id]
@@ -345,32 +468,41 @@ class NetworkCache(object):
         for port in network.ports:
             del self.port_lookup[port.id]
 
+    def _index_port(self, network_id, port):
+        self.port_lookup[port.id] = network_id
+        ip_lookup = self.ip_lookup[network_id]
+        for fixed_ip in port.fixed_ips:
+            ip_lookup[fixed_ip.ip_address] = port
+
+    def _unindex_port_ips(self, network_id, port):
+        ip_lookup = self.ip_lookup[network_id]
+        for fixed_ip in port.fixed_ips:
+            if ip_lookup.get(fixed_ip.ip_address) is port:
+                del ip_lookup[fixed_ip.ip_address]
+
     def put_port(self, port):
         network = self.get_network_by_id(port.network_id)
-        for index in range(len(network.ports)):
-            if network.ports[index].id == port.id:
-                network.ports[index] = port
-                break
-        else:
-            network.ports.append(port)
-
-        self.port_lookup[port.id] = network.id
+        ports = self.ports[network.id]
+        old_port = ports.get(port.id)
+        if old_port is not None:
+            self._unindex_port_ips(network.id, old_port)
+        # An updated port keeps its position in the network ports
+        ports[port.id] = port
+        self._index_port(network.id, port)
 
     def remove_port(self, port):
         network = self.get_network_by_port_id(port.id)
-
-        for index in range(len(network.ports)):
-            if network.ports[index] == port:
-                del network.ports[index]
-                del self.port_lookup[port.id]
-                break
+        old_port = self.ports[network.id].pop(port.id)
+        self._unindex_port_ips(network.id, old_port)
+        del self.port_lookup[port.id]
 
     def get_port_by_id(self, port_id):
         network = self.get_network_by_port_id(port_id)
         if network:
-            for port in network.ports:
-                if port.id == port_id:
-                    return port
+            return self.ports[network.id].get(port_id)
+
+    def get_port_by_ip_address(self, network_id, ip_address):
+        return self.ip_lookup.get(network_id, {}).get(ip_address)
 
 
 class DeviceManager(object):
@@ -272,8 +272,15 @@ class Dnsmasq(DhcpLocalProcess):
             return
 
         """Rebuilds the dnsmasq config and signal the dnsmasq to reload."""
-        self._output_hosts_file()
-        self._output_opts_file()
+        hosts_changed = replace_file_if_changed(
+            self.get_conf_file_name('host'), self._hosts_file_content())
+        opts_changed = replace_file_if_changed(
+            self.get_conf_file_name('opts'), self._opts_file_content())
+        if not (hosts_changed or opts_changed):
+            LOG.debug(_('Allocations unchanged for network: %s'),
+                      self.network.id)
+            return
+
         cmd = ['kill', '-HUP', self.pid]
 
         if self.namespace:
@@ -285,6 +292,11 @@ class Dnsmasq(DhcpLocalProcess):
 
     def _output_hosts_file(self):
         """Writes a dnsmasq compatible hosts file."""
+        name = self.get_conf_file_name('host')
+        replace_file(name, self._hosts_file_content())
+        return name
+
+    def _hosts_file_content(self):
         r = re.compile('[:.]')
         buf = StringIO.StringIO()
 
@@ -294,13 +306,15 @@ class Dnsmasq(DhcpLocalProcess):
                                   self.conf.dhcp_domain)
                 buf.write('%s,%s,%s\n' %
                           (port.mac_address, name, alloc.ip_address))
-
-        name = self.get_conf_file_name('host')
-        replace_file(name, buf.getvalue())
-        return name
+        return buf.getvalue()
 
     def _output_opts_file(self):
         """Write a dnsmasq compatible options file."""
+        name = self.get_conf_file_name('opts')
+        replace_file(name, self._opts_file_content())
+        return name
+
+    def _opts_file_content(self):
         options = []
         for i, subnet in enumerate(self.network.subnets):
             if not subnet.enable_dhcp:
@@ -323,10 +337,7 @@ class Dnsmasq(DhcpLocalProcess):
                                                        subnet.gateway_ip))
                 else:
                     options.append(self._format_option(i, 'router'))
-
-        name = self.get_conf_file_name('opts')
-        replace_file(name, '\n'.join(options))
-        return name
+        return '\n'.join(options)
 
     def _lease_relay_script_path(self):
         return os.path.join(os.path.dirname(sys.argv[0]),
@@ -378,3 +389,18 @@ def replace_file(file_name, data):
     tmp_file.close()
     os.chmod(tmp_file.name, 0644)
     os.rename(tmp_file.name, file_name)
+
+
+def replace_file_if_changed(file_name, data):
+    """Replaces the contents of file_name with data unless already equal.
+
+    Returns True if the file has been replaced.
+    """
+    try:
+        with open(file_name, 'r') as f:
+            if f.read() == data:
+                return False
+    except IOError:
+        pass
+    replace_file(file_name, data)
+    return True
@@ -69,19 +69,20 @@ class LinuxInterfaceDriver(object):
         for address in device.addr.list(scope='global', filters=['permanent']):
             previous[address['cidr']] = address['ip_version']
 
-        # add new addresses
-        for ip_cidr in ip_cidrs:
+        with device.batch():
+            # add new addresses
+            for ip_cidr in ip_cidrs:
 
-            net = netaddr.IPNetwork(ip_cidr)
-            if ip_cidr in previous:
-                del previous[ip_cidr]
-                continue
+                net = netaddr.IPNetwork(ip_cidr)
+                if ip_cidr in previous:
+                    del previous[ip_cidr]
+                    continue
 
-            device.addr.add(net.version, ip_cidr, str(net.broadcast))
+                device.addr.add(net.version, ip_cidr, str(net.broadcast))
 
-        # clean up any old addresses
-        for ip_cidr, ip_version in previous.items():
-            device.addr.delete(ip_version, ip_cidr)
+            # clean up any old addresses
+            for ip_cidr, ip_version in previous.items():
+                device.addr.delete(ip_version, ip_cidr)
 
     def check_bridge_exists(self, bridge):
         if not ip_lib.device_exists(bridge):
@@ -14,6 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import os
+
 import netaddr
 
 from quantum.agent.linux import utils
@@ -21,16 +24,94 @@ from quantum.common import exceptions
 
 
 LOOPBACK_DEVNAME = 'lo'
+SYS_CLASS_NET = '/sys/class/net'
+NETNS_RUN_DIR = '/var/run/netns'
+
+# Global options that may be dropped when a command is queued in a batch:
+# 'ip -batch' lines cannot carry them, and the address argument of the
+# commands using them already implies the family.
+BATCH_IGNORED_OPTIONS = (4, 6, '4', '6')
+
+
+class IpBatch(object):
+    """Queue of ip commands to be run by a single 'ip -batch -' process.
+
+    All the commands of a batch run in the same namespace. 'ip' stops at
+    the first failing line, so a failure is reported just like it would
+    have been had the commands been executed one by one.
+    """
+
+    def __init__(self, root_helper, namespace=None):
+        self.root_helper = root_helper
+        self.namespace = namespace
+        self.commands = []
+
+    def accepts(self, options, namespace):
+        return (namespace == self.namespace and
+                all(o in BATCH_IGNORED_OPTIONS for o in options))
+
+    def add(self, command, args):
+        self.commands.append(' '.join(str(a) for a in [command] + list(args)))
+
+    def flush(self):
+        if not self.commands:
+            return
+        commands, self.commands = self.commands, []
+        if self.namespace:
+            ip_cmd = ['ip', 'netns', 'exec', self.namespace, 'ip']
+        else:
+            ip_cmd = ['ip']
+        return utils.execute(ip_cmd + ['-batch', '-'],
+                             root_helper=self.root_helper,
+                             process_input='\n'.join(commands) + '\n')
 
 
 class SubProcessBase(object):
     def __init__(self, root_helper=None, namespace=None):
         self.root_helper = root_helper
         self.namespace = namespace
+        self._batch = None
+        # the wrapper this object was created from, whose batch it joins
+        self._parent = None
+
+    @property
+    def _active_batch(self):
+        if self._batch is not None:
+            return self._batch
+        if self._parent is not None:
+            return self._parent._active_batch
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Queue the root commands issued in the block and run them at once.
+
+        Queued commands are flushed through one 'ip -batch -' invocation
+        when the block exits, or earlier if a command which cannot be
+        queued (a read, or a command for another namespace) needs to see
+        their effect. Nested calls join the outer batch.
+        """
+        if self._active_batch is not None:
+            yield self._active_batch
+            return
+        if not self.root_helper:
+            raise exceptions.SudoRequired()
+        self._batch = IpBatch(self.root_helper, self.namespace)
+        try:
+            yield self._batch
+            self._batch.flush()
+        finally:
+            self._batch = None
 
     def _run(self, options, command, args):
+        batch = self._active_batch
+        if batch:
+            # reads have to see the effect of the queued commands
+            batch.flush()
         if self.namespace:
-            return self._as_root(options, command, args)
+            if not self.root_helper:
+                raise exceptions.SudoRequired()
+            return self._execute(options, command, args,
+                                 self.root_helper, self.namespace)
         else:
             return self._execute(options, command, args)
 
@@ -40,6 +121,13 @@ class SubProcessBase(object):
 
         namespace = self.namespace if not use_root_namespace else None
 
+        batch = self._active_batch
+        if batch:
+            if command != 'netns' and batch.accepts(options, namespace):
+                batch.add(command, args)
+                return ''
+            batch.flush()
+
         return self._execute(options,
                              command,
                              args,
@@ -65,7 +153,9 @@ class IPWrapper(SubProcessBase):
         self.netns = IpNetnsCommand(self)
 
     def device(self, name):
-        return IPDevice(name, self.root_helper, self.namespace)
+        device = IPDevice(name, self.root_helper, self.namespace)
+        device._parent = self
+        return device
 
     def get_devices(self, exclude_loopback=False):
         retval = []
@@ -123,8 +213,8 @@ class IPWrapper(SubProcessBase):
 
     @classmethod
     def get_namespaces(cls, root_helper):
-        output = cls._execute('', 'netns', ('list',), root_helper=root_helper)
-        return [l.strip() for l in output.split('\n')]
+        # 'ip netns list' only lists this directory, no need to fork for it
+        return _list_namespaces()
 
 
 class IPDevice(SubProcessBase):
@@ -400,15 +490,20 @@ class IpNetnsCommand(IpCommandBase):
                 check_exit_code=check_exit_code)
 
     def exists(self, name):
-        output = self._as_root('list', options='o', use_root_namespace=True)
+        return name in _list_namespaces()
 
-        for line in output.split('\n'):
-            if name == line.strip():
-                return True
-        return False
+
+def _list_namespaces():
+    try:
+        return os.listdir(NETNS_RUN_DIR)
+    except OSError:
+        return []
 
 
 def device_exists(device_name, root_helper=None, namespace=None):
+    if not namespace:
+        # sysfs reflects the namespace this process lives in
+        return os.path.exists(os.path.join(SYS_CLASS_NET, device_name))
     try:
         address = IPDevice(device_name, root_helper, namespace).link.address
     except RuntimeError:
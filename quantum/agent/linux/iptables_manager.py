@@ -292,7 +292,6 @@ class IptablesManager(object):
 
         self._apply()
 
-    @lockutils.synchronized('iptables', 'quantum-', external=True)
     def _apply(self):
         """Apply the current in-memory set of iptables rules.
 
@@ -300,29 +299,42 @@ class IptablesManager(object):
         same component of Nova, and replace them with our current set of
         rules. This happens atomically, thanks to iptables-restore.
 
+        Each (namespace, ip family) pair has its own set of tables, so
+        applies are serialized per pair rather than host-wide: only the
+        managers sharing the root namespace tables contend for its lock.
+
         """
         s = [('iptables', self.ipv4)]
         if self.use_ipv6:
             s += [('ip6tables', self.ipv6)]
 
         for cmd, tables in s:
-            for table in tables:
-                args = ['%s-save' % cmd, '-t', table]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                current_table = (self.execute(args,
-                                 root_helper=self.root_helper))
-                current_lines = current_table.split('\n')
-                new_filter = self._modify_rules(current_lines,
-                                                tables[table])
-                args = ['%s-restore' % (cmd)]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                self.execute(args,
-                             process_input='\n'.join(new_filter),
-                             root_helper=self.root_helper)
+            with lockutils.lock(self._lock_name(cmd), 'quantum-', True):
+                self._apply_tables(cmd, tables)
         LOG.debug(_("IPTablesManager.apply completed with success"))
 
+    def _lock_name(self, cmd):
+        if self.namespace:
+            return '%s-%s' % (cmd, self.namespace)
+        return cmd
+
+    def _apply_tables(self, cmd, tables):
+        for table in tables:
+            args = ['%s-save' % cmd, '-t', table]
+            if self.namespace:
+                args = ['ip', 'netns', 'exec', self.namespace] + args
+            current_table = (self.execute(args,
+                             root_helper=self.root_helper))
+            current_lines = current_table.split('\n')
+            new_filter = self._modify_rules(current_lines,
+                                            tables[table])
+            args = ['%s-restore' % (cmd)]
+            if self.namespace:
+                args = ['ip', 'netns', 'exec', self.namespace] + args
+            self.execute(args,
+                         process_input='\n'.join(new_filter),
+                         root_helper=self.root_helper)
+
     def _modify_rules(self, current_lines, table, binary=None):
         unwrapped_chains = table.unwrapped_chains
         chains = table.chains
@@ -18,9 +18,12 @@
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 # @author: Dave Lapsley, Nicira Networks, Inc.
 
+import itertools
+import operator
 import re
 
 from quantum.agent.linux import utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
@@ -46,6 +49,8 @@ class OVSBridge:
         self.br_name = br_name
         self.root_helper = root_helper
         self.re_id = self.re_compile_id()
+        # (action, flow) pairs queued while flow changes are deferred
+        self.deferred_flows = None
 
     def re_compile_id(self):
         external = 'external_ids\s*'
@@ -86,10 +91,11 @@ class OVSBridge:
         args = ["clear", table_name, record, column]
         self.run_vsctl(args)
 
-    def run_ofctl(self, cmd, args):
+    def run_ofctl(self, cmd, args, process_input=None):
         full_args = ["ovs-ofctl", cmd, self.br_name] + args
         try:
-            return utils.execute(full_args, root_helper=self.root_helper)
+            return utils.execute(full_args, root_helper=self.root_helper,
+                                 process_input=process_input)
         except Exception, e:
             LOG.error(_("Unable to execute %(cmd)s. Exception: %(exception)s"),
                       {'cmd': full_args, 'exception': e})
@@ -149,7 +155,7 @@ class OVSBridge:
         flow_expr_arr = self._build_flow_expr_arr(**kwargs)
         flow_expr_arr.append("actions=%s" % (kwargs["actions"]))
         flow_str = ",".join(flow_expr_arr)
-        self.run_ofctl("add-flow", [flow_str])
+        self._apply_flow("add", flow_str)
 
     def delete_flows(self, **kwargs):
         kwargs['delete'] = True
@@ -157,7 +163,39 @@ class OVSBridge:
         if "actions" in kwargs:
             flow_expr_arr.append("actions=%s" % (kwargs["actions"]))
         flow_str = ",".join(flow_expr_arr)
-        self.run_ofctl("del-flows", [flow_str])
+        self._apply_flow("del", flow_str)
+
+    def _apply_flow(self, action, flow_str):
+        if self.deferred_flows is not None:
+            self.deferred_flows.append((action, flow_str))
+        elif action == "add":
+            self.run_ofctl("add-flow", [flow_str])
+        else:
+            self.run_ofctl("%s-flows" % action, [flow_str])
+
+    def _apply_flows(self, action, flows):
+        if len(flows) == 1:
+            self._apply_flow(action, flows[0])
+            return
+        # ovs-ofctl reads the flows, one per line, from its standard input
+        self.run_ofctl("%s-flows" % action, ['-'], "\n".join(flows) + "\n")
+
+    def defer_apply_on(self):
+        """Queue flow changes until defer_apply_off() is called."""
+        if self.deferred_flows is None:
+            self.deferred_flows = []
+
+    def defer_apply_off(self):
+        """Apply the queued flow changes and stop deferring.
+
+        Consecutive changes of the same kind are passed to a single
+        ovs-ofctl invocation, so the relative order of adds and deletes is
+        preserved.
+        """
+        flows, self.deferred_flows = self.deferred_flows or [], None
+        for action, group in itertools.groupby(flows,
+                                               operator.itemgetter(0)):
+            self._apply_flows(action, [flow for _action, flow in group])
 
     def add_tunnel_port(self, port_name, remote_ip):
         self.run_vsctl(["add-port", self.br_name, port_name])
@@ -253,6 +291,45 @@ class OVSBridge:
                 edge_ports.add(iface_id)
         return edge_ports
 
+    def get_vif_port_map(self):
+        """Return the VIF ports of the bridge by VIF id.
+
+        The interfaces are read from a single snapshot of the Interface
+        table instead of one lookup per port.
+        """
+        port_names = set(self.get_port_name_list())
+        if not port_names:
+            return {}
+        output = self.run_vsctl(['--format=json', '--',
+                                 '--columns=name,external_ids,ofport',
+                                 'list', 'Interface'])
+        if not output:
+            return {}
+
+        edge_ports = {}
+        for name, external_ids, ofport in jsonutils.loads(output)['data']:
+            if name not in port_names:
+                continue
+            # Maps are ["map", [[key, value], ...]] in OVSDB JSON
+            external_ids = dict(external_ids[1])
+            if "attached-mac" not in external_ids:
+                continue
+            # An unset ofport is an empty set. The port will be reported
+            # by a later poll, once OVS has assigned its ofport.
+            if not isinstance(ofport, int):
+                continue
+            if "iface-id" in external_ids:
+                vif_id = external_ids["iface-id"]
+            elif "xs-vif-uuid" in external_ids:
+                # if this is a xenserver and iface-id is not automatically
+                # synced to OVS from XAPI, we grab it from XAPI directly
+                vif_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
+            else:
+                continue
+            edge_ports[vif_id] = VifPort(name, ofport, vif_id,
+                                         external_ids["attached-mac"], self)
+        return edge_ports
+
     def get_vif_port_by_id(self, port_id):
         args = ['--', '--columns=external_ids,name,ofport',
                 'find', 'Interface',
@@ -21,6 +21,7 @@
 
 """Utilities and helper functions."""
 
+import httplib
 import os
 import signal
 import socket
@@ -32,6 +33,7 @@ from quantum.openstack.common import log as logging
 
 
 TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+IDEMPOTENT_HTTP_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
 LOG = logging.getLogger(__name__)
 
 
@@ -162,3 +164,23 @@ def compare_elements(a, b):
     if b is None:
         b = []
     return set(a) == set(b)
+
+
+def can_resend_http_request(method, sent, error):
+    """Tell if a request failing on a reused keep-alive connection can be
+    sent again on a new connection.
+
+    :param method: the HTTP method of the request
+    :param sent: whether the request was written to the connection
+    :param error: the exception raised by httplib
+
+    A request the server did not receive can always be sent again. Once
+    sent, the server may have processed it, so only idempotent requests are
+    sent again, and only if the server closed the connection.
+    """
+    if isinstance(error, socket.timeout):
+        return False
+    if not sent:
+        return True
+    return (method in IDEMPOTENT_HTTP_METHODS and
+            isinstance(error, (httplib.BadStatusLine, socket.error)))
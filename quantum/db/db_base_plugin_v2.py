@@ -19,6 +19,7 @@ import datetime
 import random
 
 import netaddr
+import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 
@@ -401,6 +402,36 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                         "%(network_id)s and ip address %(ip_address)s."),
                       locals())
 
+    def update_fixed_ip_leases_expiration(self, context, network_id, leases):
+        """Update the expiration of several fixed IPs of a network at once.
+
+        leases maps the ip addresses to their lease remaining time.
+        """
+        if not leases:
+            return
+        now = timeutils.utcnow()
+        expirations = dict(
+            (ip_address, now + datetime.timedelta(seconds=lease_remaining))
+            for ip_address, lease_remaining in leases.iteritems())
+
+        with context.session.begin(subtransactions=True):
+            query = context.session.query(models_v2.IPAllocation)
+            query = query.filter(
+                models_v2.IPAllocation.network_id == network_id,
+                models_v2.IPAllocation.ip_address.in_(expirations.keys()))
+            count = query.update(
+                {models_v2.IPAllocation.expiration:
+                 sa.case(expirations,
+                         value=models_v2.IPAllocation.ip_address)},
+                synchronize_session=False)
+
+        if count < len(expirations):
+            LOG.debug(_("Only %(count)s of %(total)s fixed IPs found on "
+                        "network %(network_id)s to update their lease "
+                        "expiration."),
+                      {'count': count, 'total': len(expirations),
+                       'network_id': network_id})
+
     @staticmethod
     def _delete_ip_allocation(context, network_id, subnet_id, ip_address):
 
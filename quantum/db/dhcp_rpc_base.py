@@ -14,8 +14,10 @@
 # limitations under the License.
 
 from sqlalchemy.orm import exc
+from sqlalchemy.sql import expression as expr
 
 from quantum.api.v2 import attributes
+from quantum.db import models_v2
 from quantum import manager
 from quantum.openstack.common import log as logging
 
@@ -47,6 +49,51 @@ class DhcpRpcCallbackMixin(object):
         network['ports'] = plugin.get_ports(context, filters=filters)
         return network
 
+    def _get_active_network_ids(self, context, marker, limit):
+        """Return the ids of a page of active networks, in id order."""
+        query = context.session.query(models_v2.Network.id).filter(
+            models_v2.Network.admin_state_up == expr.true())
+        if marker:
+            query = query.filter(models_v2.Network.id > marker)
+        query = query.order_by(models_v2.Network.id)
+        if limit:
+            query = query.limit(limit)
+        return [row.id for row in query]
+
+    def get_active_networks_info(self, context, **kwargs):
+        """Retrieve and return extended information about active networks.
+
+        Networks are returned in id order, starting after the marker network
+        id and up to limit networks. The subnets and ports of the page are
+        retrieved with one call each, whatever the number of networks.
+        """
+        host = kwargs.get('host')
+        limit = kwargs.get('limit')
+        marker = kwargs.get('marker')
+        LOG.debug(_('Active networks info requested from %s'), host)
+        plugin = manager.QuantumManager.get_plugin()
+
+        network_ids = self._get_active_network_ids(context, marker, limit)
+        if not network_ids:
+            return []
+
+        networks = dict((net['id'], net) for net in
+                        plugin.get_networks(context,
+                                            filters=dict(id=network_ids)))
+        for network in networks.itervalues():
+            network['subnets'] = []
+            network['ports'] = []
+
+        filters = dict(network_id=network_ids)
+        for subnet in plugin.get_subnets(context, filters=filters):
+            networks[subnet['network_id']]['subnets'].append(subnet)
+        for port in plugin.get_ports(context, filters=filters):
+            networks[port['network_id']]['ports'].append(port)
+
+        # Networks deleted since the ids were listed are skipped
+        return [networks[net_id] for net_id in network_ids
+                if net_id in networks]
+
     def get_dhcp_port(self, context, **kwargs):
         """Allocate a DHCP port for the host and return port information.
 
@@ -168,3 +215,17 @@ class DhcpRpcCallbackMixin(object):
 
         plugin.update_fixed_ip_lease_expiration(context, network_id,
                                                 ip_address, lease_remaining)
+
+    def update_leases_expiration(self, context, **kwargs):
+        """Update the expiration of several ip leases of a network."""
+        host = kwargs.get('host')
+        network_id = kwargs.get('network_id')
+        leases = kwargs.get('leases')
+
+        LOG.debug(_('Updating %(count)s lease expirations on network '
+                    '%(network_id)s from %(host)s.'),
+                  {'count': len(leases), 'network_id': network_id,
+                   'host': host})
+        plugin = manager.QuantumManager.get_plugin()
+
+        plugin.update_fixed_ip_leases_expiration(context, network_id, leases)
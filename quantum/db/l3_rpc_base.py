@@ -39,7 +39,7 @@ class L3RpcCallbackMixin(object):
         plugin = manager.QuantumManager.get_plugin()
         routers = plugin.get_sync_data(context, router_id)
         LOG.debug(_("Routers returned to l3 agent:\n %s"),
-                  jsonutils.dumps(routers, indent=5))
+                  logging.DeferredArg(jsonutils.dumps, routers, indent=5))
         return routers
 
     def get_external_network_id(self, context, **kwargs):
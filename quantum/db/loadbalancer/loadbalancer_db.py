@@ -37,6 +37,9 @@ from quantum import policy
 
 LOG = logging.getLogger(__name__)
 
+STATS_KEYS = ('bytes_in', 'bytes_out',
+              'active_connections', 'total_connections')
+
 
 class SessionPersistence(model_base.BASEV2):
     vip_id = sa.Column(sa.String(36),
@@ -187,8 +190,10 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         return collection
 
     def _get_collection(self, context, model, dict_func, filters=None,
-                        fields=None):
+                        fields=None, options=None):
         query = self._get_collection_query(context, model, filters)
+        if options:
+            query = query.options(*options)
         return [dict_func(c, fields) for c in query.all()]
 
     def _get_collection_count(self, context, model, filters=None):
@@ -348,8 +353,7 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         with context.session.begin(subtransactions=True):
             vip = self._get_resource(context, Vip, id)
             qry = context.session.query(Pool)
-            for pool in qry.filter_by(vip_id=id).all():
-                pool.update({"vip_id": None})
+            qry.filter_by(vip_id=id).update({"vip_id": None})
             context.session.delete(vip)
 
     def get_vip(self, context, id, fields=None):
@@ -357,9 +361,10 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         return self._make_vip_dict(vip, fields)
 
     def get_vips(self, context, filters=None, fields=None):
-        return self._get_collection(context, Vip,
-                                    self._make_vip_dict,
-                                    filters=filters, fields=fields)
+        return self._get_collection(
+            context, Vip, self._make_vip_dict,
+            filters=filters, fields=fields,
+            options=[orm.joinedload(Vip.session_persistence)])
 
     ########################################################
     # Pool DB access
@@ -385,14 +390,17 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         return self._fields(res, fields)
 
     def _update_pool_member_info(self, context, pool_id, membersInfo):
+        if not membersInfo:
+            return
         with context.session.begin(subtransactions=True):
             member_qry = context.session.query(Member)
+            member_qry = member_qry.filter(Member.id.in_(membersInfo))
+            found = set(member['id'] for member in member_qry.all())
             for member_id in membersInfo:
-                try:
-                    member = member_qry.filter_by(id=member_id).one()
-                    member.update({'pool_id': pool_id})
-                except exc.NoResultFound:
+                if member_id not in found:
                     raise loadbalancer.MemberNotFound(member_id=member_id)
+            member_qry.update({'pool_id': pool_id},
+                              synchronize_session='fetch')
 
     def _create_pool_stats(self, context, pool_id):
         # This is internal method to add pool statistics. It won't
@@ -465,6 +473,10 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
     def get_pools(self, context, filters=None, fields=None):
         collection = self._model_query(context, Pool)
         collection = self._apply_filters_to_query(collection, Pool, filters)
+        # Load the members and monitors of all the pools up front, so
+        # building the dicts does not query them pool by pool.
+        collection = collection.options(orm.subqueryload(Pool.members),
+                                        orm.subqueryload(Pool.monitors))
         return [self._make_pool_dict(context, c, fields)
                 for c in collection.all()]
 
@@ -483,6 +495,55 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
                'total_connections': stats['total_connections']}
         return {'stats': res}
 
+    def update_pools_stats(self, context, pools_stats):
+        """Write the statistics of several pools at once.
+
+        pools_stats maps pool ids to dicts holding some or all of the
+        counters in STATS_KEYS; other keys are ignored. Existing rows are
+        updated with a single executemany per set of counters and missing
+        rows are inserted in bulk; statistics for pools that no longer exist
+        are dropped.
+        """
+        known_stats = {}
+        for pool_id, stats in pools_stats.iteritems():
+            stats = dict((key, value) for key, value in stats.iteritems()
+                         if key in STATS_KEYS)
+            if stats:
+                known_stats[pool_id] = stats
+        if not known_stats:
+            return
+        pools_stats = known_stats
+        table = PoolStatistics.__table__
+        with context.session.begin(subtransactions=True):
+            pool_ids = pools_stats.keys()
+            qry = context.session.query(PoolStatistics.pool_id)
+            existing = set(row[0] for row in
+                           qry.filter(PoolStatistics.pool_id.in_(pool_ids)))
+            missing = [pool_id for pool_id in pool_ids
+                       if pool_id not in existing]
+            if missing:
+                qry = context.session.query(Pool.id)
+                rows = [dict(dict.fromkeys(STATS_KEYS, 0),
+                             pool_id=row[0], **pools_stats[row[0]])
+                        for row in qry.filter(Pool.id.in_(missing))]
+                if rows:
+                    context.session.execute(table.insert(), rows)
+
+            params_by_keys = {}
+            for pool_id in existing:
+                stats = pools_stats[pool_id]
+                params = dict(('b_%s' % key, value)
+                              for key, value in stats.iteritems())
+                params['b_pool_id'] = pool_id
+                params_by_keys.setdefault(tuple(sorted(stats)),
+                                          []).append(params)
+            for keys, params in params_by_keys.iteritems():
+                stmt = table.update().where(
+                    table.c.pool_id == expr.bindparam('b_pool_id')).values(
+                        dict((key, expr.bindparam('b_%s' % key))
+                             for key in keys))
+                context.session.execute(stmt, params)
+
     def create_pool_health_monitor(self, context, health_monitor, pool_id):
         monitor_id = health_monitor['health_monitor']['id']
         with context.session.begin(subtransactions=True):
@@ -502,15 +563,7 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
                                            monitor_id=monitor_id)
             assoc.monitor = monitor
             pool.monitors.append(assoc)
-
-        monitors = []
-        try:
-            qry = context.session.query(Pool)
-            pool = qry.filter_by(id=pool_id).one()
-            for monitor in pool['monitors']:
-                monitors.append(monitor['monitor_id'])
-        except exc.NoResultFound:
-            pass
+            monitors = [monitor['monitor_id'] for monitor in pool['monitors']]
 
         res = {"health_monitor": monitors}
         return res
@@ -643,13 +696,8 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
     def delete_health_monitor(self, context, id):
         with context.session.begin(subtransactions=True):
             assoc_qry = context.session.query(PoolMonitorAssociation)
-            pool_qry = context.session.query(Pool)
             for assoc in assoc_qry.filter_by(monitor_id=id).all():
-                try:
-                    pool = pool_qry.filter_by(id=assoc['pool_id']).one()
-                except exc.NoResultFound:
-                    raise loadbalancer.PoolNotFound(pool_id=pool['id'])
-                pool.monitors.remove(assoc)
+                context.session.delete(assoc)
             monitor_db = self._get_resource(context, HealthMonitor, id)
             context.session.delete(monitor_db)
 
@@ -0,0 +1,67 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""ryu tunnel key free ranges
+
+Revision ID: 3d2a57a5c0b6
+Revises: 49332180ca96
+Create Date: 2013-03-12 10:21:43.018552
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3d2a57a5c0b6'
+down_revision = '49332180ca96'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = [
+    'quantum.plugins.ryu.ryu_quantum_plugin.RyuQuantumPluginV2'
+]
+
+from alembic import op
+import sqlalchemy as sa
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    # The free ranges are rebuilt from tunnelkeys when the plugin starts
+    op.create_table(
+        'tunnelkeyfreeranges',
+        sa.Column('first_key', sa.Integer(), nullable=False, index=True),
+        sa.Column('last_key', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.PrimaryKeyConstraint('last_key')
+    )
+    op.drop_table('tunnelkeylasts')
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.create_table(
+        'tunnelkeylasts',
+        sa.Column('last_key', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.PrimaryKeyConstraint('last_key')
+    )
+    op.drop_table('tunnelkeyfreeranges')
@@ -17,6 +17,8 @@
 #    @author: Salvatore Orlando, VMware
 #
 
+import time
+
 import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc as orm_exc
@@ -46,6 +48,19 @@ default_servicetype_opts = [
 
 cfg.CONF.register_opts(default_servicetype_opts, 'DEFAULT_SERVICETYPE')
 
+servicetype_cache_opts = [
+    cfg.IntOpt('service_type_cache_ttl',
+               default=30,
+               help=_('Seconds the service types are cached before being '
+                      'read again from the database. 0 disables the cache'))
+]
+
+cfg.CONF.register_opts(servicetype_cache_opts)
+
+# Minimum age of the cache, in seconds, before a lookup of an unknown
+# service type reloads it
+CACHE_MISS_RELOAD_INTERVAL = 1
+
 
 def parse_service_definition_opt():
     """ parse service definition opts and returns result """
@@ -127,6 +142,10 @@ class ServiceTypeManager(object):
         return cls._instance
 
     def __init__(self):
+        # Service types and their definitions, keyed by id. Only the
+        # refcount is not cached, as it changes with every service instance
+        self._cache = None
+        self._cache_time = 0
         self._initialize_db()
         ctx = context.get_admin_context()
         # Init default service type from configuration file
@@ -148,6 +167,7 @@ class ServiceTypeManager(object):
                                       def_svc_type_db['id'],
                                       def_service_type,
                                       svc_type_db=def_svc_type_db)
+        self._invalidate_cache()
         LOG.debug(_("Default service type record updated in Quantum database. "
                     "identifier is '%s'"), def_svc_type_db['id'])
 
@@ -215,25 +235,64 @@ class ServiceTypeManager(object):
             raise ServiceTypeNotFound(service_type_id=svc_type_id)
 
     def _get_default_service_type(self, context):
-        try:
-            query = context.session.query(ServiceType)
-            return query.filter(ServiceType.default == expr.true()).one()
-        except orm_exc.NoResultFound:
-            return
-        except orm_exc.MultipleResultsFound:
+        query = context.session.query(ServiceType)
+        results = query.filter(ServiceType.default == expr.true()).all()
+        if len(results) > 1:
             # This should never happen. If it does, take the first instance
-            query2 = context.session.query(ServiceType)
-            results = query2.filter(ServiceType.default == expr.true()).all()
             LOG.warning(_("Multiple default service type instances found."
                           "Will use instance '%s'"), results[0]['id'])
-            return results[0]
+        return results and results[0] or None
+
+    def _svc_type_as_dict(self, svc_type_db):
+        svc_type = svc_type_db.as_dict()
+        svc_type['service_definitions'] = [
+            {'service_class': svc_def_db['service_class'],
+             'plugin': svc_def_db['plugin'],
+             'driver': svc_def_db['driver']}
+            for svc_def_db in svc_type_db.service_definitions]
+        return svc_type
+
+    def _invalidate_cache(self):
+        self._cache = None
+
+    def _get_cached_service_types(self, context, max_age=None):
+        """Return the cached service types, reloading them if the cache is
+        older than max_age seconds, service_type_cache_ttl by default.
+        """
+        if max_age is None:
+            max_age = cfg.CONF.service_type_cache_ttl
+        if self._cache is None or time.time() - self._cache_time >= max_age:
+            cache = {}
+            for svc_type_db in context.session.query(ServiceType):
+                svc_type = self._svc_type_as_dict(svc_type_db)
+                del svc_type['num_instances']
+                cache[svc_type['id']] = svc_type
+            self._cache = cache
+            self._cache_time = time.time()
+        return self._cache
+
+    def _get_cached_service_type(self, context, svc_type_id):
+        cache = self._get_cached_service_types(context)
+        if svc_type_id not in cache:
+            # It might have been created through another server
+            cache = self._get_cached_service_types(
+                context, max_age=CACHE_MISS_RELOAD_INTERVAL)
+        try:
+            return cache[svc_type_id]
+        except KeyError:
+            raise ServiceTypeNotFound(service_type_id=svc_type_id)
 
     def _make_svc_type_dict(self, context, svc_type, fields=None):
+        """Build the response for a service type dict or cache entry.
+
+        Cache entries carry no refcount; it is read from the database
+        only when the caller is allowed to see it and asked for it.
+        """
+        extended = self._check_service_type_view_auth(context, svc_type)
 
         def _make_svc_def_dict(svc_def_db):
             svc_def = {'service_class': svc_def_db['service_class']}
-            if self._check_service_type_view_auth(context,
-                                                  svc_type.as_dict()):
+            if extended:
                 svc_def.update({'plugin': svc_def_db['plugin'],
                                 'driver': svc_def_db['driver']})
             return svc_def
@@ -244,9 +303,13 @@ class ServiceTypeManager(object):
                'service_definitions':
                [_make_svc_def_dict(svc_def) for svc_def
                 in svc_type['service_definitions']]}
-        if self._check_service_type_view_auth(context,
-                                              svc_type.as_dict()):
-            res['num_instances'] = svc_type['num_instances']
+        if extended and (not fields or 'num_instances' in fields):
+            num_instances = svc_type.get('num_instances')
+            if num_instances is None:
+                query = context.session.query(ServiceType.num_instances)
+                num_instances = query.filter(
+                    ServiceType.id == svc_type['id']).scalar()
+            res['num_instances'] = num_instances
         # Field selection
         if fields:
             return dict(((k, v) for k, v in res.iteritems()
@@ -255,9 +318,15 @@ class ServiceTypeManager(object):
 
     def get_service_type(self, context, id, fields=None):
         """ Retrieve a service type record """
-        return self._make_svc_type_dict(context,
-                                        self._get_service_type(context, id),
-                                        fields)
+        return self._make_svc_type_dict(
+            context, self._get_cached_service_type(context, id), fields)
+
+    def get_default_service_type(self, context, fields=None):
+        """ Retrieve the default service type record """
+        for svc_type in self._get_cached_service_types(context).values():
+            if svc_type['default']:
+                return self._make_svc_type_dict(context, svc_type, fields)
+        raise NoDefaultServiceDefinition()
 
     def get_service_types(self, context, fields=None, filters=None):
         """ Retrieve a possibly filtered list of service types """
@@ -267,22 +336,27 @@ class ServiceTypeManager(object):
                 column = getattr(ServiceType, key, None)
                 if column:
                     query = query.filter(column.in_(value))
-        return [self._make_svc_type_dict(context, svc_type, fields)
+        return [self._make_svc_type_dict(
+                context, self._svc_type_as_dict(svc_type), fields)
                 for svc_type in query.all()]
 
     def create_service_type(self, context, service_type):
         """ Create a new service type """
         svc_type_data = service_type['service_type']
         svc_type_db = self._create_service_type(context, svc_type_data)
+        self._invalidate_cache()
         LOG.debug(_("Created service type object:%s"), svc_type_db['id'])
-        return self._make_svc_type_dict(context, svc_type_db)
+        return self._make_svc_type_dict(context,
+                                        self._svc_type_as_dict(svc_type_db))
 
     def update_service_type(self, context, id, service_type):
         """ Update a service type """
         svc_type_data = service_type['service_type']
         svc_type_db = self._update_service_type(context, id,
                                                 svc_type_data)
-        return self._make_svc_type_dict(context, svc_type_db)
+        self._invalidate_cache()
+        return self._make_svc_type_dict(context,
+                                        self._svc_type_as_dict(svc_type_db))
 
     def delete_service_type(self, context, id):
         """ Delete a service type """
@@ -292,6 +366,12 @@ class ServiceTypeManager(object):
             raise ServiceTypeInUse(service_type_id=svc_type_db['id'])
         with context.session.begin(subtransactions=True):
             context.session.delete(svc_type_db)
+        self._invalidate_cache()
+
+    def _get_num_instances(self, context, id):
+        # Read back the count just written by the UPDATE
+        query = context.session.query(ServiceType.num_instances)
+        return query.filter(ServiceType.id == id).scalar()
 
     def increase_service_type_refcount(self, context, id):
         """ Increase references count for a service type object
@@ -304,9 +384,16 @@ class ServiceTypeManager(object):
         #refcount mechanisms. Perhaps adding hooks into models which
         #use service types in order to enforce ref. integrity and cascade
         with context.session.begin(subtransactions=True):
-            svc_type_db = self._get_service_type(context, id)
-            svc_type_db['num_instances'] = svc_type_db['num_instances'] + 1
-        return svc_type_db['num_instances']
+            # Increment in place rather than reading the row first, so
+            # concurrent creations do not queue up behind each other
+            query = context.session.query(ServiceType)
+            query = query.filter(ServiceType.id == id)
+            if not query.update(
+                    {'num_instances': ServiceType.num_instances + 1},
+                    synchronize_session='evaluate'):
+                self._invalidate_cache()
+                raise ServiceTypeNotFound(service_type_id=id)
+            return self._get_num_instances(context, id)
 
     def decrease_service_type_refcount(self, context, id):
         """ Decrease references count for a service type object
@@ -319,10 +406,15 @@ class ServiceTypeManager(object):
         #refcount mechanisms. Perhaps adding hooks into models which
         #use service types in order to enforce ref. integrity and cascade
         with context.session.begin(subtransactions=True):
-            svc_type_db = self._get_service_type(context, id)
-            if svc_type_db['num_instances'] == 0:
+            query = context.session.query(ServiceType)
+            query = query.filter(ServiceType.id == id,
+                                 ServiceType.num_instances > 0)
+            if not query.update(
+                    {'num_instances': ServiceType.num_instances - 1},
+                    synchronize_session='evaluate'):
+                # Either the service type is gone or nothing uses it
+                svc_type_db = self._get_service_type(context, id)
                 LOG.warning(_("Number of instances for service type "
                               "'%s' is already 0."), svc_type_db['name'])
                 return
-            svc_type_db['num_instances'] = svc_type_db['num_instances'] - 1
-        return svc_type_db['num_instances']
+            return self._get_num_instances(context, id)
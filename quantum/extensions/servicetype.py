@@ -65,9 +65,9 @@ def set_default_svctype_id(original_id):
     if not original_id:
         svctype_mgr = servicetype_db.ServiceTypeManager.get_instance()
         # Fetch default service type - it must exist
-        res = svctype_mgr.get_service_types(context.get_admin_context(),
-                                            filters={'default': [True]})
-        return res[0]['id']
+        res = svctype_mgr.get_default_service_type(
+            context.get_admin_context(), fields=['id'])
+        return res['id']
     return original_id
 
 
@@ -77,7 +77,7 @@ def _validate_servicetype_ref(data, valid_values=None):
     svctype_mgr = servicetype_db.ServiceTypeManager.get_instance()
     try:
         svctype_mgr.get_service_type(context.get_admin_context(),
-                                     svc_type_id)
+                                     svc_type_id, fields=['id'])
     except servicetype_db.ServiceTypeNotFound:
         return _("The service type '%s' does not exist") % svc_type_id
 
@@ -16,6 +16,7 @@
 #    under the License.
 
 
+import contextlib
 import errno
 import functools
 import os
@@ -131,6 +132,89 @@ else:
 _semaphores = weakref.WeakValueDictionary()
 
 
+@contextlib.contextmanager
+def lock(name, lock_file_prefix=None, external=False, lock_path=None):
+    """Context based lock
+
+    This function yields a `semaphore.Semaphore` instance unless external is
+    True, in which case, it'll yield an InterProcessLock instance.
+
+    :param lock_file_prefix: The lock_file_prefix argument is used to provide
+    lock files on disk with a meaningful prefix. The prefix should end with a
+    hyphen ('-') if specified.
+
+    :param external: The external keyword argument denotes whether this lock
+    should work across multiple processes. This means that if two different
+    workers both run a a method decorated with @synchronized('mylock',
+    external=True), only one of them will execute at a time.
+
+    :param lock_path: The lock_path keyword argument is used to specify a
+    special location for external lock files to live. If nothing is set, then
+    CONF.lock_path is used as a default.
+
+    The time spent waiting for the semaphore and for the file lock is logged
+    at debug level, so contention on a given lock name can be spotted.
+    """
+    # NOTE(soren): If we ever go natively threaded, this will be racy.
+    #              See http://stackoverflow.com/questions/5390569/dyn
+    #              amically-allocating-and-destroying-mutexes
+    sem = _semaphores.get(name, semaphore.Semaphore())
+    if name not in _semaphores:
+        # this check is not racy - we're already holding ref locally
+        # so GC won't remove the item and there was no IO switch
+        # (only valid in greenthreads)
+        _semaphores[name] = sem
+
+    start = time.time()
+    with sem:
+        LOG.debug(_('Got semaphore "%(lock)s" after waiting %(wait).3fs'),
+                  {'lock': name, 'wait': time.time() - start})
+        if external and not CONF.disable_process_locking:
+            LOG.debug(_('Attempting to grab file lock "%(lock)s"'),
+                      {'lock': name})
+            cleanup_dir = False
+
+            # We need a copy of lock_path because it is non-local
+            local_lock_path = lock_path
+            if not local_lock_path:
+                local_lock_path = CONF.lock_path
+
+            if not local_lock_path:
+                cleanup_dir = True
+                local_lock_path = tempfile.mkdtemp()
+
+            if not os.path.exists(local_lock_path):
+                cleanup_dir = True
+                fileutils.ensure_tree(local_lock_path)
+
+            # NOTE(mikal): the lock name cannot contain directory
+            # separators
+            safe_name = name.replace(os.sep, '_')
+            lock_file_name = '%s%s' % (lock_file_prefix or '', safe_name)
+            lock_file_path = os.path.join(local_lock_path, lock_file_name)
+
+            try:
+                start = time.time()
+                file_lock = InterProcessLock(lock_file_path)
+                with file_lock:
+                    LOG.debug(_('Got file lock "%(lock)s" at %(path)s after '
+                                'waiting %(wait).3fs'),
+                              {'lock': name,
+                               'path': lock_file_path,
+                               'wait': time.time() - start})
+                    yield file_lock
+            finally:
+                LOG.debug(_('Released file lock "%(lock)s" at %(path)s'),
+                          {'lock': name, 'path': lock_file_path})
+                # NOTE(vish): This removes the tempdir if we needed
+                #             to create one. This is used to cleanup
+                #             the locks left behind by unit tests.
+                if cleanup_dir:
+                    shutil.rmtree(local_lock_path)
+        else:
+            yield sem
+
+
 def synchronized(name, lock_file_prefix, external=False, lock_path=None):
     """Synchronization decorator.
 
@@ -154,85 +238,16 @@ def synchronized(name, lock_file_prefix, external=False, lock_path=None):
 
     This way only one of either foo or bar can be executing at a time.
 
-    The lock_file_prefix argument is used to provide lock files on disk with a
-    meaningful prefix. The prefix should end with a hyphen ('-') if specified.
-
-    The external keyword argument denotes whether this lock should work across
-    multiple processes. This means that if two different workers both run a
-    a method decorated with @synchronized('mylock', external=True), only one
-    of them will execute at a time.
-
-    The lock_path keyword argument is used to specify a special location for
-    external lock files to live. If nothing is set, then CONF.lock_path is
-    used as a default.
+    The arguments are the same as for lock(), which can be used directly
+    when the lock name is only known at call time.
     """
 
     def wrap(f):
         @functools.wraps(f)
         def inner(*args, **kwargs):
-            # NOTE(soren): If we ever go natively threaded, this will be racy.
-            #              See http://stackoverflow.com/questions/5390569/dyn
-            #              amically-allocating-and-destroying-mutexes
-            sem = _semaphores.get(name, semaphore.Semaphore())
-            if name not in _semaphores:
-                # this check is not racy - we're already holding ref locally
-                # so GC won't remove the item and there was no IO switch
-                # (only valid in greenthreads)
-                _semaphores[name] = sem
-
-            with sem:
-                LOG.debug(_('Got semaphore "%(lock)s" for method '
-                            '"%(method)s"...'), {'lock': name,
-                                                 'method': f.__name__})
-                if external and not CONF.disable_process_locking:
-                    LOG.debug(_('Attempting to grab file lock "%(lock)s" for '
-                                'method "%(method)s"...'),
-                              {'lock': name, 'method': f.__name__})
-                    cleanup_dir = False
-
-                    # We need a copy of lock_path because it is non-local
-                    local_lock_path = lock_path
-                    if not local_lock_path:
-                        local_lock_path = CONF.lock_path
-
-                    if not local_lock_path:
-                        cleanup_dir = True
-                        local_lock_path = tempfile.mkdtemp()
-
-                    if not os.path.exists(local_lock_path):
-                        cleanup_dir = True
-                        fileutils.ensure_tree(local_lock_path)
-
-                    # NOTE(mikal): the lock name cannot contain directory
-                    # separators
-                    safe_name = name.replace(os.sep, '_')
-                    lock_file_name = '%s%s' % (lock_file_prefix, safe_name)
-                    lock_file_path = os.path.join(local_lock_path,
-                                                  lock_file_name)
-
-                    try:
-                        lock = InterProcessLock(lock_file_path)
-                        with lock:
-                            LOG.debug(_('Got file lock "%(lock)s" at %(path)s '
-                                        'for method "%(method)s"...'),
-                                      {'lock': name,
-                                       'path': lock_file_path,
-                                       'method': f.__name__})
-                            retval = f(*args, **kwargs)
-                    finally:
-                        LOG.debug(_('Released file lock "%(lock)s" at %(path)s'
-                                    ' for method "%(method)s"...'),
-                                  {'lock': name,
-                                   'path': lock_file_path,
-                                   'method': f.__name__})
-                        # NOTE(vish): This removes the tempdir if we needed
-                        #             to create one. This is used to cleanup
-                        #             the locks left behind by unit tests.
-                        if cleanup_dir:
-                            shutil.rmtree(local_lock_path)
-                else:
-                    retval = f(*args, **kwargs)
-
-            return retval
+            with lock(name, lock_file_prefix, external, lock_path):
+                LOG.debug(_('Got lock "%(lock)s" for method "%(method)s"...'),
+                          {'lock': name, 'method': f.__name__})
+                return f(*args, **kwargs)
         return inner
     return wrap
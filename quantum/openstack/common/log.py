@@ -209,6 +209,36 @@ def _get_log_file_path(binary=None):
         return '%s.log' % (os.path.join(logdir, binary),)
 
 
+class DeferredArg(object):
+    """Log message argument rendered only if the message is emitted.
+
+    func is called with args and kwargs the first time the argument is
+    formatted, which only happens when the log level is enabled, e.g.::
+
+        LOG.debug(_("Routers: %s"), DeferredArg(jsonutils.dumps, routers))
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    @property
+    def value(self):
+        if not hasattr(self, '_value'):
+            self._value = self.func(*self.args, **self.kwargs)
+        return self._value
+
+    def __str__(self):
+        return str(self.value)
+
+    def __unicode__(self):
+        return unicode(self.value)
+
+    def __repr__(self):
+        return repr(self.value)
+
+
 class ContextAdapter(logging.LoggerAdapter):
     warn = logging.LoggerAdapter.warning
 
@@ -217,6 +247,17 @@ class ContextAdapter(logging.LoggerAdapter):
         self.project = project_name
         self.version = version_string
 
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, msg, *args, **kwargs):
+        # Skip processing the context of messages which won't be emitted
+        if self.isEnabledFor(level):
+            super(ContextAdapter, self).log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
     def audit(self, msg, *args, **kwargs):
         self.log(logging.AUDIT, msg, *args, **kwargs)
 
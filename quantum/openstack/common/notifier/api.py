@@ -15,6 +15,9 @@
 
 import uuid
 
+import eventlet
+from eventlet import queue
+
 from quantum.openstack.common import cfg
 from quantum.openstack.common import context
 from quantum.openstack.common.gettextutils import _
@@ -37,6 +40,16 @@ notifier_opts = [
     cfg.StrOpt('default_publisher_id',
                default='$host',
                help='Default publisher_id for outgoing notifications'),
+    cfg.IntOpt('notification_queue_size',
+               default=0,
+               help='Maximum number of notifications waiting to be sent by '
+                    'a background green thread. Notifications are sent '
+                    'synchronously when 0'),
+    cfg.StrOpt('notification_overflow_policy',
+               default='drop_newest',
+               help='What to do with a notification when the queue is '
+                    'full: drop_newest drops it, drop_oldest drops the '
+                    'oldest queued notification, block waits for room'),
 ]
 
 CONF = cfg.CONF
@@ -50,6 +63,12 @@ DEBUG = 'DEBUG'
 
 log_levels = (DEBUG, WARN, INFO, ERROR, CRITICAL)
 
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+overflow_policies = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
 
 class BadPriorityException(Exception):
     pass
@@ -134,14 +153,96 @@ def notify(context, publisher_id, event_type, priority, payload):
                payload=payload,
                timestamp=str(timeutils.utcnow()))
 
+    if CONF.notification_queue_size > 0:
+        _enqueue(context, msg)
+    else:
+        _send(context, msg)
+
+
+def _send(context, msg):
+    """Hand a notification to each driver in turn.
+
+    Returns False if any of the drivers failed to send it.
+    """
+    sent = True
     for driver in _get_drivers():
         try:
             driver.notify(context, msg)
         except Exception as e:
+            sent = False
             LOG.exception(_("Problem '%(e)s' attempting to "
                             "send to notification system. "
                             "Payload=%(payload)s")
-                          % dict(e=e, payload=payload))
+                          % dict(e=e, payload=msg['payload']))
+    return sent
+
+
+_queue = None
+_overflow_policy = None
+_stats = dict(queued=0, sent=0, failed=0, dropped=0)
+
+
+def _get_queue():
+    """Create the notification queue and its sending green thread."""
+    global _queue, _overflow_policy
+    if _queue is None:
+        _overflow_policy = CONF.notification_overflow_policy
+        if _overflow_policy not in overflow_policies:
+            LOG.error(_("Invalid notification_overflow_policy %(policy)s, "
+                        "using %(default)s"),
+                      dict(policy=_overflow_policy, default=DROP_NEWEST))
+            _overflow_policy = DROP_NEWEST
+        _queue = queue.Queue(CONF.notification_queue_size)
+        eventlet.spawn_n(_send_queued, _queue)
+    return _queue
+
+
+def _drop(msg):
+    _stats['dropped'] += 1
+    LOG.warn(_("Notification queue full, dropping %(event_type)s "
+               "notification %(message_id)s"), msg)
+
+
+def _enqueue(context, msg):
+    notifications = _get_queue()
+    if _overflow_policy != BLOCK and notifications.full():
+        if _overflow_policy == DROP_NEWEST:
+            _drop(msg)
+            return
+        _drop(notifications.get_nowait()[1])
+        notifications.task_done()
+    notifications.put((context, msg))
+    _stats['queued'] += 1
+
+
+def _send_queued(notifications):
+    """Send the queued notifications, forever."""
+    while True:
+        context, msg = notifications.get()
+        try:
+            if _send(context, msg):
+                _stats['sent'] += 1
+            else:
+                _stats['failed'] += 1
+        except Exception:
+            _stats['failed'] += 1
+            LOG.exception(_("Failed to send queued notification"))
+        notifications.task_done()
+
+
+def flush():
+    """Wait until the queued notifications have been sent."""
+    if _queue is not None:
+        _queue.join()
+
+
+def get_stats():
+    """Return the counts of queued, sent, failed and dropped notifications.
+
+    A notification is failed when at least one of the drivers could not
+    send it.
+    """
+    return dict(_stats)
 
 
 _drivers = None
@@ -180,3 +281,10 @@ def _reset_drivers():
     """Used by unit tests to reset the drivers."""
     global _drivers
     _drivers = None
+
+
+def _reset_queue():
+    """Used by unit tests to reset the notification queue."""
+    global _queue
+    _queue = None
+    _stats.update(queued=0, sent=0, failed=0, dropped=0)
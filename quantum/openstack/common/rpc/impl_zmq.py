@@ -23,12 +23,14 @@ import types
 import uuid
 
 import eventlet
+from eventlet import semaphore
 import greenlet
 
 from quantum.openstack.common import cfg
 from quantum.openstack.common.gettextutils import _
 from quantum.openstack.common import importutils
 from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log as logging
 from quantum.openstack.common import processutils as utils
 from quantum.openstack.common.rpc import common as rpc_common
 
@@ -81,6 +83,14 @@ CONF.register_opts(zmq_opts)
 
 ZMQ_CTX = None  # ZeroMQ Context, must be global.
 matchmaker = None  # memoized matchmaker object
+reply_proxy = None  # receives the replies to the calls of the process
+outbound_clients = {}  # clients to the peers, by address
+# Outcome of the casts sent to each peer
+delivery_counters = dict(sent=0, failed=0, timeout=0)
+
+
+def _pformat_all(*objects):
+    return ' '.join(map(pformat, objects))
 
 
 def _serialize(data):
@@ -216,17 +226,70 @@ class ZmqClient(object):
         if socket_type is None:
             socket_type = zmq.PUSH
         self.outq = ZmqSocket(addr, socket_type, bind=bind)
+        # Green threads sharing the client must not interleave the parts
+        # of their messages.
+        self.lock = semaphore.Semaphore()
 
     def cast(self, msg_id, topic, data, serialize=True, force_envelope=False):
         if serialize:
             data = rpc_common.serialize_msg(data, force_envelope)
-        self.outq.send([str(msg_id), str(topic), str('cast'),
-                        _serialize(data)])
+        data = [str(msg_id), str(topic), str('cast'), _serialize(data)]
+        with self.lock:
+            self.outq.send(data)
 
     def close(self):
         self.outq.close()
 
 
+class ZmqReplyProxy(object):
+    """Receives the replies to the calls of the process over one socket.
+
+    Each call registers its msg_id before being sent, and the replies are
+    handed to the waiting call matching their msg_id.
+    """
+
+    def __init__(self):
+        self.waiters = {}
+        self.sock = ZmqSocket(
+            "ipc://%s/zmq_topic_zmq_replies" % CONF.rpc_zmq_ipc_dir,
+            zmq.SUB, bind=False)
+        self.thread = eventlet.spawn(self._receive)
+
+    def _receive(self):
+        delay = 0
+        while True:
+            try:
+                msg = self.sock.recv()
+            except zmq.ZMQError:
+                if self.sock.sock is None or self.sock.sock.closed:
+                    break
+                LOG.exception(_("Failed to receive reply"))
+                # Back off while the error persists
+                delay = min(max(delay * 2, 0.1), 5)
+                eventlet.sleep(delay)
+                continue
+            delay = 0
+            waiter = self.waiters.get(msg[0])
+            if waiter is None:
+                LOG.debug(_("Dropping reply to unknown msg_id %s"), msg[0])
+                continue
+            waiter.put(msg)
+
+    def register(self, msg_id):
+        """Return the queue which will receive the reply to msg_id."""
+        waiter = self.waiters[msg_id] = eventlet.queue.LightQueue()
+        self.sock.subscribe(msg_id)
+        return waiter
+
+    def unregister(self, msg_id):
+        self.sock.unsubscribe(msg_id)
+        self.waiters.pop(msg_id, None)
+
+    def close(self):
+        self.thread.kill()
+        self.sock.close()
+
+
 class RpcContext(rpc_common.CommonRpcContext):
     """Context that supports replying to a rpc.call."""
     def __init__(self, **kwargs):
@@ -434,7 +497,8 @@ class ZmqProxy(ZmqBaseReactor):
         msg_id, topic, style, in_msg = data
         topic = topic.split('.', 1)[0]
 
-        LOG.debug(_("CONSUMER GOT %s"), ' '.join(map(pformat, data)))
+        LOG.debug(_("CONSUMER GOT %s"),
+                  logging.DeferredArg(_pformat_all, *data))
 
         # Handle zmq_replies magic
         if topic.startswith('fanout~'):
@@ -607,15 +671,31 @@ def _cast(addr, context, msg_id, topic, msg, timeout=None, serialize=True,
 
     with Timeout(timeout_cast, exception=rpc_common.Timeout):
         try:
-            conn = ZmqClient(addr)
+            conn = _get_client(addr)
 
             # assumes cast can't return an exception
             conn.cast(msg_id, topic, payload, serialize, force_envelope)
         except zmq.ZMQError:
+            _close_client(addr)
             raise RPCException("Cast failed. ZMQ Socket Exception")
-        finally:
-            if 'conn' in vars():
-                conn.close()
+        except rpc_common.Timeout:
+            # The message may have been partially sent on the socket
+            _close_client(addr)
+            raise
+
+
+def _cast_to_peer(addr, *args):
+    """Cast to a peer, counting the outcome instead of raising errors."""
+    try:
+        _cast(addr, *args)
+    except rpc_common.Timeout:
+        delivery_counters['timeout'] += 1
+        LOG.error(_("Cast to %s timed out"), addr)
+    except Exception:
+        delivery_counters['failed'] += 1
+        LOG.exception(_("Cast to %s failed"), addr)
+    else:
+        delivery_counters['sent'] += 1
 
 
 def _call(addr, context, msg_id, topic, msg, timeout=None,
@@ -642,16 +722,11 @@ def _call(addr, context, msg_id, topic, msg, timeout=None,
         }
     }
 
-    LOG.debug(_("Creating queue socket for reply waiter"))
-
     # Messages arriving async.
-    # TODO(ewindisch): have reply consumer with dynamic subscription mgmt
     with Timeout(timeout, exception=rpc_common.Timeout):
         try:
-            msg_waiter = ZmqSocket(
-                "ipc://%s/zmq_topic_zmq_replies" % CONF.rpc_zmq_ipc_dir,
-                zmq.SUB, subscribe=msg_id, bind=False
-            )
+            LOG.debug(_("Registering reply waiter"))
+            msg_waiter = _get_reply_proxy().register(msg_id)
 
             LOG.debug(_("Sending cast"))
             _cast(addr, context, msg_id, topic, payload,
@@ -659,7 +734,7 @@ def _call(addr, context, msg_id, topic, msg, timeout=None,
 
             LOG.debug(_("Cast sent; Waiting reply"))
             # Blocks until receives reply
-            msg = msg_waiter.recv()
+            msg = msg_waiter.get()
             LOG.debug(_("Received message: %s"), msg)
             LOG.debug(_("Unpacking response"))
             responses = _deserialize(msg[-1])
@@ -667,8 +742,8 @@ def _call(addr, context, msg_id, topic, msg, timeout=None,
         except zmq.ZMQError:
             raise RPCException("ZMQ Socket Error")
         finally:
-            if 'msg_waiter' in vars():
-                msg_waiter.close()
+            if reply_proxy:
+                reply_proxy.unregister(msg_id)
 
     # It seems we don't need to do all of the following,
     # but perhaps it would be useful for multicall?
@@ -689,7 +764,7 @@ def _multi_send(method, context, topic, msg, timeout=None, serialize=True,
     message to all relevant hosts.
     """
     conf = CONF
-    LOG.debug(_("%(msg)s") % {'msg': ' '.join(map(pformat, (topic, msg)))})
+    LOG.debug(_("%s"), logging.DeferredArg(_pformat_all, topic, msg))
 
     queues = _get_matchmaker().queues(topic)
     LOG.debug(_("Sending message(s) to: %s"), queues)
@@ -701,18 +776,20 @@ def _multi_send(method, context, topic, msg, timeout=None, serialize=True,
         # this exception and a timeout isn't too big a lie.
         raise rpc_common.Timeout, "No match from matchmaker."
 
-    # This supports brokerless fanout (addresses > 1)
-    for queue in queues:
-        (_topic, ip_addr) = queue
-        _addr = "tcp://%s:%s" % (ip_addr, conf.rpc_zmq_port)
-
-        if method.__name__ == '_cast':
-            eventlet.spawn_n(method, _addr, context,
+    # This supports brokerless fanout (addresses > 1): casts are sent
+    # concurrently to every host, each with its own timeout.
+    if method.__name__ == '_cast':
+        for (_topic, ip_addr) in queues:
+            _addr = "tcp://%s:%s" % (ip_addr, conf.rpc_zmq_port)
+            eventlet.spawn_n(_cast_to_peer, _addr, context,
                              _topic, _topic, msg, timeout, serialize,
                              force_envelope)
-            return
-        return method(_addr, context, _topic, _topic, msg, timeout,
-                      serialize, force_envelope)
+        return
+
+    (_topic, ip_addr) = queues[0]
+    _addr = "tcp://%s:%s" % (ip_addr, conf.rpc_zmq_port)
+    return method(_addr, context, _topic, _topic, msg, timeout,
+                  serialize, force_envelope)
 
 
 def create_connection(conf, new=True):
@@ -766,6 +843,14 @@ def cleanup():
     global matchmaker
     matchmaker = None
 
+    global reply_proxy
+    if reply_proxy:
+        reply_proxy.close()
+    reply_proxy = None
+
+    for addr in outbound_clients.keys():
+        _close_client(addr)
+
 
 def _get_ctxt():
     if not zmq:
@@ -777,6 +862,27 @@ def _get_ctxt():
     return ZMQ_CTX
 
 
+def _get_reply_proxy():
+    global reply_proxy
+    if not reply_proxy:
+        reply_proxy = ZmqReplyProxy()
+    return reply_proxy
+
+
+def _get_client(addr):
+    """Return the cached client to addr, creating it if needed."""
+    client = outbound_clients.get(addr)
+    if client is None:
+        client = outbound_clients[addr] = ZmqClient(addr)
+    return client
+
+
+def _close_client(addr):
+    client = outbound_clients.pop(addr, None)
+    if client:
+        client.close()
+
+
 def _get_matchmaker():
     global matchmaker
     if not matchmaker:
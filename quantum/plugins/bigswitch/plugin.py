@@ -45,6 +45,7 @@ on port-attach) on an additional PUT to do a bulk dump of all persistent data.
 """
 
 import base64
+import bisect
 import httplib
 import json
 import socket
@@ -52,6 +53,7 @@ import socket
 from quantum.common import exceptions
 from quantum.common import rpc as q_rpc
 from quantum.common import topics
+from quantum.common import utils
 from quantum import context as qcontext
 from quantum.db import api as db
 from quantum.db import db_base_plugin_v2
@@ -78,6 +80,13 @@ restproxy_opts = [
     cfg.IntOpt('servertimeout', default=10,
                help=_("Maximum number of seconds to wait for proxy request "
                       "to connect and complete.")),
+    cfg.IntOpt('syncpagesize', default=0,
+               help=_("Maximum number of networks sent to the controller "
+                      "at once when syncing data, 0 sends all the networks "
+                      "at once.")),
+    cfg.IntOpt('serverpoolsize', default=4,
+               help=_("Maximum number of idle persistent connections kept "
+                      "open to each server.")),
 ]
 
 
@@ -108,7 +117,8 @@ class RemoteRestError(exceptions.QuantumException):
 class ServerProxy(object):
     """REST server proxy to a network controller."""
 
-    def __init__(self, server, port, ssl, auth, timeout, base_uri, name):
+    def __init__(self, server, port, ssl, auth, timeout, base_uri, name,
+                 pool_size=4):
         self.server = server
         self.port = port
         self.ssl = ssl
@@ -119,6 +129,27 @@ class ServerProxy(object):
         self.auth = None
         if auth:
             self.auth = 'Basic ' + base64.encodestring(auth).strip()
+        self.pool_size = pool_size
+        # Idle keep-alive connections to the server
+        self.connections = []
+
+    def _new_connection(self):
+        if self.ssl:
+            return httplib.HTTPSConnection(self.server, self.port,
+                                           timeout=self.timeout)
+        return httplib.HTTPConnection(self.server, self.port,
+                                      timeout=self.timeout)
+
+    def _release_connection(self, conn, response):
+        if response.will_close or len(self.connections) >= self.pool_size:
+            conn.close()
+        else:
+            self.connections.append(conn)
+
+    def close_connections(self):
+        """Close the idle connections to the server."""
+        while self.connections:
+            self.connections.pop().close()
 
     def rest_call(self, action, resource, data, headers):
         uri = self.base_uri + resource
@@ -136,28 +167,33 @@ class ServerProxy(object):
                   {'server': self.server, 'port': self.port, 'ssl': self.ssl,
                    'action': action})
         LOG.debug(_("ServerProxy: resource=%(resource)s, data=%(data)r, "
-                    "headers=%(headers)r"), locals())
+                    "headers=%(headers)r"),
+                  {'resource': resource, 'data': data, 'headers': headers})
 
-        conn = None
-        if self.ssl:
-            conn = httplib.HTTPSConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_('ServerProxy: Could not establish HTTPS '
-                            'connection'))
-                return 0, None, None, None
-        else:
-            conn = httplib.HTTPConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_('ServerProxy: Could not establish HTTP '
-                            'connection'))
-                return 0, None, None, None
-
-        try:
-            conn.request(action, uri, body, headers)
-            response = conn.getresponse()
-            respstr = response.read()
+        while True:
+            reused = bool(self.connections)
+            if reused:
+                conn = self.connections.pop()
+            else:
+                conn = self._new_connection()
+            sent = False
+            try:
+                conn.request(action, uri, body, headers)
+                sent = True
+                response = conn.getresponse()
+                respstr = response.read()
+            except (socket.error, httplib.HTTPException) as e:
+                conn.close()
+                if reused and utils.can_resend_http_request(action, sent, e):
+                    # The server closed the idle connection, try again
+                    continue
+                LOG.error(_('ServerProxy: %(action)s failure, %(e)r'),
+                          {'action': action, 'e': e})
+                self.close_connections()
+                ret = 0, None, None, None
+                break
+
+            self._release_connection(conn, response)
             respdata = respstr
             if response.status in self.success_codes:
                 try:
@@ -166,10 +202,8 @@ class ServerProxy(object):
                     # response was not JSON, ignore the exception
                     pass
             ret = (response.status, response.reason, respstr, respdata)
-        except (socket.timeout, socket.error) as e:
-            LOG.error(_('ServerProxy: %(action)s failure, %(e)r'), locals())
-            ret = 0, None, None, None
-        conn.close()
+            break
+
         LOG.debug(_("ServerProxy: status=%(status)d, reason=%(reason)r, "
                     "ret=%(ret)s, data=%(data)r"), {'status': ret[0],
                                                     'reason': ret[1],
@@ -180,19 +214,21 @@ class ServerProxy(object):
 
 class ServerPool(object):
     def __init__(self, servers, ssl, auth, timeout=10,
-                 base_uri='/quantum/v1.0', name='QuantumRestProxy'):
+                 base_uri='/quantum/v1.0', name='QuantumRestProxy',
+                 pool_size=4):
         self.base_uri = base_uri
         self.timeout = timeout
         self.name = name
         self.auth = auth
         self.ssl = ssl
+        self.pool_size = pool_size
         self.servers = []
         for server_port in servers:
             self.servers.append(self.server_proxy_for(*server_port))
 
     def server_proxy_for(self, server, port):
         return ServerProxy(server, port, self.ssl, self.auth, self.timeout,
-                           self.base_uri, self.name)
+                           self.base_uri, self.name, self.pool_size)
 
     def server_failure(self, resp):
         """Define failure codes as required.
@@ -221,6 +257,8 @@ class ServerPool(object):
                           {'action': action,
                            'server': (active_server.server,
                                       active_server.port)})
+                # Connections to a failing server may be stale
+                active_server.close_connections()
                 failed_servers.append(self.servers.pop(0))
 
         # All servers failed, reset server list and try again next time
@@ -270,6 +308,7 @@ class QuantumRestProxyV2(db_base_plugin_v2.QuantumDbPluginV2):
         serverssl = cfg.CONF.RESTPROXY.serverssl
         syncdata = cfg.CONF.RESTPROXY.syncdata
         timeout = cfg.CONF.RESTPROXY.servertimeout
+        pool_size = cfg.CONF.RESTPROXY.serverpoolsize
 
         # validate config
         assert servers is not None, 'Servers not defined. Aborting plugin'
@@ -279,7 +318,10 @@ class QuantumRestProxyV2(db_base_plugin_v2.QuantumDbPluginV2):
 
         # init network ctrl connections
         self.servers = ServerPool(servers, serverssl, serverauth,
-                                  timeout)
+                                  timeout, pool_size=pool_size)
+
+        # Last network accepted by the controller during a paged sync
+        self._sync_marker = None
 
         # init dhcp support
         self.topic = topics.PLUGIN
@@ -675,58 +717,89 @@ class QuantumRestProxyV2(db_base_plugin_v2.QuantumDbPluginV2):
             LOG.error(_("QuantumRestProxyV2: Unable to update remote port: "
                         "%s"), e.message)
 
-    def _send_all_data(self):
-        """Pushes all data to network ctrl (networks/ports, ports/attachments)
-        to give the controller an option to re-sync it's persistent store
-        with quantum's current view of that data.
-        """
-        admin_context = qcontext.get_admin_context()
+    def _get_topology(self, context, network_ids):
+        """Return the controller view of networks and their ports."""
         networks = {}
-        ports = {}
-
-        all_networks = super(QuantumRestProxyV2,
-                             self).get_networks(admin_context) or []
-        for net in all_networks:
+        if not network_ids:
+            return networks
+        filters = {'id': network_ids}
+        for net in super(QuantumRestProxyV2,
+                         self).get_networks(context, filters=filters):
             networks[net.get('id')] = {
                 'id': net.get('id'),
                 'name': net.get('name'),
                 'op-status': net.get('admin_state_up'),
+                'ports': [],
             }
 
-            subnets = net.get('subnets', [])
-            for subnet_id in subnets:
-                subnet = self.get_subnet(admin_context, subnet_id)
-                gateway_ip = subnet.get('gateway_ip')
-                if gateway_ip:
-                    # FIX: For backward compatibility with wire protocol
-                    networks[net.get('id')]['gateway'] = gateway_ip
-
-            ports = []
-            net_filter = {'network_id': [net.get('id')]}
-            net_ports = super(QuantumRestProxyV2,
-                              self).get_ports(admin_context,
-                                              filters=net_filter) or []
-            for port in net_ports:
-                port_details = {
-                    'id': port.get('id'),
-                    'attachment': {
-                        'id': port.get('id') + '00',
-                        'mac': port.get('mac_address'),
-                    },
-                    'state': port.get('status'),
-                    'op-status': port.get('admin_state_up'),
-                    'mac': None
-                }
-                ports.append(port_details)
-            networks[net.get('id')]['ports'] = ports
+        filters = {'network_id': network_ids}
+        for subnet in super(QuantumRestProxyV2,
+                            self).get_subnets(context, filters=filters,
+                                              fields=['network_id',
+                                                      'gateway_ip']):
+            gateway_ip = subnet.get('gateway_ip')
+            if gateway_ip and subnet['network_id'] in networks:
+                # FIX: For backward compatibility with wire protocol
+                networks[subnet['network_id']]['gateway'] = gateway_ip
+
+        for port in super(QuantumRestProxyV2,
+                          self).get_ports(context, filters=filters):
+            if port['network_id'] not in networks:
+                continue
+            port_details = {
+                'id': port.get('id'),
+                'attachment': {
+                    'id': port.get('id') + '00',
+                    'mac': port.get('mac_address'),
+                },
+                'state': port.get('status'),
+                'op-status': port.get('admin_state_up'),
+                'mac': None
+            }
+            networks[port['network_id']]['ports'].append(port_details)
+        return networks
+
+    def _send_all_data(self):
+        """Pushes all data to network ctrl (networks/ports, ports/attachments)
+        to give the controller an option to re-sync it's persistent store
+        with quantum's current view of that data.
+
+        With syncpagesize set, the networks are sent by pages ordered by id.
+        Each page tells the id of the last network of the previous page as
+        its marker, and whether it is the last page. A sync which failed
+        resumes after the last page accepted by the controller.
+        """
+        admin_context = qcontext.get_admin_context()
+        page_size = cfg.CONF.RESTPROXY.syncpagesize
+
+        network_ids = sorted(net['id'] for net in
+                             super(QuantumRestProxyV2,
+                                   self).get_networks(admin_context,
+                                                      fields=['id']))
+        if self._sync_marker:
+            network_ids = network_ids[bisect.bisect_right(network_ids,
+                                                          self._sync_marker):]
+        if not page_size or not network_ids:
+            pages = [network_ids]
+        else:
+            pages = [network_ids[i:i + page_size]
+                     for i in xrange(0, len(network_ids), page_size)]
+
         try:
             resource = '/topology'
-            data = {
-                'networks': networks,
-            }
-            ret = self.servers.put(resource, data)
-            if not self.servers.action_success(ret):
-                raise RemoteRestError(ret[2])
+            for index, page in enumerate(pages):
+                data = {
+                    'networks': self._get_topology(admin_context, page),
+                }
+                if page_size:
+                    data['page'] = {'marker': self._sync_marker,
+                                    'last': index == len(pages) - 1}
+                ret = self.servers.put(resource, data)
+                if not self.servers.action_success(ret):
+                    raise RemoteRestError(ret[2])
+                if page:
+                    self._sync_marker = page[-1]
+            self._sync_marker = None
             return ret
         except RemoteRestError as e:
             LOG.error(_('QuantumRestProxy: Unable to update remote network: '
@@ -139,6 +139,15 @@ def get_all_vlanids_used():
         return []
 
 
+def get_all_vlanids_used_list():
+    """Gets the ids of all the vlans used"""
+    LOG.debug(_("get_all_vlanids_used_list() called"))
+    session = db.get_session()
+    return [vlan_id for vlan_id, in
+            session.query(network_models_v2.VlanID.vlan_id).
+            filter_by(vlan_used=True)]
+
+
 def get_all_vlan_bindings():
     """Lists all the vlan to network associations"""
     LOG.debug(_("get_all_vlan_bindings() called"))
@@ -25,6 +25,7 @@ import eventlet
 import logging
 
 from ncclient import manager
+from ncclient import transport
 
 from quantum.plugins.cisco.db import network_db_v2 as cdb
 from quantum.plugins.cisco.nexus import cisco_nexus_snippets as snipp
@@ -37,8 +38,12 @@ class CiscoNEXUSDriver():
     """
     Nexus Driver Main Class
     """
+    # Number of idle NETCONF sessions kept open to each switch
+    MAX_IDLE_SESSIONS = 2
+
     def __init__(self):
-        pass
+        # (host, ssh port, user) -> idle NETCONF sessions to the switch
+        self.sessions = {}
 
     def nxos_connect(self, nexus_host, nexus_ssh_port, nexus_user,
                      nexus_password):
@@ -49,6 +54,59 @@ class CiscoNEXUSDriver():
                               username=nexus_user, password=nexus_password)
         return man
 
+    def _get_session(self, key, nexus_password):
+        """
+        Returns an idle session to the switch, or a new one, and whether it
+        was reused
+        """
+        idle = self.sessions.setdefault(key, [])
+        while idle:
+            man = idle.pop()
+            if man.connected:
+                return man, True
+        nexus_host, nexus_ssh_port, nexus_user = key
+        return self.nxos_connect(nexus_host, nexus_ssh_port, nexus_user,
+                                 nexus_password), False
+
+    def _release_session(self, key, man):
+        idle = self.sessions.setdefault(key, [])
+        if man.connected and len(idle) < self.MAX_IDLE_SESSIONS:
+            idle.append(man)
+        else:
+            self._close_session(man)
+
+    def _close_session(self, man):
+        try:
+            man.close_session()
+        except Exception:
+            LOG.debug(_("NexusDriver: failed to close session"),
+                      exc_info=True)
+
+    def edit_config(self, nexus_host, nexus_user, nexus_password,
+                    nexus_ssh_port, snippets):
+        """
+        Applies the configuration snippets to the Nexus Switch with a
+        single edit_config over a pooled session
+        """
+        confstr = self.create_xml_snippet(''.join(snippets))
+        LOG.debug(_("NexusDriver: %s"), confstr)
+        key = (nexus_host, int(nexus_ssh_port), nexus_user)
+        while True:
+            man, reused = self._get_session(key, nexus_password)
+            try:
+                man.edit_config(target='running', config=confstr)
+            except transport.TransportError:
+                self._close_session(man)
+                if reused:
+                    # The switch closed the idle session, try a new one
+                    continue
+                raise
+            except Exception:
+                self._release_session(key, man)
+                raise
+            self._release_session(key, man)
+            return
+
     def create_xml_snippet(self, cutomized_config):
         """
         Creates the Proper XML structure for the Nexus Switch Configuration
@@ -117,14 +175,14 @@ class CiscoNEXUSDriver():
         Creates a VLAN and Enable on trunk mode an interface on Nexus Switch
         given the VLAN ID and Name and Interface Number
         """
-        man = self.nxos_connect(nexus_host, int(nexus_ssh_port),
-                                nexus_user, nexus_password)
-        self.enable_vlan(man, vlan_id, vlan_name)
         if vlan_ids is '':
             vlan_ids = self.build_vlans_cmd()
         LOG.debug(_("NexusDriver VLAN IDs: %s"), vlan_ids)
-        for ports in nexus_ports:
-            self.enable_vlan_on_trunk_int(man, ports, vlan_ids)
+        snippets = [snipp.CMD_VLAN_CONF_SNIPPET % (vlan_id, vlan_name)]
+        snippets.extend(snipp.CMD_VLAN_INT_SNIPPET % (ports, vlan_ids)
+                        for ports in nexus_ports)
+        self.edit_config(nexus_host, nexus_user, nexus_password,
+                         nexus_ssh_port, snippets)
 
     def delete_vlan(self, vlan_id, nexus_host, nexus_user, nexus_password,
                     nexus_ports, nexus_ssh_port):
@@ -132,42 +190,37 @@ class CiscoNEXUSDriver():
         Delete a VLAN and Disables trunk mode an interface on Nexus Switch
         given the VLAN ID and Interface Number
         """
-        man = self.nxos_connect(nexus_host, int(nexus_ssh_port),
-                                nexus_user, nexus_password)
-        self.disable_vlan(man, vlan_id)
-        for ports in nexus_ports:
-            self.disable_vlan_on_trunk_int(man, ports, vlan_id)
+        snippets = [snipp.CMD_NO_VLAN_CONF_SNIPPET % vlan_id]
+        snippets.extend(snipp.CMD_NO_VLAN_INT_SNIPPET % (ports, vlan_id)
+                        for ports in nexus_ports)
+        self.edit_config(nexus_host, nexus_user, nexus_password,
+                         nexus_ssh_port, snippets)
 
     def build_vlans_cmd(self):
         """
         Builds a string with all the VLANs on the same Switch
         """
-        assigned_vlan = cdb.get_all_vlanids_used()
-        vlans = ''
-        for vlanid in assigned_vlan:
-            vlans = str(vlanid["vlan_id"]) + ',' + vlans
-        if vlans == '':
-            vlans = 'none'
-        return vlans.strip(',')
+        vlans = cdb.get_all_vlanids_used_list()
+        return ','.join(str(vlanid) for vlanid in reversed(vlans)) or 'none'
 
     def add_vlan_int(self, vlan_id, nexus_host, nexus_user, nexus_password,
                      nexus_ports, nexus_ssh_port, vlan_ids=None):
         """
         Adds a vlan from interfaces on the Nexus switch given the VLAN ID
         """
-        man = self.nxos_connect(nexus_host, int(nexus_ssh_port),
-                                nexus_user, nexus_password)
         if not vlan_ids:
             vlan_ids = self.build_vlans_cmd()
-        for ports in nexus_ports:
-            self.enable_vlan_on_trunk_int(man, ports, vlan_ids)
+        snippets = [snipp.CMD_VLAN_INT_SNIPPET % (ports, vlan_ids)
+                    for ports in nexus_ports]
+        self.edit_config(nexus_host, nexus_user, nexus_password,
+                         nexus_ssh_port, snippets)
 
     def remove_vlan_int(self, vlan_id, nexus_host, nexus_user, nexus_password,
                         nexus_ports, nexus_ssh_port):
         """
         Removes a vlan from interfaces on the Nexus switch given the VLAN ID
         """
-        man = self.nxos_connect(nexus_host, int(nexus_ssh_port),
-                                nexus_user, nexus_password)
-        for ports in nexus_ports:
-            self.disable_vlan_on_trunk_int(man, ports, vlan_id)
+        snippets = [snipp.CMD_NO_VLAN_INT_SNIPPET % (ports, vlan_id)
+                    for ports in nexus_ports]
+        self.edit_config(nexus_host, nexus_user, nexus_password,
+                         nexus_ssh_port, snippets)
@@ -32,6 +32,13 @@ class CiscoNEXUSFakeDriver():
         """
         pass
 
+    def edit_config(self, nexus_host, nexus_user, nexus_password,
+                    nexus_ssh_port, snippets):
+        """
+        Applies the configuration snippets to the Nexus Switch
+        """
+        pass
+
     def create_xml_snippet(self, cutomized_config):
         """
         Creates the Proper XML structure for the Nexus Switch Configuration
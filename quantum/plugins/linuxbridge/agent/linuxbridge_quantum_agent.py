@@ -27,6 +27,7 @@ import sys
 import time
 
 import eventlet
+from eventlet.green import select
 import pyudev
 
 from quantum.agent.linux import ip_lib
@@ -54,6 +55,7 @@ BRIDGE_NAME_PLACEHOLDER = "bridge_name"
 BRIDGE_INTERFACES_FS = BRIDGE_FS + BRIDGE_NAME_PLACEHOLDER + "/brif/"
 DEVICE_NAME_PLACEHOLDER = "device_name"
 BRIDGE_PORT_FS_FOR_DEVICE = BRIDGE_FS + DEVICE_NAME_PLACEHOLDER + "/brport"
+BRIDGE_FOR_DEVICE_FS = BRIDGE_PORT_FS_FOR_DEVICE + "/bridge"
 
 
 class LinuxBridgeManager:
@@ -63,17 +65,12 @@ class LinuxBridgeManager:
         self.ip = ip_lib.IPWrapper(self.root_helper)
 
         self.udev = pyudev.Context()
-        monitor = pyudev.Monitor.from_netlink(self.udev)
-        monitor.filter_by('net')
+        self.udev_monitor = pyudev.Monitor.from_netlink(self.udev)
+        self.udev_monitor.filter_by('net')
 
     def device_exists(self, device):
         """Check if ethernet device exists."""
-        try:
-            utils.execute(['ip', 'link', 'show', 'dev', device],
-                          root_helper=self.root_helper)
-        except RuntimeError:
-            return False
-        return True
+        return ip_lib.device_exists(device)
 
     def interface_exists_on_bridge(self, bridge, interface):
         directory = '/sys/class/net/%s/brif' % bridge
@@ -118,12 +115,16 @@ class LinuxBridgeManager:
             return os.listdir(bridge_interface_path)
 
     def get_bridge_for_tap_device(self, tap_device_name):
-        bridges = self.get_all_quantum_bridges()
-        for bridge in bridges:
-            interfaces = self.get_interfaces_on_bridge(bridge)
-            if tap_device_name in interfaces:
-                return bridge
-
+        # The brport/bridge link of a bridged device points to its bridge,
+        # no need to look through the interfaces of every bridge
+        bridge_path = BRIDGE_FOR_DEVICE_FS.replace(DEVICE_NAME_PLACEHOLDER,
+                                                   tap_device_name)
+        try:
+            bridge = os.path.basename(os.readlink(bridge_path))
+        except OSError:
+            return None
+        if bridge.startswith(BRIDGE_NAME_PREFIX):
+            return bridge
         return None
 
     def is_device_on_bridge(self, device_name):
@@ -375,6 +376,47 @@ class LinuxBridgeManager:
                 'added': added,
                 'removed': removed}
 
+    def update_devices_from_events(self, registered_devices):
+        added, removed = self.udev_get_device_events()
+        added -= registered_devices
+        removed &= registered_devices
+        if not added and not removed:
+            return
+        return {'current': (registered_devices | added) - removed,
+                'added': added,
+                'removed': removed}
+
+    def udev_start_monitor(self):
+        self.udev_monitor.start()
+
+    def udev_wait_for_events(self, timeout):
+        """Wait at most timeout seconds for udev events to be pending."""
+        select.select([self.udev_monitor], [], [], timeout)
+
+    def udev_get_device_events(self):
+        """Consume the pending udev events.
+
+        Returns the sets of tap devices added and removed since the last
+        call, a device both added and removed being reported as per its
+        last event.
+        """
+        added = set()
+        removed = set()
+        while True:
+            device = self.udev_monitor.poll(timeout=0)
+            if device is None:
+                break
+            name = self.udev_get_name(device)
+            if not self.is_tap_device(name):
+                continue
+            if device.action == 'add':
+                added.add(name)
+                removed.discard(name)
+            elif device.action == 'remove':
+                removed.add(name)
+                added.discard(name)
+        return added, removed
+
     def udev_get_tap_devices(self):
         devices = set()
         for device in self.udev.list_devices(subsystem='net'):
@@ -413,8 +455,7 @@ class LinuxBridgeRpcCallbacks(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
         # Check port exists on node
         port = kwargs.get('port')
         tap_device_name = self.agent.br_mgr.get_tap_device_name(port['id'])
-        devices = self.agent.br_mgr.udev_get_tap_devices()
-        if tap_device_name not in devices:
+        if not self.agent.br_mgr.device_exists(tap_device_name):
             return
 
         if 'security_groups' in port:
@@ -458,9 +499,12 @@ class LinuxBridgePluginApi(agent_rpc.PluginApi,
 class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
 
     def __init__(self, interface_mappings, polling_interval,
-                 root_helper):
+                 root_helper, udev_event_monitoring=False,
+                 reconcile_interval=60):
         self.polling_interval = polling_interval
         self.root_helper = root_helper
+        self.udev_event_monitoring = udev_event_monitoring
+        self.reconcile_interval = reconcile_interval
         self.setup_linux_bridge(interface_mappings)
         self.setup_rpc(interface_mappings.values())
         self.init_firewall()
@@ -570,14 +614,27 @@ class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
 
         LOG.info(_("LinuxBridge Agent RPC Daemon Started!"))
 
+        if self.udev_event_monitoring:
+            # Started before the first listing so that no event is missed
+            self.br_mgr.udev_start_monitor()
+        next_reconcile = 0
+
         while True:
             start = time.time()
             if sync:
                 LOG.info(_("Agent out of sync with plugin!"))
                 devices.clear()
                 sync = False
+                next_reconcile = 0
 
-            device_info = self.br_mgr.update_devices(devices)
+            if self.udev_event_monitoring and start < next_reconcile:
+                device_info = self.br_mgr.update_devices_from_events(devices)
+            else:
+                if self.udev_event_monitoring:
+                    # The listing below covers the pending events
+                    self.br_mgr.udev_get_device_events()
+                    next_reconcile = start + self.reconcile_interval
+                device_info = self.br_mgr.update_devices(devices)
 
             # notify plugin about device deltas
             if device_info:
@@ -589,7 +646,12 @@ class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
             # sleep till end of polling interval
             elapsed = (time.time() - start)
             if (elapsed < self.polling_interval):
-                time.sleep(self.polling_interval - elapsed)
+                if self.udev_event_monitoring:
+                    # Process device deltas as soon as they are notified
+                    self.br_mgr.udev_wait_for_events(
+                        self.polling_interval - elapsed)
+                else:
+                    time.sleep(self.polling_interval - elapsed)
             else:
                 LOG.debug(_("Loop iteration exceeded interval "
                             "(%(polling_interval)s vs. %(elapsed)s)!"),
@@ -613,9 +675,12 @@ def main():
 
     polling_interval = cfg.CONF.AGENT.polling_interval
     root_helper = cfg.CONF.AGENT.root_helper
-    plugin = LinuxBridgeQuantumAgentRPC(interface_mappings,
-                                        polling_interval,
-                                        root_helper)
+    plugin = LinuxBridgeQuantumAgentRPC(
+        interface_mappings,
+        polling_interval,
+        root_helper,
+        udev_event_monitoring=cfg.CONF.AGENT.udev_event_monitoring,
+        reconcile_interval=cfg.CONF.AGENT.reconcile_interval)
     LOG.info(_("Agent initialized successfully, now running... "))
     plugin.daemon_loop()
     sys.exit(0)
@@ -44,6 +44,12 @@ agent_opts = [
     cfg.IntOpt('polling_interval', default=2,
                help=_("The number of seconds the agent will wait between "
                       "polling for local device changes.")),
+    cfg.BoolOpt('udev_event_monitoring', default=False,
+                help=_("Detect tap devices from udev add/remove events "
+                       "instead of listing all devices on every poll.")),
+    cfg.IntOpt('reconcile_interval', default=60,
+               help=_("With udev_event_monitoring, the number of seconds "
+                      "between full listings of the local devices.")),
 ]
 
 
@@ -202,8 +202,7 @@ class MetaPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
             del net['id']
         return net
 
-    def get_networks_with_flavor(self, context, filters=None,
-                                 fields=None):
+    def _get_networks_with_flavor_query(self, context, filters=None):
         collection = self._model_query(context, models_v2.Network)
         model = NetworkFlavor
         collection = collection.join(model,
@@ -216,14 +215,58 @@ class MetaPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
                     column = getattr(models_v2.Network, key, None)
                 if column:
                     collection = collection.filter(column.in_(value))
+        return collection
+
+    def get_networks_with_flavor(self, context, filters=None,
+                                 fields=None):
+        collection = self._get_networks_with_flavor_query(context, filters)
         return [self._make_network_dict(c, fields) for c in collection.all()]
 
+    def _get_external_network_ids(self, context, net_ids):
+        if not net_ids:
+            return set()
+        query = context.session.query(l3_db.ExternalNetwork.network_id)
+        query = query.filter(l3_db.ExternalNetwork.network_id.in_(net_ids))
+        return set([row[0] for row in query.all()])
+
     def get_networks(self, context, filters=None, fields=None):
-        nets = self.get_networks_with_flavor(context, filters, None)
-        if filters:
-            nets = self._filter_nets_l3(context, nets, filters)
-        nets = [self.get_network(context, net['id'], fields)
-                for net in nets]
+        # Resolve the flavor of every matching network with a single join
+        # and ask each sub-plugin once for all of its networks, rather than
+        # going through get_network for each of them.
+        query = self._get_networks_with_flavor_query(context, filters)
+        query = query.add_columns(NetworkFlavor.flavor)
+        bindings = [(net.id, flavor) for net, flavor in query.all()]
+        ext_net_ids = self._get_external_network_ids(
+            context, [net_id for net_id, flavor in bindings])
+        vals = filters and filters.get('router:external', [])
+        if vals:
+            bindings = [(net_id, flavor) for net_id, flavor in bindings
+                        if (net_id in ext_net_ids) == bool(vals[0])]
+
+        sub_fields = fields and list(set(fields) | set(['id']))
+        net_ids_by_flavor = {}
+        for net_id, flavor in bindings:
+            net_ids_by_flavor.setdefault(flavor, []).append(net_id)
+        nets_by_id = {}
+        for flavor, net_ids in net_ids_by_flavor.iteritems():
+            plugin = self._get_plugin(flavor)
+            for net in plugin.get_networks(context, {'id': net_ids},
+                                           sub_fields):
+                nets_by_id[net['id']] = net
+
+        nets = []
+        for net_id, flavor in bindings:
+            if net_id not in nets_by_id:
+                continue
+            net = nets_by_id[net_id]
+            if ((not fields or 'router:external' in fields) and
+                    self._check_l3_view_auth(context, net)):
+                net['router:external'] = net_id in ext_net_ids
+            if not fields or FLAVOR_NETWORK in fields:
+                net[FLAVOR_NETWORK] = flavor
+            if fields and 'id' not in fields:
+                del net['id']
+            nets.append(net)
         return nets
 
     def _get_flavor_by_network_id(self, context, network_id):
@@ -318,8 +361,7 @@ class MetaPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
             self._extend_router_dict(context, router)
         return router
 
-    def get_routers_with_flavor(self, context, filters=None,
-                                fields=None):
+    def _get_routers_with_flavor_query(self, context, filters=None):
         collection = self._model_query(context, l3_db.Router)
         r_model = RouterFlavor
         collection = collection.join(r_model,
@@ -332,11 +374,37 @@ class MetaPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
                     column = getattr(l3_db.Router, key, None)
                 if column:
                     collection = collection.filter(column.in_(value))
+        return collection
+
+    def get_routers_with_flavor(self, context, filters=None,
+                                fields=None):
+        collection = self._get_routers_with_flavor_query(context, filters)
         return [self._make_router_dict(c, fields) for c in collection.all()]
 
     def get_routers(self, context, filters=None, fields=None):
-        routers = self.get_routers_with_flavor(context, filters,
-                                               None)
-        return [self.get_router(context, router['id'],
-                                fields)
-                for router in routers]
+        query = self._get_routers_with_flavor_query(context, filters)
+        query = query.add_columns(RouterFlavor.flavor)
+        bindings = [(router.id, flavor) for router, flavor in query.all()]
+
+        sub_fields = fields and list(set(fields) | set(['id']))
+        router_ids_by_flavor = {}
+        for router_id, flavor in bindings:
+            router_ids_by_flavor.setdefault(flavor, []).append(router_id)
+        routers_by_id = {}
+        for flavor, router_ids in router_ids_by_flavor.iteritems():
+            plugin = self._get_l3_plugin(flavor)
+            for router in plugin.get_routers(context, {'id': router_ids},
+                                             sub_fields):
+                routers_by_id[router['id']] = router
+
+        routers = []
+        for router_id, flavor in bindings:
+            if router_id not in routers_by_id:
+                continue
+            router = routers_by_id[router_id]
+            if not fields or FLAVOR_ROUTER in fields:
+                router[FLAVOR_ROUTER] = flavor
+            if fields and 'id' not in fields:
+                del router['id']
+            routers.append(router)
+        return routers
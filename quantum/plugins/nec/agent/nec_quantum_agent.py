@@ -39,15 +39,19 @@ LOG = logging.getLogger(__name__)
 
 class NECQuantumAgent(object):
 
-    def __init__(self, integ_br, root_helper, polling_interval):
+    def __init__(self, integ_br, root_helper, polling_interval,
+                 port_update_chunk_size=100):
         '''Constructor.
 
         :param integ_br: name of the integration bridge.
         :param root_helper: utility to use when running shell cmds.
         :param polling_interval: interval (secs) to check the bridge.
+        :param port_update_chunk_size: maximum number of added and of
+               removed ports sent in one update_ports call.
         '''
         self.int_br = ovs_lib.OVSBridge(integ_br, root_helper)
         self.polling_interval = polling_interval
+        self.port_update_chunk_size = port_update_chunk_size
 
         self.host = socket.gethostname()
         self.agent_id = 'nec-q-agent.%s' % self.host
@@ -73,37 +77,45 @@ class NECQuantumAgent(object):
                                'port_removed': port_removed}})
         except Exception as e:
             LOG.warn(_("update_ports() failed."))
-            return
+            return False
+        return True
 
     def _vif_port_to_port_info(self, vif_port):
         return dict(id=vif_port.vif_id, port_no=vif_port.ofport,
                     mac=vif_port.vif_mac)
 
+    def process_port_changes(self, old_ports):
+        """Report the ports added to and removed from the bridge.
+
+        :param old_ports: ids of the ports already reported.
+        :returns: ids of the ports reported after this call.
+        """
+        vif_ports = self.int_br.get_vif_port_map()
+        port_added = [self._vif_port_to_port_info(vif_ports[port_id])
+                      for port_id in set(vif_ports) - old_ports]
+        port_removed = list(old_ports - set(vif_ports))
+
+        if not port_added and not port_removed:
+            LOG.debug(_("No port changed."))
+            return old_ports
+
+        # Changes not reported because of a failure are retried next time
+        reported_ports = set(old_ports)
+        size = self.port_update_chunk_size
+        for i in xrange(0, max(len(port_added), len(port_removed)), size):
+            added = port_added[i:i + size]
+            removed = port_removed[i:i + size]
+            if not self.update_ports(added, removed):
+                break
+            reported_ports.update(port['id'] for port in added)
+            reported_ports.difference_update(removed)
+        return reported_ports
+
     def daemon_loop(self):
         """Main processing loop for NEC Plugin Agent."""
-        old_ports = []
+        old_ports = set()
         while True:
-            new_ports = []
-
-            port_added = []
-            for vif_port in self.int_br.get_vif_ports():
-                port_id = vif_port.vif_id
-                new_ports.append(port_id)
-                if port_id not in old_ports:
-                    port_info = self._vif_port_to_port_info(vif_port)
-                    port_added.append(port_info)
-
-            port_removed = []
-            for port_id in old_ports:
-                if port_id not in new_ports:
-                    port_removed.append(port_id)
-
-            if port_added or port_removed:
-                self.update_ports(port_added, port_removed)
-            else:
-                LOG.debug(_("No port changed."))
-
-            old_ports = new_ports
+            old_ports = self.process_port_changes(old_ports)
             time.sleep(self.polling_interval)
 
 
@@ -116,8 +128,10 @@ def main():
     integ_br = config.OVS.integration_bridge
     root_helper = config.AGENT.root_helper
     polling_interval = config.AGENT.polling_interval
+    port_update_chunk_size = config.AGENT.port_update_chunk_size
 
-    agent = NECQuantumAgent(integ_br, root_helper, polling_interval)
+    agent = NECQuantumAgent(integ_br, root_helper, polling_interval,
+                            port_update_chunk_size)
 
     # Start everything.
     agent.daemon_loop()
@@ -30,6 +30,9 @@ agent_opts = [
     cfg.IntOpt('polling_interval', default=2,
                help=_("The number of seconds the agent will wait between "
                       "polling for local device changes.")),
+    cfg.IntOpt('port_update_chunk_size', default=100,
+               help=_("Maximum number of added and of removed ports sent "
+                      "to the plugin in a single update.")),
 ]
 
 ofc_opts = [
@@ -47,6 +50,9 @@ ofc_opts = [
                help=_("Key file")),
     cfg.StrOpt('cert_file', default=None,
                help=_("Certificate file")),
+    cfg.IntOpt('pool_size', default=4,
+               help=_("Maximum number of concurrent requests and of idle "
+                      "persistent connections to the OFC")),
 ]
 
 
@@ -19,6 +19,9 @@ import httplib
 import json
 import socket
 
+from eventlet import semaphore
+
+from quantum.common import utils
 from quantum.openstack.common import log as logging
 from quantum.plugins.nec.common import exceptions as nexc
 
@@ -30,7 +33,7 @@ class OFCClient(object):
     """A HTTP/HTTPS client for OFC Drivers"""
 
     def __init__(self, host="127.0.0.1", port=8888, use_ssl=False,
-                 key_file=None, cert_file=None):
+                 key_file=None, cert_file=None, pool_size=4):
         """Creates a new client to some OFC.
 
         :param host: The host where service resides
@@ -38,13 +41,18 @@ class OFCClient(object):
         :param use_ssl: True to use SSL, False to use HTTP
         :param key_file: The SSL key file to use if use_ssl is true
         :param cert_file: The SSL cert file to use if use_ssl is true
+        :param pool_size: The maximum number of requests in flight and of
+                          idle connections kept open to the OFC
         """
         self.host = host
         self.port = port
         self.use_ssl = use_ssl
         self.key_file = key_file
         self.cert_file = cert_file
-        self.connection = None
+        self.pool_size = pool_size
+        # Idle keep-alive connections to the OFC
+        self.connections = []
+        self.semaphore = semaphore.Semaphore(pool_size)
 
     def get_connection_type(self):
         """Returns the proper connection type"""
@@ -53,6 +61,48 @@ class OFCClient(object):
         else:
             return httplib.HTTPConnection
 
+    def _new_connection(self):
+        connection_type = self.get_connection_type()
+        # Open connection, handling SSL certs
+        certs = {'key_file': self.key_file, 'cert_file': self.cert_file}
+        certs = dict((x, certs[x]) for x in certs if certs[x] is not None)
+        if self.use_ssl and len(certs):
+            return connection_type(self.host, self.port, **certs)
+        return connection_type(self.host, self.port)
+
+    def _release_connection(self, conn, res):
+        if res.will_close or len(self.connections) >= self.pool_size:
+            conn.close()
+        else:
+            self.connections.append(conn)
+
+    def close_connections(self):
+        """Close the idle connections to the OFC."""
+        while self.connections:
+            self.connections.pop().close()
+
+    def _send_request(self, method, action, body, headers):
+        while True:
+            reused = bool(self.connections)
+            if reused:
+                conn = self.connections.pop()
+            else:
+                conn = self._new_connection()
+            sent = False
+            try:
+                conn.request(method, action, body, headers)
+                sent = True
+                res = conn.getresponse()
+                data = res.read()
+            except (socket.error, IOError, httplib.HTTPException), e:
+                conn.close()
+                if reused and utils.can_resend_http_request(method, sent, e):
+                    # The OFC closed the idle connection, try again
+                    continue
+                raise
+            self._release_connection(conn, res)
+            return res, data
+
     def do_request(self, method, action, body=None):
         LOG.debug(_("Client request: %(method)s %(action)s [%(body)s]"),
                   locals())
@@ -60,18 +110,9 @@ class OFCClient(object):
         if type(body) is dict:
             body = json.dumps(body)
         try:
-            connection_type = self.get_connection_type()
             headers = {"Content-Type": "application/json"}
-            # Open connection and send request, handling SSL certs
-            certs = {'key_file': self.key_file, 'cert_file': self.cert_file}
-            certs = dict((x, certs[x]) for x in certs if certs[x] is not None)
-            if self.use_ssl and len(certs):
-                conn = connection_type(self.host, self.port, **certs)
-            else:
-                conn = connection_type(self.host, self.port)
-            conn.request(method, action, body, headers)
-            res = conn.getresponse()
-            data = res.read()
+            with self.semaphore:
+                res, data = self._send_request(method, action, body, headers)
             LOG.debug(_("OFC returns [%(status)s:%(data)s]"),
                       {'status': res.status,
                        'data': data})
@@ -84,9 +125,10 @@ class OFCClient(object):
             else:
                 reason = _("An operation on OFC is failed.")
                 raise nexc.OFCException(reason=reason)
-        except (socket.error, IOError), e:
+        except (socket.error, IOError, httplib.HTTPException), e:
             reason = _("Failed to connect OFC : %s") % str(e)
             LOG.error(reason)
+            self.close_connections()
             raise nexc.OFCException(reason=reason)
 
     def get(self, action):
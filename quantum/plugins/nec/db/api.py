@@ -58,6 +58,16 @@ def find_ofc_item(model, quantum_id):
         return None
 
 
+def find_ofc_items(model, quantum_ids):
+    """Return a dict of the ofc items of the given quantum ids."""
+    if not quantum_ids:
+        return {}
+    session = db.get_session()
+    query = (session.query(model).
+             filter(model.quantum_id.in_(quantum_ids)))
+    return dict((item.quantum_id, item) for item in query)
+
+
 def add_ofc_item(model, id, quantum_id):
     session = db.get_session()
     try:
@@ -93,6 +103,16 @@ def get_portinfo(id):
         return None
 
 
+def get_portinfos(ids):
+    """Return a dict of the portinfos of the given port ids."""
+    if not ids:
+        return {}
+    session = db.get_session()
+    query = (session.query(nmodels.PortInfo).
+             filter(nmodels.PortInfo.id.in_(ids)))
+    return dict((portinfo.id, portinfo) for portinfo in query)
+
+
 def add_portinfo(id, datapath_id='', port_no=0, vlan_id=OFP_VLAN_NONE, mac=''):
     session = db.get_session()
     try:
@@ -117,3 +137,30 @@ def del_portinfo(id):
     except sa.orm.exc.NoResultFound:
         LOG.warning(_("del_portinfo(): NotFound portinfo for "
                       "port_id: %s"), id)
+
+
+def add_portinfos(portinfos):
+    """Add portinfos given as dicts of PortInfo attributes in one flush."""
+    session = db.get_session()
+    try:
+        with session.begin(subtransactions=True):
+            items = []
+            for info in portinfos:
+                info = dict(info)
+                info.setdefault('vlan_id', OFP_VLAN_NONE)
+                items.append(nmodels.PortInfo(**info))
+            session.add_all(items)
+    except Exception as exc:
+        LOG.exception(exc)
+        raise nexc.NECDBException
+    return items
+
+
+def del_portinfos(ids):
+    if not ids:
+        return
+    session = db.get_session()
+    with session.begin(subtransactions=True):
+        (session.query(nmodels.PortInfo).
+         filter(nmodels.PortInfo.id.in_(ids)).
+         delete(synchronize_session=False))
@@ -34,7 +34,8 @@ class PFCDriver(ofc_driver_base.OFCDriverBase):
                                            port=conf_ofc.port,
                                            use_ssl=conf_ofc.use_ssl,
                                            key_file=conf_ofc.key_file,
-                                           cert_file=conf_ofc.cert_file)
+                                           cert_file=conf_ofc.cert_file,
+                                           pool_size=conf_ofc.pool_size)
 
     @classmethod
     def filter_supported(cls):
@@ -28,7 +28,8 @@ class TremaDriverBase(ofc_driver_base.OFCDriverBase):
     def __init__(self, conf_ofc):
         # Trema sliceable REST API does not support HTTPS
         self.client = ofc_client.OFCClient(host=conf_ofc.host,
-                                           port=conf_ofc.port)
+                                           port=conf_ofc.port,
+                                           pool_size=conf_ofc.pool_size)
 
     def create_tenant(self, description, tenant_id=None):
         return tenant_id or uuidutils.generate_uuid()
@@ -21,6 +21,7 @@ from quantum import context
 from quantum.db import dhcp_rpc_base
 from quantum.db import l3_db
 from quantum.db import l3_rpc_base
+from quantum.db import models_v2
 #NOTE(amotoki): quota_db cannot be removed, it is for db model
 from quantum.db import quota_db
 from quantum.extensions import portbindings
@@ -103,6 +104,21 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
         obj_updater = getattr(super(NECPluginV2, self), "update_%s" % resource)
         obj_updater(context, id, request)
 
+    def _update_ports_status(self, context, port_statuses):
+        """Update status of ports with one UPDATE per status.
+
+        :param port_statuses: a list of (port, status) pairs
+        """
+        ids_by_status = {}
+        for port, status in port_statuses:
+            ids_by_status.setdefault(status, []).append(port['id'])
+        session = context.session
+        with session.begin(subtransactions=True):
+            for status, ids in ids_by_status.iteritems():
+                (session.query(models_v2.Port).
+                 filter(models_v2.Port.id.in_(ids)).
+                 update({'status': status}, synchronize_session='fetch'))
+
     def activate_port_if_ready(self, context, port, network=None):
         """Activate port by creating port on OFC if ready.
 
@@ -112,81 +128,121 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
             * network admin_state is UP
             * portinfo are available (to identify port on OFC)
         """
-        if not network:
-            network = super(NECPluginV2, self).get_network(context,
-                                                           port['network_id'])
-
-        port_status = OperationalStatus.ACTIVE
-        if not port['admin_state_up']:
-            LOG.debug(_("activate_port_if_ready(): skip, "
-                        "port.admin_state_up is False."))
-            port_status = OperationalStatus.DOWN
-        elif not network['admin_state_up']:
-            LOG.debug(_("activate_port_if_ready(): skip, "
-                        "network.admin_state_up is False."))
-            port_status = OperationalStatus.DOWN
-        elif not ndb.get_portinfo(port['id']):
-            LOG.debug(_("activate_port_if_ready(): skip, "
-                        "no portinfo for this port."))
-            port_status = OperationalStatus.DOWN
+        networks = network and {port['network_id']: network}
+        self.activate_ports_if_ready(context, [port], networks)
 
-        # activate packet_filters before creating port on OFC.
-        if self.packet_filter_enabled:
-            if port_status is OperationalStatus.ACTIVE:
-                filters = dict(in_port=[port['id']],
-                               status=[OperationalStatus.DOWN],
-                               admin_state_up=[True])
-                pfs = (super(NECPluginV2, self).
-                       get_packet_filters(context, filters=filters))
-                for pf in pfs:
-                    self._activate_packet_filter_if_ready(context, pf,
-                                                          network=network,
-                                                          in_port=port)
+    def activate_ports_if_ready(self, context, ports, networks=None):
+        """Activate ports by creating them on OFC if ready.
+
+        The networks, portinfos, ofc_ports and packet_filters of the ports
+        are each loaded with a single query and the ports are created on
+        OFC concurrently. See activate_port_if_ready() for the conditions.
+
+        :param networks: an optional dict of networks of the ports by id
+        """
+        if not ports:
+            return
+        networks = dict(networks or {})
+        net_ids = set(port['network_id'] for port in ports) - set(networks)
+        if net_ids:
+            filters = dict(id=list(net_ids))
+            for net in super(NECPluginV2, self).get_networks(context,
+                                                             filters=filters):
+                networks[net['id']] = net
+        portinfos = ndb.get_portinfos([port['id'] for port in ports])
+
+        statuses = {}
+        for port in ports:
+            port_status = OperationalStatus.ACTIVE
+            if not port['admin_state_up']:
+                LOG.debug(_("activate_port_if_ready(): skip, "
+                            "port.admin_state_up is False."))
+                port_status = OperationalStatus.DOWN
+            elif not networks[port['network_id']]['admin_state_up']:
+                LOG.debug(_("activate_port_if_ready(): skip, "
+                            "network.admin_state_up is False."))
+                port_status = OperationalStatus.DOWN
+            elif port['id'] not in portinfos:
+                LOG.debug(_("activate_port_if_ready(): skip, "
+                            "no portinfo for this port."))
+                port_status = OperationalStatus.DOWN
+            statuses[port['id']] = port_status
+        active_ports = dict(
+            (port['id'], port) for port in ports
+            if statuses[port['id']] is OperationalStatus.ACTIVE)
 
-        if port_status in [OperationalStatus.ACTIVE]:
-            if self.ofc.exists_ofc_port(port['id']):
+        # activate packet_filters before creating port on OFC.
+        if self.packet_filter_enabled and active_ports:
+            filters = dict(in_port=active_ports.keys(),
+                           status=[OperationalStatus.DOWN],
+                           admin_state_up=[True])
+            pfs = (super(NECPluginV2, self).
+                   get_packet_filters(context, filters=filters))
+            for pf in pfs:
+                self._activate_packet_filter_if_ready(
+                    context, pf, network=networks.get(pf['network_id']),
+                    in_port=active_ports[pf['in_port']])
+
+        ofc_ports = self.ofc.exists_ofc_ports(active_ports.keys())
+        new_ports = []
+        for port_id, port in active_ports.iteritems():
+            if port_id in ofc_ports:
                 LOG.debug(_("activate_port_if_ready(): skip, "
                             "ofc_port already exists."))
             else:
-                try:
-                    self.ofc.create_ofc_port(port['tenant_id'],
-                                             port['network_id'],
-                                             port['id'])
-                except (nexc.OFCException, nexc.OFCConsistencyBroken) as exc:
-                    reason = _("create_ofc_port() failed due to %s") % exc
-                    LOG.error(reason)
-                    port_status = OperationalStatus.ERROR
+                new_ports.append(port)
+        errors = self.ofc.create_ofc_ports(
+            [(port['tenant_id'], port['network_id'], port['id'],
+              portinfos[port['id']]) for port in new_ports])
+        for port_id, exc in errors.iteritems():
+            if not isinstance(exc, (nexc.OFCException,
+                                    nexc.OFCConsistencyBroken)):
+                raise exc
+            reason = _("create_ofc_port() failed due to %s") % exc
+            LOG.error(reason)
+            statuses[port_id] = OperationalStatus.ERROR
 
-        if port_status is not port['status']:
-            self._update_resource_status(context, "port", port['id'],
-                                         port_status)
+        self._update_ports_status(context, [(port, statuses[port['id']])
+                                            for port in ports])
 
     def deactivate_port(self, context, port):
         """Deactivate port by deleting port from OFC if exists.
 
         Deactivate port and packet_filters associated with the port.
         """
-        port_status = OperationalStatus.DOWN
-        if self.ofc.exists_ofc_port(port['id']):
-            try:
-                self.ofc.delete_ofc_port(port['tenant_id'],
-                                         port['network_id'],
-                                         port['id'])
-            except (nexc.OFCException, nexc.OFCConsistencyBroken) as exc:
-                reason = _("delete_ofc_port() failed due to %s") % exc
-                LOG.error(reason)
-                port_status = OperationalStatus.ERROR
-        else:
-            LOG.debug(_("deactivate_port(): skip, ofc_port does not "
-                        "exist."))
+        self.deactivate_ports(context, [port])
+
+    def deactivate_ports(self, context, ports):
+        """Deactivate ports by deleting them from OFC concurrently."""
+        if not ports:
+            return
+        port_ids = [port['id'] for port in ports]
+        ofc_ports = self.ofc.exists_ofc_ports(port_ids)
+        statuses = dict.fromkeys(port_ids, OperationalStatus.DOWN)
+        old_ports = []
+        for port in ports:
+            if port['id'] in ofc_ports:
+                old_ports.append(port)
+            else:
+                LOG.debug(_("deactivate_port(): skip, ofc_port does not "
+                            "exist."))
+        errors = self.ofc.delete_ofc_ports(
+            [(port['tenant_id'], port['network_id'], port['id'])
+             for port in old_ports])
+        for port_id, exc in errors.iteritems():
+            if not isinstance(exc, (nexc.OFCException,
+                                    nexc.OFCConsistencyBroken)):
+                raise exc
+            reason = _("delete_ofc_port() failed due to %s") % exc
+            LOG.error(reason)
+            statuses[port_id] = OperationalStatus.ERROR
 
-        if port_status is not port['status']:
-            self._update_resource_status(context, "port", port['id'],
-                                         port_status)
+        self._update_ports_status(context, [(port, statuses[port['id']])
+                                            for port in ports])
 
         # deactivate packet_filters after the port has deleted from OFC.
         if self.packet_filter_enabled:
-            filters = dict(in_port=[port['id']],
+            filters = dict(in_port=port_ids,
                            status=[OperationalStatus.ACTIVE])
             pfs = super(NECPluginV2, self).get_packet_filters(context,
                                                               filters=filters)
@@ -247,8 +303,7 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
             filters = dict(network_id=[id], status=[OperationalStatus.ACTIVE])
             ports = super(NECPluginV2, self).get_ports(context,
                                                        filters=filters)
-            for port in ports:
-                self.deactivate_port(context, port)
+            self.deactivate_ports(context, ports)
             if self.packet_filter_enabled:
                 pfs = (super(NECPluginV2, self).
                        get_packet_filters(context, filters=filters))
@@ -262,8 +317,7 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
                            admin_state_up=[True])
             ports = super(NECPluginV2, self).get_ports(context,
                                                        filters=filters)
-            for port in ports:
-                self.activate_port_if_ready(context, port, new_net)
+            self.activate_ports_if_ready(context, ports, {id: new_net})
             if self.packet_filter_enabled:
                 pfs = (super(NECPluginV2, self).
                        get_packet_filters(context, filters=filters))
@@ -557,19 +611,22 @@ class NECPluginV2RPCCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         """
         LOG.debug(_("NECPluginV2RPCCallbacks.update_ports() called, "
                     "kwargs=%s ."), kwargs)
-        topic = kwargs['topic']
         datapath_id = kwargs['datapath_id']
-        for p in kwargs.get('port_added', []):
-            id = p['id']
-            port = self.plugin.get_port(rpc_context, id)
-            if port and ndb.get_portinfo(id):
-                ndb.del_portinfo(id)
-                self.plugin.deactivate_port(rpc_context, port)
-            ndb.add_portinfo(id, datapath_id, p['port_no'],
-                             mac=p.get('mac', ''))
-            self.plugin.activate_port_if_ready(rpc_context, port)
-        for id in kwargs.get('port_removed', []):
-            port = self.plugin.get_port(rpc_context, id)
-            if port and ndb.get_portinfo(id):
-                ndb.del_portinfo(id)
-                self.plugin.deactivate_port(rpc_context, port)
+        added = dict((p['id'], p) for p in kwargs.get('port_added', []))
+        removed = kwargs.get('port_removed', [])
+        ids = list(set(added) | set(removed))
+        if not ids:
+            return
+        ports = dict((port['id'], port) for port in
+                     self.plugin.get_ports(rpc_context, filters={'id': ids}))
+        # ports reported again or removed lose their current portinfo
+        stale_ids = ndb.get_portinfos(ids).keys()
+        ndb.del_portinfos(stale_ids)
+        self.plugin.deactivate_ports(rpc_context,
+                                     [ports[id] for id in stale_ids
+                                      if id in ports])
+        ndb.add_portinfos([dict(id=id, datapath_id=datapath_id,
+                                port_no=p['port_no'], mac=p.get('mac', ''))
+                           for id, p in added.iteritems()])
+        self.plugin.activate_ports_if_ready(
+            rpc_context, [ports[id] for id in added if id in ports])
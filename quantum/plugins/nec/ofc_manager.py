@@ -15,6 +15,8 @@
 #    under the License.
 # @author: Ryota MIBU
 
+import eventlet
+
 from quantum.plugins.nec.common import config
 from quantum.plugins.nec.common import exceptions as nexc
 from quantum.plugins.nec.db import api as ndb
@@ -38,6 +40,36 @@ class OFCManager(object):
 
     def __init__(self):
         self.driver = drivers.get_driver(config.OFC.driver)(config.OFC)
+        self.pool = eventlet.GreenPool(config.OFC.pool_size)
+
+    def _spawn_all(self, calls):
+        threads = [self.pool.spawn(func, *args) for func, args in calls]
+        results = []
+        for thread in threads:
+            try:
+                results.append(thread.wait())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def run_concurrently(self, calls):
+        """Run independent OFC requests concurrently.
+
+        The calls run in greenthreads of the pool and must not use the
+        database: a session cannot be shared across greenthreads, so look
+        up and record the OFC ids in the calling greenthread instead.
+
+        :param calls: a list of (function, args) tuples, e.g.
+                      [(self.driver.delete_tenant, (ofc_tenant_id,))]
+        :returns: the list of the results in the order of calls
+        :raises: the first exception raised by a call, once all of the
+                 calls have finished
+        """
+        results = self._spawn_all(calls)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
 
     def _get_ofc_id(self, resource, quantum_id):
         model = self.resource_map[resource]
@@ -55,6 +87,24 @@ class OFCManager(object):
         else:
             return False
 
+    def _exists_ofc_items(self, resource, quantum_ids):
+        model = self.resource_map[resource]
+        return set(ndb.find_ofc_items(model, quantum_ids))
+
+    def _get_ofc_ids(self, resource, quantum_ids):
+        model = self.resource_map[resource]
+        items = ndb.find_ofc_items(model, list(set(quantum_ids)))
+        return dict((quantum_id, item.id)
+                    for quantum_id, item in items.iteritems())
+
+    def _lookup_ofc_id(self, ofc_ids, resource, quantum_id):
+        try:
+            return ofc_ids[quantum_id]
+        except KeyError:
+            reason = _("NotFound %(resource)s for "
+                       "quantum_id=%(quantum_id)s.") % locals()
+            raise nexc.OFCConsistencyBroken(reason=reason)
+
     # Tenant
 
     def create_ofc_tenant(self, tenant_id):
@@ -100,10 +150,11 @@ class OFCManager(object):
 
     # Port
 
-    def create_ofc_port(self, tenant_id, network_id, port_id):
+    def create_ofc_port(self, tenant_id, network_id, port_id, portinfo=None):
         ofc_tenant_id = self._get_ofc_id("ofc_tenant", tenant_id)
         ofc_net_id = self._get_ofc_id("ofc_network", network_id)
-        portinfo = ndb.get_portinfo(port_id)
+        if not portinfo:
+            portinfo = ndb.get_portinfo(port_id)
         if not portinfo:
             raise nexc.PortInfoNotFound(id=port_id)
 
@@ -111,9 +162,46 @@ class OFCManager(object):
                                               portinfo, port_id)
         ndb.add_ofc_item(nmodels.OFCPort, ofc_port_id, port_id)
 
+    def create_ofc_ports(self, ports):
+        """Create ports on OFC concurrently.
+
+        :param ports: a list of (tenant_id, network_id, port_id, portinfo)
+        :returns: a dict of the errors raised for the ports, by port_id
+        """
+        ofc_tenant_ids = self._get_ofc_ids(
+            "ofc_tenant", [port[0] for port in ports])
+        ofc_net_ids = self._get_ofc_ids(
+            "ofc_network", [port[1] for port in ports])
+        errors = {}
+        calls = []
+        port_ids = []
+        for tenant_id, network_id, port_id, portinfo in ports:
+            try:
+                ofc_tenant_id = self._lookup_ofc_id(
+                    ofc_tenant_ids, "ofc_tenant", tenant_id)
+                ofc_net_id = self._lookup_ofc_id(
+                    ofc_net_ids, "ofc_network", network_id)
+            except nexc.OFCConsistencyBroken as exc:
+                errors[port_id] = exc
+                continue
+            calls.append((self.driver.create_port,
+                          (ofc_tenant_id, ofc_net_id, portinfo, port_id)))
+            port_ids.append(port_id)
+
+        for port_id, result in zip(port_ids, self._spawn_all(calls)):
+            if isinstance(result, Exception):
+                errors[port_id] = result
+            else:
+                ndb.add_ofc_item(nmodels.OFCPort, result, port_id)
+        return errors
+
     def exists_ofc_port(self, port_id):
         return self._exists_ofc_item("ofc_port", port_id)
 
+    def exists_ofc_ports(self, port_ids):
+        """Return the set of the given port ids which exist on OFC."""
+        return self._exists_ofc_items("ofc_port", port_ids)
+
     def delete_ofc_port(self, tenant_id, network_id, port_id):
         ofc_tenant_id = self._get_ofc_id("ofc_tenant", tenant_id)
         ofc_net_id = self._get_ofc_id("ofc_network", network_id)
@@ -122,6 +210,44 @@ class OFCManager(object):
         self.driver.delete_port(ofc_tenant_id, ofc_net_id, ofc_port_id)
         ndb.del_ofc_item(nmodels.OFCPort, ofc_port_id)
 
+    def delete_ofc_ports(self, ports):
+        """Delete ports from OFC concurrently.
+
+        :param ports: a list of (tenant_id, network_id, port_id)
+        :returns: a dict of the errors raised for the ports, by port_id
+        """
+        ofc_tenant_ids = self._get_ofc_ids(
+            "ofc_tenant", [port[0] for port in ports])
+        ofc_net_ids = self._get_ofc_ids(
+            "ofc_network", [port[1] for port in ports])
+        ofc_port_ids = self._get_ofc_ids(
+            "ofc_port", [port[2] for port in ports])
+        errors = {}
+        calls = []
+        deleted = []
+        for tenant_id, network_id, port_id in ports:
+            try:
+                ofc_tenant_id = self._lookup_ofc_id(
+                    ofc_tenant_ids, "ofc_tenant", tenant_id)
+                ofc_net_id = self._lookup_ofc_id(
+                    ofc_net_ids, "ofc_network", network_id)
+                ofc_port_id = self._lookup_ofc_id(
+                    ofc_port_ids, "ofc_port", port_id)
+            except nexc.OFCConsistencyBroken as exc:
+                errors[port_id] = exc
+                continue
+            calls.append((self.driver.delete_port,
+                          (ofc_tenant_id, ofc_net_id, ofc_port_id)))
+            deleted.append((port_id, ofc_port_id))
+
+        for (port_id, ofc_port_id), result in zip(deleted,
+                                                  self._spawn_all(calls)):
+            if isinstance(result, Exception):
+                errors[port_id] = result
+            else:
+                ndb.del_ofc_item(nmodels.OFCPort, ofc_port_id)
+        return errors
+
     # PacketFilter
 
     def create_ofc_packet_filter(self, tenant_id, network_id, filter_id,
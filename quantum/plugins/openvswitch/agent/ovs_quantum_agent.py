@@ -597,13 +597,28 @@ class OVSQuantumAgent(object):
                 self.port_unbound(device)
         return resync
 
+    def get_flow_bridges(self):
+        bridges = [self.int_br] + self.phys_brs.values()
+        if self.enable_tunneling:
+            bridges.append(self.tun_br)
+        return bridges
+
     def process_network_ports(self, port_info):
         resync_a = False
         resync_b = False
-        if 'added' in port_info:
-            resync_a = self.treat_devices_added(port_info['added'])
-        if 'removed' in port_info:
-            resync_b = self.treat_devices_removed(port_info['removed'])
+        # Collect the flow changes of this iteration and apply them with
+        # one ovs-ofctl run per bridge rather than one per flow
+        bridges = self.get_flow_bridges()
+        for br in bridges:
+            br.defer_apply_on()
+        try:
+            if 'added' in port_info:
+                resync_a = self.treat_devices_added(port_info['added'])
+            if 'removed' in port_info:
+                resync_b = self.treat_devices_removed(port_info['removed'])
+        finally:
+            for br in bridges:
+                br.defer_apply_off()
         # If one of the above opertaions fails => resync with plugin
         return (resync_a | resync_b)
 
@@ -37,6 +37,12 @@ ovs_opts = [
                help=_("OVSDB IP to connect to")),
     cfg.StrOpt('ovsdb_interface', default=None,
                help=_("OVSDB interface to connect to")),
+    cfg.IntOpt('sync_page_size', default=500,
+               help=_("Number of networks or ports read from the database "
+                      "at a time when syncing the controller at startup")),
+    cfg.IntOpt('sync_concurrency', default=8,
+               help=_("Maximum number of concurrent requests to the "
+                      "controller when syncing it at startup")),
 ]
 
 
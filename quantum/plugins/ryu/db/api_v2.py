@@ -14,8 +14,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from sqlalchemy import exc as sa_exc
-from sqlalchemy import func
 from sqlalchemy.orm import exc as orm_exc
 
 from quantum.common import exceptions as q_exc
@@ -28,9 +26,44 @@ from quantum.plugins.ryu.db import models_v2 as ryu_models_v2
 LOG = logging.getLogger(__name__)
 
 
-def network_all_tenant_list():
+def _paged(query, id_column, page_size):
+    """Yield the rows of query ordered by id_column, page by page.
+
+    Pages are selected by the id of the last row of the previous page,
+    so only one page is held in memory and deep pages stay cheap.
+    """
+    marker = None
+    while True:
+        page_query = query
+        if marker is not None:
+            page_query = page_query.filter(id_column > marker)
+        rows = page_query.order_by(id_column).limit(page_size).all()
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        marker = rows[-1][0]
+
+
+def network_tunnel_key_list(page_size):
+    """Yield (network_id, tunnel_key) of all networks of all tenants.
+
+    tunnel_key is None for a network without one.
+    """
+    session = db.get_session()
+    query = (session.query(models_v2.Network.id,
+                           ryu_models_v2.TunnelKey.tunnel_key).
+             outerjoin(ryu_models_v2.TunnelKey,
+                       ryu_models_v2.TunnelKey.network_id ==
+                       models_v2.Network.id))
+    return _paged(query, models_v2.Network.id, page_size)
+
+
+def port_network_list(page_size):
+    """Yield (port_id, network_id) of all ports of all tenants."""
     session = db.get_session()
-    return session.query(models_v2.Network).all()
+    query = session.query(models_v2.Port.id, models_v2.Port.network_id)
+    return _paged(query, models_v2.Port.id, page_size)
 
 
 class TunnelKey(object):
@@ -52,126 +85,102 @@ class TunnelKey(object):
                                'Using default value') % {'key_min': key_min,
                                                          'key_max': key_max})
 
-    def _last_key(self, session):
-        try:
-            return session.query(ryu_models_v2.TunnelKeyLast).one()
-        except orm_exc.MultipleResultsFound:
-            max_key = session.query(
-                func.max(ryu_models_v2.TunnelKeyLast.last_key))
-            if max_key > self.key_max:
-                max_key = self.key_min
-
-            session.query(ryu_models_v2.TunnelKeyLast).delete()
-            last_key = ryu_models_v2.TunnelKeyLast(last_key=max_key)
-        except orm_exc.NoResultFound:
-            last_key = ryu_models_v2.TunnelKeyLast(last_key=self.key_min)
-
-        session.add(last_key)
-        session.flush()
-        return session.query(ryu_models_v2.TunnelKeyLast).one()
-
-    def _find_key(self, session, last_key):
-        """
-        Try to find unused tunnel key in TunnelKey table starting
-        from last_key + 1.
-        When all keys are used, raise sqlalchemy.orm.exc.NoResultFound
+    def _free_ranges(self, session):
+        """Return the free key ranges left by the allocated tunnel keys."""
+        keys = (session.query(ryu_models_v2.TunnelKey.tunnel_key).
+                filter(ryu_models_v2.TunnelKey.tunnel_key.between(
+                    self.key_min, self.key_max)).
+                order_by(ryu_models_v2.TunnelKey.tunnel_key))
+        ranges = []
+        first_key = self.key_min
+        for key, in keys:
+            if key > first_key:
+                ranges.append((first_key, key - 1))
+            first_key = key + 1
+        if first_key <= self.key_max:
+            ranges.append((first_key, self.key_max))
+        return ranges
+
+    def sync_free_keys(self, session=None):
+        """Rebuild the free key ranges from the allocated tunnel keys.
+
+        This is done once at plugin startup, so that allocate() and
+        delete() only ever touch the free range rows next to a key. The
+        ranges are locked first, so servers starting concurrently take
+        turns, and they are only rewritten when they don't match the
+        allocated keys, e.g. after the configured key bounds changed.
         """
-        # key 0 is used for special meanings. So don't allocate 0.
-
-        # sqlite doesn't support
-        # '(select order by limit) union all (select order by limit) '
-        # 'order by limit'
-        # So do it manually
-        # new_key = session.query("new_key").from_statement(
-        #     # If last_key + 1 isn't used, it's the result
-        #     'SELECT new_key '
-        #     'FROM (SELECT :last_key + 1 AS new_key) q1 '
-        #     'WHERE NOT EXISTS '
-        #     '(SELECT 1 FROM tunnelkeys WHERE tunnel_key = :last_key + 1) '
-        #
-        #     'UNION ALL '
-        #
-        #     # if last_key + 1 used,
-        #     # find the least unused key from last_key + 1
-        #     '(SELECT t.tunnel_key + 1 AS new_key '
-        #     'FROM tunnelkeys t '
-        #     'WHERE NOT EXISTS '
-        #     '(SELECT 1 FROM tunnelkeys ti '
-        #     ' WHERE ti.tunnel_key = t.tunnel_key + 1) '
-        #     'AND t.tunnel_key >= :last_key '
-        #     'ORDER BY new_key LIMIT 1) '
-        #
-        #     'ORDER BY new_key LIMIT 1'
-        # ).params(last_key=last_key).one()
-        try:
-            new_key = session.query("new_key").from_statement(
-                # If last_key + 1 isn't used, it's the result
-                'SELECT new_key '
-                'FROM (SELECT :last_key + 1 AS new_key) q1 '
-                'WHERE NOT EXISTS '
-                '(SELECT 1 FROM tunnelkeys WHERE tunnel_key = :last_key + 1) '
-            ).params(last_key=last_key).one()
-        except orm_exc.NoResultFound:
-            new_key = session.query("new_key").from_statement(
-                # if last_key + 1 used,
-                # find the least unused key from last_key + 1
-                '(SELECT t.tunnel_key + 1 AS new_key '
-                'FROM tunnelkeys t '
-                'WHERE NOT EXISTS '
-                '(SELECT 1 FROM tunnelkeys ti '
-                ' WHERE ti.tunnel_key = t.tunnel_key + 1) '
-                'AND t.tunnel_key >= :last_key '
-                'ORDER BY new_key LIMIT 1) '
-            ).params(last_key=last_key).one()
-
-        new_key = new_key[0]  # the result is tuple.
-        LOG.debug(_("last_key %(last_key)s new_key %(new_key)s"),
-                  locals())
-        if new_key > self.key_max:
-            LOG.debug(_("No key found"))
-            raise orm_exc.NoResultFound()
-        return new_key
-
-    def _allocate(self, session, network_id):
-        last_key = self._last_key(session)
-        try:
-            new_key = self._find_key(session, last_key.last_key)
-        except orm_exc.NoResultFound:
-            new_key = self._find_key(session, self.key_min)
-
-        tunnel_key = ryu_models_v2.TunnelKey(network_id=network_id,
-                                             tunnel_key=new_key)
-        last_key.last_key = new_key
-        session.add(tunnel_key)
-        return new_key
-
-    _TRANSACTION_RETRY_MAX = 16
+        session = session or db.get_session()
+        with session.begin(subtransactions=True):
+            stored = (session.query(ryu_models_v2.TunnelKeyFreeRange).
+                      order_by(ryu_models_v2.TunnelKeyFreeRange.last_key).
+                      with_lockmode('update').all())
+            ranges = self._free_ranges(session)
+            if [(r.first_key, r.last_key) for r in stored] == ranges:
+                return
+
+            LOG.info(_("Rebuilding the free tunnel key ranges"))
+            session.query(ryu_models_v2.TunnelKeyFreeRange).delete()
+            if ranges:
+                session.execute(
+                    ryu_models_v2.TunnelKeyFreeRange.__table__.insert(),
+                    [{'first_key': first_key, 'last_key': last_key}
+                     for first_key, last_key in ranges])
 
     def allocate(self, session, network_id):
-        count = 0
-        while True:
-            session.begin(subtransactions=True)
-            try:
-                new_key = self._allocate(session, network_id)
-                session.commit()
-                break
-            except sa_exc.SQLAlchemyError:
-                session.rollback()
-
-            count += 1
-            if count > self._TRANSACTION_RETRY_MAX:
-                # if this happens too often, increase _TRANSACTION_RETRY_MAX
-                LOG.warn(_("Transaction retry exhausted (%d). "
-                           "Abandoned tunnel key allocation."), count)
+        with session.begin(subtransactions=True):
+            # The row lock makes concurrent allocations take turns on the
+            # lowest free range instead of racing for the same key.
+            free_range = (session.query(ryu_models_v2.TunnelKeyFreeRange).
+                          order_by(ryu_models_v2.TunnelKeyFreeRange.last_key).
+                          with_lockmode('update').
+                          first())
+            if not free_range:
+                LOG.warn(_("No free tunnel key. "
+                           "Abandoned tunnel key allocation."))
                 raise q_exc.ResourceExhausted()
 
+            new_key = free_range.first_key
+            if new_key == free_range.last_key:
+                session.delete(free_range)
+            else:
+                free_range.first_key = new_key + 1
+            tunnel_key = ryu_models_v2.TunnelKey(network_id=network_id,
+                                                 tunnel_key=new_key)
+            session.add(tunnel_key)
+        LOG.debug(_("network_id %(network_id)s new_key %(new_key)s"),
+                  locals())
         return new_key
 
-    def delete(self, session, network_id):
-        session.query(ryu_models_v2.TunnelKey).filter_by(
-            network_id=network_id).delete()
+    def _release(self, session, key):
+        """Merge a released key into the free ranges next to it."""
+        query = (session.query(ryu_models_v2.TunnelKeyFreeRange).
+                 with_lockmode('update'))
+        before = query.filter_by(last_key=key - 1).first()
+        after = query.filter_by(first_key=key + 1).first()
+        if before and after:
+            after.first_key = before.first_key
+            session.delete(before)
+        elif after:
+            after.first_key = key
+        elif before:
+            before.last_key = key
+        else:
+            session.add(ryu_models_v2.TunnelKeyFreeRange(first_key=key,
+                                                         last_key=key))
         session.flush()
 
+    def delete(self, session, network_id):
+        with session.begin(subtransactions=True):
+            tunnel_keys = (session.query(ryu_models_v2.TunnelKey).
+                           filter_by(network_id=network_id).all())
+            for tunnel_key in tunnel_keys:
+                key = tunnel_key.tunnel_key
+                session.delete(tunnel_key)
+                if self.key_min <= key <= self.key_max:
+                    self._release(session, key)
+            session.flush()
+
     def all_list(self):
         session = db.get_session()
         return session.query(ryu_models_v2.TunnelKey).all()
@@ -19,14 +19,17 @@ import sqlalchemy as sa
 from quantum.db import model_base
 
 
-class TunnelKeyLast(model_base.BASEV2):
-    """Lastly allocated Tunnel key. The next key allocation will be started
-    from this value + 1
+class TunnelKeyFreeRange(model_base.BASEV2):
+    """Range of unallocated tunnel keys, first_key to last_key inclusive.
+
+    Keys are allocated from the front of a range and a released key is
+    merged back into its neighbouring ranges.
     """
-    last_key = sa.Column(sa.Integer, primary_key=True)
+    first_key = sa.Column(sa.Integer, nullable=False, index=True)
+    last_key = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
 
     def __repr__(self):
-        return "<TunnelKeyLast(%x)>" % self.last_key
+        return "<TunnelKeyFreeRange(%x,%x)>" % (self.first_key, self.last_key)
 
 
 class TunnelKey(model_base.BASEV2):
@@ -16,6 +16,7 @@
 #    under the License.
 # @author: Isaku Yamahata
 
+import eventlet
 from ryu.app import client
 from ryu.app import rest_nw_id
 
@@ -28,7 +29,6 @@ from quantum.db import db_base_plugin_v2
 from quantum.db import dhcp_rpc_base
 from quantum.db import l3_db
 from quantum.db import l3_rpc_base
-from quantum.db import models_v2
 from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
 from quantum.openstack.common import rpc
@@ -65,6 +65,7 @@ class RyuQuantumPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
 
         self.tunnel_key = db_api_v2.TunnelKey(
             cfg.CONF.OVS.tunnel_key_min, cfg.CONF.OVS.tunnel_key_max)
+        self.tunnel_key.sync_free_keys()
         self.ofp_api_host = cfg.CONF.OVS.openflow_rest_api
         if not self.ofp_api_host:
             raise q_exc.Invalid(_('Invalid configuration. check ryu.ini'))
@@ -88,13 +89,34 @@ class RyuQuantumPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
         self.conn.consume_in_thread()
 
     def _create_all_tenant_network(self):
-        for net in db_api_v2.network_all_tenant_list():
-            self.client.update_network(net.id)
-        for tun in self.tunnel_key.all_list():
-            self.tun_client.update_tunnel_key(tun.network_id, tun.tunnel_key)
-        session = db.get_session()
-        for port in session.query(models_v2.Port).all():
-            self.iface_client.update_network_id(port.id, port.network_id)
+        page_size = cfg.CONF.OVS.sync_page_size
+        pool = eventlet.GreenPool(cfg.CONF.OVS.sync_concurrency)
+        errors = []
+
+        def _sync(*calls):
+            try:
+                for func, args in calls:
+                    func(*args)
+            except Exception as e:
+                errors.append(e)
+
+        # spawn_n waits for a free green thread, which bounds both the
+        # requests in flight and the rows held in memory.
+        for net_id, tunnel_key in db_api_v2.network_tunnel_key_list(
+                page_size):
+            calls = [(self.client.update_network, (net_id,))]
+            if tunnel_key is not None:
+                calls.append((self.tun_client.update_tunnel_key,
+                              (net_id, tunnel_key)))
+            pool.spawn_n(_sync, *calls)
+        # ports can only be bound to networks known to the controller
+        pool.waitall()
+        for port_id, net_id in db_api_v2.port_network_list(page_size):
+            pool.spawn_n(_sync, (self.iface_client.update_network_id,
+                                 (port_id, net_id)))
+        pool.waitall()
+        if errors:
+            raise errors[0]
 
     def _client_create_network(self, net_id, tunnel_key):
         self.client.create_network(net_id)
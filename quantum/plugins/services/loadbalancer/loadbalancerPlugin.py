@@ -16,15 +16,27 @@
 #    under the License.
 
 
+from quantum import context as q_context
 from quantum.db import api as qdbapi
 from quantum.db import model_base
 from quantum.db.loadbalancer import loadbalancer_db
 from quantum.extensions import loadbalancer
+from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
+from quantum.openstack.common import loopingcall
 from quantum.plugins.common import constants
 
 LOG = logging.getLogger(__name__)
 
+lbaas_opts = [
+    cfg.IntOpt('stats_flush_interval', default=10,
+               help=_('Seconds between writes of the pool statistics '
+                      'reported by the backends. 0 writes them as soon '
+                      'as they are reported')),
+]
+
+cfg.CONF.register_opts(lbaas_opts, 'LBAAS')
+
 
 class LoadBalancerPlugin(loadbalancer_db.LoadBalancerPluginDb):
 
@@ -43,6 +55,10 @@ class LoadBalancerPlugin(loadbalancer_db.LoadBalancerPluginDb):
         """
         qdbapi.register_models(base=model_base.BASEV2)
 
+        # Statistics reported since the last flush, keyed by pool id
+        self._pending_stats = {}
+        self._stats_flusher = None
+
         # TODO: we probably need to setup RPC channel (to talk to LbAgent) here
 
     def get_plugin_type(self):
@@ -148,6 +164,57 @@ class LoadBalancerPlugin(loadbalancer_db.LoadBalancerPluginDb):
         LOG.debug(_("Get stats of Pool: %s"), pool_id)
         return res
 
+    def update_pools_stats(self, context, pools_stats):
+        """Record the statistics reported for a set of pools.
+
+        pools_stats maps pool ids to their current counters. Reports are
+        merged in memory, the latest value of each counter winning, and
+        written to the database every LBAAS.stats_flush_interval seconds.
+        """
+        for pool_id, stats in pools_stats.iteritems():
+            stats = dict((key, value) for key, value in stats.iteritems()
+                         if key in loadbalancer_db.STATS_KEYS)
+            if stats:
+                self._pending_stats.setdefault(pool_id, {}).update(stats)
+        LOG.debug(_("Received stats of %d pools"), len(pools_stats))
+
+        interval = cfg.CONF.LBAAS.stats_flush_interval
+        if interval <= 0:
+            self.flush_stats()
+        elif self._pending_stats and not self._stats_flusher:
+            self._stats_flusher = loopingcall.LoopingCall(self._flush_stats)
+            self._stats_flusher.start(interval=interval,
+                                      initial_delay=interval)
+
+    def _flush_stats(self):
+        if not self._pending_stats:
+            # No report since the last flush, the next report restarts
+            # the periodic flush
+            self._stats_flusher.stop()
+            self._stats_flusher = None
+            return
+        try:
+            self.flush_stats()
+        except Exception:
+            LOG.exception(_("Failed to write pool stats"))
+
+    def flush_stats(self):
+        pools_stats = self._pending_stats
+        if not pools_stats:
+            return
+        self._pending_stats = {}
+        try:
+            super(LoadBalancerPlugin, self).update_pools_stats(
+                q_context.get_admin_context(), pools_stats)
+        except Exception:
+            # Keep the stats for the next flush unless newer ones arrived
+            for pool_id, stats in pools_stats.iteritems():
+                pending = self._pending_stats.setdefault(pool_id, {})
+                for key, value in stats.iteritems():
+                    pending.setdefault(key, value)
+            raise
+        LOG.debug(_("Wrote stats of %d pools"), len(pools_stats))
+
     def create_pool_health_monitor(self, context, health_monitor, pool_id):
         m = super(LoadBalancerPlugin, self).create_pool_health_monitor(
             context, health_monitor, pool_id)
@@ -15,12 +15,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import httplib
 import os
+import socket
 
+import mock
 from mock import patch
+import unittest2 as unittest
 
 import quantum.common.test_lib as test_lib
 from quantum.manager import QuantumManager
+from quantum.openstack.common import cfg
+from quantum.plugins.bigswitch import plugin
 import quantum.tests.unit.test_db_plugin as test_plugin
 
 
@@ -30,6 +37,7 @@ RESTPROXY_PKG_PATH = 'quantum.plugins.bigswitch.plugin'
 class HTTPResponseMock():
     status = 200
     reason = 'OK'
+    will_close = False
 
     def __init__(self, sock, debuglevel=0, strict=0, method=None,
                  buffering=False):
@@ -110,3 +118,135 @@ class TestBigSwitchProxySync(BigSwitchProxyPluginV2TestCase):
         plugin_obj = QuantumManager.get_plugin()
         result = plugin_obj._send_all_data()
         self.assertEqual(result[0], 200)
+
+    def _put_topology(self, *results):
+        plugin_obj = QuantumManager.get_plugin()
+        put_p = patch.object(plugin_obj.servers, 'put')
+        put = put_p.start()
+        self.addCleanup(put_p.stop)
+        put.side_effect = results
+        return plugin_obj, put
+
+    def test_send_data_bulk(self):
+        with contextlib.nested(self.network(), self.network()) as nets:
+            with contextlib.nested(
+                self.subnet(network=nets[0], gateway_ip='10.0.0.254'),
+                self.subnet(network=nets[1], cidr='10.0.1.0/24')
+            ) as subnets:
+                with self.port(subnet=subnets[1]) as port:
+                    plugin_obj, put = self._put_topology((200, 'OK', '', {}))
+                    plugin_obj._send_all_data()
+
+        networks = put.call_args[0][1]['networks']
+        net_ids = [net['network']['id'] for net in nets]
+        self.assertEqual(sorted(networks), sorted(net_ids))
+        self.assertEqual(networks[net_ids[0]]['gateway'], '10.0.0.254')
+        self.assertEqual([p['id'] for p in networks[net_ids[1]]['ports']],
+                         [port['port']['id']])
+        self.assertNotIn('page', put.call_args[0][1])
+
+    def test_send_data_paged_resumed(self):
+        cfg.CONF.set_override('syncpagesize', 1, 'RESTPROXY')
+        with contextlib.nested(self.network(), self.network()) as nets:
+            net_ids = sorted(net['network']['id'] for net in nets)
+            plugin_obj, put = self._put_topology((200, 'OK', '', {}),
+                                                 (500, 'Error', '', {}),
+                                                 (200, 'OK', '', {}))
+            self.assertRaises(plugin.RemoteRestError,
+                              plugin_obj._send_all_data)
+            self.assertEqual(plugin_obj._sync_marker, net_ids[0])
+            plugin_obj._send_all_data()
+
+        pages = [call[0][1] for call in put.call_args_list]
+        self.assertEqual([page['networks'].keys() for page in pages],
+                         [[net_ids[0]], [net_ids[1]], [net_ids[1]]])
+        self.assertEqual([page['page'] for page in pages],
+                         [{'marker': None, 'last': False},
+                          {'marker': net_ids[0], 'last': True},
+                          {'marker': net_ids[0], 'last': True}])
+        self.assertIsNone(plugin_obj._sync_marker)
+
+
+class TestServerProxyConnections(unittest.TestCase):
+
+    def setUp(self):
+        self.conn_cls_p = patch('httplib.HTTPConnection')
+        self.conn_cls = self.conn_cls_p.start()
+        self.addCleanup(self.conn_cls_p.stop)
+        self.conn_cls.side_effect = self._new_connection
+        self.connections = []
+        self.proxy = plugin.ServerProxy('localhost', 8899, False, None, 10,
+                                        '/quantum/v1.0', 'test', 2)
+
+    def _new_connection(self, *args, **kwargs):
+        conn = mock.Mock()
+        conn.getresponse.return_value = mock.Mock(status=200, reason='OK',
+                                                  will_close=False)
+        conn.getresponse.return_value.read.return_value = '{}'
+        self.connections.append(conn)
+        return conn
+
+    def test_connection_reused(self):
+        self.proxy.rest_call('GET', '/a', '', None)
+        ret = self.proxy.rest_call('GET', '/b', '', None)
+
+        self.assertEqual(ret, (200, 'OK', '{}', {}))
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.connections[0].request.call_count, 2)
+        self.assertFalse(self.connections[0].close.called)
+        self.assertEqual(self.proxy.connections, self.connections)
+
+    def test_connection_closed_by_server(self):
+        self.proxy.rest_call('GET', '/a', '', None)
+        self.connections[0].getresponse.side_effect = httplib.BadStatusLine('')
+
+        ret = self.proxy.rest_call('GET', '/b', '', None)
+
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(self.connections), 2)
+        self.assertTrue(self.connections[0].close.called)
+        self.assertEqual(self.proxy.connections, [self.connections[1]])
+
+    def test_connection_will_close(self):
+        self.proxy.rest_call('GET', '/a', '', None)
+        self.connections[0].getresponse.return_value.will_close = True
+
+        self.proxy.rest_call('GET', '/b', '', None)
+
+        self.assertTrue(self.connections[0].close.called)
+        self.assertEqual(self.proxy.connections, [])
+
+    def test_connection_failure(self):
+        self.conn_cls.side_effect = None
+        self.conn_cls.return_value.request.side_effect = socket.error
+
+        ret = self.proxy.rest_call('GET', '/a', '', None)
+
+        self.assertEqual(ret, (0, None, None, None))
+        self.assertEqual(self.proxy.connections, [])
+
+    def test_post_not_resent_once_sent(self):
+        self.proxy.rest_call('GET', '/a', '', None)
+        self.connections[0].getresponse.side_effect = httplib.BadStatusLine('')
+
+        ret = self.proxy.rest_call('POST', '/b', {}, None)
+
+        self.assertEqual(ret, (0, None, None, None))
+        self.assertEqual(len(self.connections), 1)
+
+    def test_post_resent_if_not_sent(self):
+        self.proxy.rest_call('GET', '/a', '', None)
+        self.connections[0].request.side_effect = socket.error
+
+        ret = self.proxy.rest_call('POST', '/b', {}, None)
+
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(self.connections), 2)
+
+    def test_pool_size(self):
+        self.proxy.connections = [mock.Mock(), mock.Mock()]
+        conn = self._new_connection()
+        self.proxy._release_connection(conn, mock.Mock(will_close=False))
+
+        self.assertTrue(conn.close.called)
+        self.assertEqual(len(self.proxy.connections), 2)
@@ -0,0 +1,126 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+import mock
+import unittest2 as unittest
+
+from quantum.openstack.common import importutils
+
+
+NEXUS_IP_ADDRESS = '1.1.1.1'
+NEXUS_USERNAME = 'username'
+NEXUS_PASSWORD = 'password'
+NEXUS_PORTS = ('1/10', '1/11')
+NEXUS_SSH_PORT = '22'
+
+
+class FakeTransportError(Exception):
+    pass
+
+
+def _import_nexus_driver():
+    """Import the Nexus driver, with a stand-in for a missing ncclient.
+
+    Only the ncclient entries are added to and removed from sys.modules,
+    so the modules the driver imports stay loaded.
+    """
+    fakes = {}
+    if importutils.try_import('ncclient.manager') is None:
+        ncclient = mock.Mock()
+        fakes = {'ncclient': ncclient,
+                 'ncclient.manager': ncclient.manager,
+                 'ncclient.transport': ncclient.transport}
+    sys.modules.update(fakes)
+    try:
+        from quantum.plugins.cisco.nexus import cisco_nexus_network_driver_v2
+    finally:
+        for name in fakes:
+            del sys.modules[name]
+    return cisco_nexus_network_driver_v2
+
+
+nexus_driver = _import_nexus_driver()
+
+
+class TestCiscoNexusDriver(unittest.TestCase):
+
+    def setUp(self):
+        manager_p = mock.patch.object(nexus_driver, 'manager')
+        self.connect = manager_p.start().connect
+        self.addCleanup(manager_p.stop)
+        transport_p = mock.patch.object(nexus_driver, 'transport')
+        transport_p.start().TransportError = FakeTransportError
+        self.addCleanup(transport_p.stop)
+        self.connect.side_effect = lambda **kwargs: mock.Mock(connected=True)
+        self.driver = nexus_driver.CiscoNEXUSDriver()
+
+    def _sessions(self):
+        return self.driver.sessions[(NEXUS_IP_ADDRESS, int(NEXUS_SSH_PORT),
+                                     NEXUS_USERNAME)]
+
+    def test_create_vlan_single_edit(self):
+        self.driver.create_vlan('q-1vlan', '267', NEXUS_IP_ADDRESS,
+                                NEXUS_USERNAME, NEXUS_PASSWORD, NEXUS_PORTS,
+                                NEXUS_SSH_PORT, 267)
+        self.assertEqual(self.connect.call_count, 1)
+        man = self._sessions()[0]
+        self.assertEqual(man.edit_config.call_count, 1)
+        confstr = man.edit_config.call_args[1]['config']
+        self.assertIn('<vlan-name>q-1vlan</vlan-name>', confstr)
+        for port in NEXUS_PORTS:
+            self.assertIn('<interface>%s</interface>' % port, confstr)
+
+    def test_session_reused(self):
+        for vlan_id in ('267', '268'):
+            self.driver.delete_vlan(vlan_id, NEXUS_IP_ADDRESS,
+                                    NEXUS_USERNAME, NEXUS_PASSWORD,
+                                    NEXUS_PORTS, NEXUS_SSH_PORT)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(self._sessions()[0].edit_config.call_count, 2)
+
+    def test_stale_session_retried(self):
+        stale = mock.Mock(connected=True)
+        stale.edit_config.side_effect = FakeTransportError()
+        self.driver.sessions[(NEXUS_IP_ADDRESS, int(NEXUS_SSH_PORT),
+                              NEXUS_USERNAME)] = [stale]
+        self.driver.remove_vlan_int('267', NEXUS_IP_ADDRESS, NEXUS_USERNAME,
+                                    NEXUS_PASSWORD, NEXUS_PORTS,
+                                    NEXUS_SSH_PORT)
+        stale.close_session.assert_called_once_with()
+        self.assertEqual(self.connect.call_count, 1)
+        man = self._sessions()[0]
+        self.assertIsNot(man, stale)
+        self.assertEqual(man.edit_config.call_count, 1)
+
+    def test_new_session_failure(self):
+        self.connect.side_effect = None
+        self.connect.return_value.connected = True
+        self.connect.return_value.edit_config.side_effect = (
+            FakeTransportError())
+        self.assertRaises(FakeTransportError, self.driver.add_vlan_int,
+                          '267', NEXUS_IP_ADDRESS, NEXUS_USERNAME,
+                          NEXUS_PASSWORD, NEXUS_PORTS, NEXUS_SSH_PORT, '267')
+        self.assertEqual(self._sessions(), [])
+
+    def test_build_vlans_cmd(self):
+        with mock.patch('quantum.plugins.cisco.db.network_db_v2.'
+                        'get_all_vlanids_used_list',
+                        return_value=[265, 267]):
+            self.assertEqual(self.driver.build_vlans_cmd(), '267,265')
+        with mock.patch('quantum.plugins.cisco.db.network_db_v2.'
+                        'get_all_vlanids_used_list', return_value=[]):
+            self.assertEqual(self.driver.build_vlans_cmd(), 'none')
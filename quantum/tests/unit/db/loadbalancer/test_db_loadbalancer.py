@@ -17,6 +17,8 @@ import contextlib
 import logging
 import os
 
+import mock
+import sqlalchemy as sa
 import webob.exc
 
 from quantum.api.extensions import ExtensionMiddleware
@@ -25,7 +27,9 @@ from quantum.api.v2 import attributes
 from quantum.api.v2.router import APIRouter
 from quantum.common import config
 from quantum.common.test_lib import test_config
+from quantum import context
 from quantum.db import api as db
+from quantum.db.loadbalancer import loadbalancer_db
 import quantum.extensions
 from quantum.extensions import loadbalancer
 from quantum.manager import QuantumManager
@@ -85,10 +89,10 @@ class LoadBalancerPluginDbTestCase(testlib_api.WebTestCase):
         cfg.CONF.set_override('base_mac', "12:34:56:78:90:ab")
         self.api = APIRouter()
 
-        plugin = loadbalancerPlugin.LoadBalancerPlugin()
+        self.plugin = loadbalancerPlugin.LoadBalancerPlugin()
         ext_mgr = PluginAwareExtensionManager(
             extensions_path,
-            {constants.LOADBALANCER: plugin}
+            {constants.LOADBALANCER: self.plugin}
         )
         app = config.load_paste_app('extensions_test_app')
         self.ext_api = ExtensionMiddleware(app, ext_mgr=ext_mgr)
@@ -516,6 +520,63 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
             for k, v in keys:
                 self.assertEqual(res['vips'][0][k], v)
 
+    def _count_list_queries(self, resource):
+        statements = []
+
+        def _record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        # The engine is thrown away in tearDown, taking the listener with it
+        sa.event.listen(db.get_session().bind, 'before_cursor_execute',
+                        _record)
+        return self._list(resource), len(statements)
+
+    def test_list_vips_query_count(self):
+        with self.vip(name='vip1', session_persistence={'type': 'SOURCE_IP',
+                                                        'cookie_name': None}):
+            res, single = self._count_list_queries('vips')
+            self.assertEqual(1, len(res['vips']))
+            with self.vip(name='vip2', session_persistence={
+                    'type': 'HTTP_COOKIE', 'cookie_name': None}):
+                with self.vip(name='vip3'):
+                    res, many = self._count_list_queries('vips')
+                    self.assertEqual(3, len(res['vips']))
+                    self.assertEqual(single, many)
+
+    def test_list_pools_query_count(self):
+        with contextlib.nested(self.pool(name='pool1'),
+                               self.health_monitor()) as (pool1, monitor):
+            with self.member(pool_id=pool1['pool']['id']):
+                res, single = self._count_list_queries('pools')
+                self.assertEqual(1, len(res['pools']))
+                with self.pool(name='pool2') as pool2:
+                    pool_id = pool2['pool']['id']
+                    data = {"health_monitor": {
+                            "id": monitor['health_monitor']['id'],
+                            'tenant_id': self._tenant_id}}
+                    req = self.new_create_request(
+                        "pools", data, fmt=self.fmt, id=pool_id,
+                        subresource="health_monitors")
+                    res = req.get_response(self.ext_api)
+                    self.assertEqual(res.status_int, 201)
+                    with contextlib.nested(
+                        self.member(pool_id=pool_id),
+                        self.member(address='192.168.1.101',
+                                    pool_id=pool_id)) as (member1, member2):
+                        res, many = self._count_list_queries('pools')
+                        self.assertEqual(single, many)
+                        pools = dict((pool['id'], pool)
+                                     for pool in res['pools'])
+                        self.assertEqual(
+                            sorted([member1['member']['id'],
+                                    member2['member']['id']]),
+                            sorted(pools[pool_id]['members']))
+                        self.assertEqual(
+                            [monitor['health_monitor']['id']],
+                            pools[pool_id]['health_monitors'])
+                        self.assertEqual(
+                            1, len(pools[pool1['pool']['id']]['members']))
+
     def test_create_pool_with_invalid_values(self):
         name = 'pool3'
 
@@ -768,6 +829,109 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
             for k, v in keys:
                 self.assertEqual(res['stats'][k], v)
 
+    def _get_pool_stats(self, pool_id):
+        req = self.new_show_request("pools", pool_id,
+                                    subresource="stats", fmt=self.fmt)
+        return self.deserialize(req.get_response(self.ext_api))['stats']
+
+    def test_update_pools_stats(self):
+        cfg.CONF.set_override('stats_flush_interval', 0, 'LBAAS')
+        with contextlib.nested(self.pool(name='pool1'),
+                               self.pool(name='pool2')) as (pool1, pool2):
+            pool1_id = pool1['pool']['id']
+            pool2_id = pool2['pool']['id']
+            stats1 = {'bytes_in': 100, 'bytes_out': 200,
+                      'active_connections': 3, 'total_connections': 10}
+            self.plugin.update_pools_stats(
+                context.get_admin_context(),
+                {pool1_id: stats1,
+                 pool2_id: {'bytes_in': 5, 'unknown': 1},
+                 'no-such-pool': stats1})
+            self.assertEqual(stats1, self._get_pool_stats(pool1_id))
+            self.assertEqual({'bytes_in': 5, 'bytes_out': 0,
+                              'active_connections': 0,
+                              'total_connections': 0},
+                             self._get_pool_stats(pool2_id))
+            self.assertEqual({}, self.plugin._pending_stats)
+
+    def test_update_pools_stats_inserts_missing_rows(self):
+        cfg.CONF.set_override('stats_flush_interval', 0, 'LBAAS')
+        with self.pool() as pool:
+            pool_id = pool['pool']['id']
+            ctx = context.get_admin_context()
+            qry = ctx.session.query(loadbalancer_db.PoolStatistics)
+            qry.filter_by(pool_id=pool_id).delete()
+            self.plugin.update_pools_stats(ctx,
+                                           {pool_id: {'bytes_out': 7}})
+            self.assertEqual({'bytes_in': 0, 'bytes_out': 7,
+                              'active_connections': 0,
+                              'total_connections': 0},
+                             self._get_pool_stats(pool_id))
+
+    def test_update_pools_stats_periodic_flush(self):
+        with self.pool() as pool:
+            pool_id = pool['pool']['id']
+            ctx = context.get_admin_context()
+            with mock.patch.object(loadbalancerPlugin.loopingcall,
+                                   'LoopingCall') as looping_call:
+                self.plugin.update_pools_stats(
+                    ctx, {pool_id: {'bytes_in': 1, 'bytes_out': 1}})
+                self.plugin.update_pools_stats(
+                    ctx, {pool_id: {'bytes_in': 2,
+                                    'active_connections': 4}})
+                looping_call.assert_called_once_with(
+                    self.plugin._flush_stats)
+                looping_call.return_value.start.assert_called_once_with(
+                    interval=10, initial_delay=10)
+            self.assertEqual(0, self._get_pool_stats(pool_id)['bytes_in'])
+
+            self.plugin.flush_stats()
+            self.assertEqual({'bytes_in': 2, 'bytes_out': 1,
+                              'active_connections': 4,
+                              'total_connections': 0},
+                             self._get_pool_stats(pool_id))
+
+    def test_update_pools_stats_ignores_empty_stats(self):
+        cfg.CONF.set_override('stats_flush_interval', 0, 'LBAAS')
+        with self.pool() as pool:
+            pool_id = pool['pool']['id']
+            ctx = context.get_admin_context()
+            self.plugin.update_pools_stats(ctx, {pool_id: {}})
+            self.plugin.update_pools_stats(ctx, {pool_id: {'foo': 1}})
+            self.assertEqual({}, self.plugin._pending_stats)
+            loadbalancer_db.LoadBalancerPluginDb.update_pools_stats(
+                self.plugin, ctx, {pool_id: {'foo': 1}})
+            self.plugin.update_pools_stats(ctx,
+                                           {pool_id: {'bytes_in': 3}})
+            self.assertEqual(3, self._get_pool_stats(pool_id)['bytes_in'])
+
+    def test_periodic_flush_stops_when_idle(self):
+        with self.pool() as pool:
+            pool_id = pool['pool']['id']
+            ctx = context.get_admin_context()
+            with mock.patch.object(loadbalancerPlugin.loopingcall,
+                                   'LoopingCall') as looping_call:
+                self.plugin.update_pools_stats(ctx, {pool_id: {'foo': 1}})
+                self.assertFalse(looping_call.called)
+                self.plugin.update_pools_stats(ctx,
+                                               {pool_id: {'bytes_in': 1}})
+                self.plugin._flush_stats()
+                self.assertFalse(looping_call.return_value.stop.called)
+                self.plugin._flush_stats()
+                looping_call.return_value.stop.assert_called_once_with()
+                self.assertIsNone(self.plugin._stats_flusher)
+            self.assertEqual(1, self._get_pool_stats(pool_id)['bytes_in'])
+
+    def test_flush_stats_keeps_stats_on_failure(self):
+        self.plugin._pending_stats = {'pool-id': {'bytes_in': 1}}
+        with mock.patch.object(loadbalancer_db.LoadBalancerPluginDb,
+                               'update_pools_stats',
+                               side_effect=RuntimeError):
+            self.assertRaises(RuntimeError, self.plugin.flush_stats)
+            self.plugin._flush_stats()
+        self.assertEqual({'pool-id': {'bytes_in': 1}},
+                         self.plugin._pending_stats)
+
     def test_create_healthmonitor_of_pool(self):
         with self.health_monitor(type="TCP") as monitor1:
             with self.health_monitor(type="HTTP") as monitor2:
@@ -51,3 +51,59 @@ class TestLinuxBridge(unittest.TestCase):
             result = self.linux_bridge.ensure_physical_in_bridge(
                 'network_id', 'physnet1', 7)
         self.assertTrue(vlan_bridge_func.called)
+
+    def test_get_bridge_for_tap_device(self):
+        with mock.patch('os.readlink') as readlink:
+            readlink.return_value = '../../../brq12345678-11'
+            self.assertEqual(
+                self.linux_bridge.get_bridge_for_tap_device('tap0'),
+                'brq12345678-11')
+            readlink.assert_called_once_with(
+                '/sys/devices/virtual/net/tap0/brport/bridge')
+
+    def test_get_bridge_for_tap_device_not_quantum_bridge(self):
+        with mock.patch('os.readlink') as readlink:
+            readlink.return_value = '../../../virbr0'
+            self.assertIsNone(
+                self.linux_bridge.get_bridge_for_tap_device('tap0'))
+
+    def test_get_bridge_for_tap_device_not_bridged(self):
+        with mock.patch('os.readlink') as readlink:
+            readlink.side_effect = OSError
+            self.assertIsNone(
+                self.linux_bridge.get_bridge_for_tap_device('tap0'))
+
+    def _udev_events(self, *events):
+        devices = []
+        for action, name in events:
+            device = mock.Mock()
+            device.action = action
+            device.sys_name = name
+            devices.append(device)
+        monitor = mock.Mock()
+        monitor.poll.side_effect = devices + [None]
+        self.linux_bridge.udev_monitor = monitor
+
+    def test_udev_get_device_events(self):
+        self._udev_events(('add', 'tap1'), ('add', 'eth1.7'),
+                          ('remove', 'tap2'), ('add', 'tap3'),
+                          ('remove', 'tap3'), ('remove', 'tap4'),
+                          ('add', 'tap4'), ('change', 'tap5'))
+        added, removed = self.linux_bridge.udev_get_device_events()
+        self.assertEqual(added, set(['tap1', 'tap4']))
+        self.assertEqual(removed, set(['tap2', 'tap3']))
+
+    def test_update_devices_from_events(self):
+        self._udev_events(('add', 'tap1'), ('add', 'tap2'),
+                          ('remove', 'tap3'), ('remove', 'tap4'))
+        device_info = self.linux_bridge.update_devices_from_events(
+            set(['tap2', 'tap3']))
+        self.assertEqual(device_info,
+                         {'current': set(['tap1', 'tap2']),
+                          'added': set(['tap1']),
+                          'removed': set(['tap3'])})
+
+    def test_update_devices_from_events_no_change(self):
+        self._udev_events(('add', 'tap1'), ('remove', 'tap2'))
+        self.assertIsNone(
+            self.linux_bridge.update_devices_from_events(set(['tap1'])))
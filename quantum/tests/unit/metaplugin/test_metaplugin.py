@@ -178,6 +178,53 @@ class MetaQuantumPluginV2Test(unittest.TestCase):
         self.plugin.delete_network(self.context, ret2['id'])
         self.plugin.delete_network(self.context, ret3['id'])
 
+    def test_get_networks_groups_by_flavor(self):
+        nets = []
+        for flavor in ('fake1', 'fake2', 'fake1', 'proxy'):
+            nets.append(self.plugin.create_network(
+                self.context, self._fake_network(flavor)))
+        fake1 = self.plugin.plugins['fake1']
+        with mock.patch.object(fake1, 'get_networks',
+                               wraps=fake1.get_networks) as get_networks:
+            with mock.patch.object(fake1, 'get_network') as get_network:
+                ret = self.plugin.get_networks(self.context)
+                self.assertFalse(get_network.called)
+            self.assertEqual(1, get_networks.call_count)
+        self.assertEqual([net['id'] for net in nets],
+                         [net['id'] for net in ret])
+        self.assertEqual(['fake1', 'fake2', 'fake1', 'proxy'],
+                         [net[FLAVOR_NETWORK] for net in ret])
+        for net in ret:
+            self.assertFalse(net['router:external'])
+
+        ret = self.plugin.get_networks(self.context,
+                                       fields=['name', FLAVOR_NETWORK])
+        self.assertEqual([{'name': 'fake1', FLAVOR_NETWORK: 'fake1'},
+                          {'name': 'fake2', FLAVOR_NETWORK: 'fake2'},
+                          {'name': 'fake1', FLAVOR_NETWORK: 'fake1'},
+                          {'name': 'proxy', FLAVOR_NETWORK: 'proxy'}], ret)
+        for net in nets:
+            self.plugin.delete_network(self.context, net['id'])
+
+    def test_get_networks_external_filter(self):
+        network1 = self._fake_network('fake1')
+        network1['network']['router:external'] = True
+        ret1 = self.plugin.create_network(self.context, network1)
+        ret2 = self.plugin.create_network(self.context,
+                                          self._fake_network('fake2'))
+
+        ext_nets = self.plugin.get_networks(
+            self.context, {'router:external': [True]})
+        self.assertEqual([ret1['id']], [net['id'] for net in ext_nets])
+        self.assertTrue(ext_nets[0]['router:external'])
+        int_nets = self.plugin.get_networks(
+            self.context, {'router:external': [False]})
+        self.assertEqual([ret2['id']], [net['id'] for net in int_nets])
+        self.assertFalse(int_nets[0]['router:external'])
+
+        self.plugin.delete_network(self.context, ret1['id'])
+        self.plugin.delete_network(self.context, ret2['id'])
+
     def test_create_delete_port(self):
         network1 = self._fake_network('fake1')
         network_ret1 = self.plugin.create_network(self.context, network1)
@@ -285,6 +332,16 @@ class MetaQuantumPluginV2Test(unittest.TestCase):
         self.assertEqual('fake1', router_in_db1[FLAVOR_ROUTER])
         self.assertEqual('fake2', router_in_db2[FLAVOR_ROUTER])
 
+        routers = self.plugin.get_routers(self.context)
+        self.assertEqual([router_ret1['id'], router_ret2['id']],
+                         [router['id'] for router in routers])
+        self.assertEqual(['fake1', 'fake2'],
+                         [router[FLAVOR_ROUTER] for router in routers])
+        routers = self.plugin.get_routers(self.context,
+                                          {FLAVOR_ROUTER: ['fake2']},
+                                          fields=['name'])
+        self.assertEqual([{'name': 'fake2'}], routers)
+
         self.plugin.delete_router(self.context, router_ret1['id'])
         self.plugin.delete_router(self.context, router_ret2['id'])
         with self.assertRaises(FlavorNotFound):
@@ -28,6 +28,7 @@ class ConfigurationTest(unittest.TestCase):
         self.assertEqual(2, config.CONF.DATABASE.reconnect_interval)
         self.assertEqual('br-int', config.CONF.OVS.integration_bridge)
         self.assertEqual(2, config.CONF.AGENT.polling_interval)
+        self.assertEqual(100, config.CONF.AGENT.port_update_chunk_size)
         self.assertEqual('sudo', config.CONF.AGENT.root_helper)
         self.assertEqual('127.0.0.1', config.CONF.OFC.host)
         self.assertEqual('8888', config.CONF.OFC.port)
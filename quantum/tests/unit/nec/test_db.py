@@ -139,3 +139,30 @@ class NECPluginV2DBTest(unittest.TestCase):
         ndb.del_portinfo(i)
         portinfo_none = ndb.get_portinfo(i)
         self.assertEqual(None, portinfo_none)
+
+    def testg_find_ofc_items(self):
+        """test find ofc_items"""
+        o, q, n = self.get_ofc_item_random_params()
+        ndb.add_ofc_item(nmodels.OFCTenant, o, q)
+        items = ndb.find_ofc_items(nmodels.OFCTenant, [q, n])
+        self.assertEqual(items.keys(), [q])
+        self.assertEqual(items[q].id, o)
+        self.assertEqual(ndb.find_ofc_items(nmodels.OFCTenant, []), {})
+
+    def testh_bulk_portinfos(self):
+        """test add, get and delete portinfos in bulk"""
+        i, d, p, v, m, n = self.get_portinfo_random_params()
+        i2 = uuidutils.generate_uuid()
+        ndb.add_portinfos([dict(id=i, datapath_id=d, port_no=p, mac=m),
+                           dict(id=i2, datapath_id=d, port_no=p + 1,
+                                vlan_id=v, mac=m)])
+        portinfos = ndb.get_portinfos([i, i2, n])
+        self.assertEqual(sorted(portinfos), sorted([i, i2]))
+        self.assertEqual(portinfos[i].vlan_id, ndb.OFP_VLAN_NONE)
+        self.assertEqual(portinfos[i2].port_no, p + 1)
+
+        self.assertRaises(nexc.NECDBException, ndb.add_portinfos,
+                          [dict(id=i, datapath_id=d, port_no=p, mac=m)])
+
+        ndb.del_portinfos([i, n])
+        self.assertEqual(ndb.get_portinfos([i, i2]).keys(), [i2])
@@ -0,0 +1,75 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import unittest2 as unittest
+
+from quantum.agent.linux import ovs_lib
+from quantum.plugins.nec.agent import nec_quantum_agent
+
+
+class TestNecAgent(unittest.TestCase):
+
+    def setUp(self):
+        bridge_p = mock.patch.object(ovs_lib, 'OVSBridge')
+        bridge_cls = bridge_p.start()
+        self.addCleanup(bridge_p.stop)
+        self.bridge = bridge_cls.return_value
+        self.bridge.get_datapath_id.return_value = '1234'
+        rpc_p = mock.patch.object(nec_quantum_agent, 'rpc')
+        self.rpc = rpc_p.start()
+        self.addCleanup(rpc_p.stop)
+        self.agent = nec_quantum_agent.NECQuantumAgent('br-int', 'sudo', 2,
+                                                       2)
+
+    def _vif_ports(self, *port_ids):
+        self.bridge.get_vif_port_map.return_value = dict(
+            (port_id, ovs_lib.VifPort('tap' + port_id, 1, port_id,
+                                      'mac' + port_id, self.bridge))
+            for port_id in port_ids)
+
+    def _update_calls(self):
+        return [(call[0][2]['args']['port_added'],
+                 call[0][2]['args']['port_removed'])
+                for call in self.rpc.call.call_args_list]
+
+    def test_no_port_changed(self):
+        self._vif_ports('a', 'b')
+        self.assertEqual(self.agent.process_port_changes(set(['a', 'b'])),
+                         set(['a', 'b']))
+        self.assertFalse(self.rpc.call.called)
+
+    def test_ports_changed_by_chunks(self):
+        self._vif_ports('a', 'c', 'd', 'e')
+        reported = self.agent.process_port_changes(set(['a', 'b']))
+
+        self.assertEqual(reported, set(['a', 'c', 'd', 'e']))
+        calls = self._update_calls()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sorted(p['id'] for added, _r in calls
+                                for p in added), ['c', 'd', 'e'])
+        self.assertEqual([removed for _a, removed in calls], [['b'], []])
+        self.assertEqual(calls[0][0][0],
+                         dict(id=calls[0][0][0]['id'], port_no=1,
+                              mac='mac' + calls[0][0][0]['id']))
+
+    def test_update_failure_retried(self):
+        self._vif_ports('a', 'c', 'd', 'e')
+        self.rpc.call.side_effect = [None, Exception]
+        reported = self.agent.process_port_changes(set(['a', 'b']))
+
+        added = [p['id'] for p in self._update_calls()[0][0]]
+        self.assertEqual(reported, set(['a'] + added))
@@ -13,7 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+
+from quantum import context
 from quantum.extensions import portbindings
+from quantum import manager
+from quantum.plugins.nec.common import config
+from quantum.plugins.nec.db import api as ndb
 from quantum.tests.unit import _test_extension_portbindings as test_bindings
 from quantum.tests.unit import test_db_plugin as test_plugin
 
@@ -44,3 +50,56 @@ class TestNecPortsV2(test_plugin.TestPortsV2, NecPluginV2TestCase,
 
 class TestNecNetworksV2(test_plugin.TestNetworksV2, NecPluginV2TestCase):
     pass
+
+
+class TestNecPluginUpdatePorts(NecPluginV2TestCase):
+
+    def setUp(self):
+        driver = "quantum.tests.unit.nec.stub_ofc_driver.StubOFCDriver"
+        config.CONF.set_override('driver', driver, 'OFC')
+        self.addCleanup(config.CONF.clear_override, 'driver', 'OFC')
+        super(TestNecPluginUpdatePorts, self).setUp()
+        self.plugin = manager.QuantumManager.get_plugin()
+        self.context = context.get_admin_context()
+
+    def _update_ports(self, added=(), removed=()):
+        port_added = [{'id': port_id, 'port_no': port_no, 'mac': ''}
+                      for port_no, port_id in enumerate(added)]
+        self.plugin.callbacks.update_ports(self.context, topic='fake',
+                                           agent_id='nec-q-agent.host',
+                                           datapath_id='0xabc',
+                                           port_added=port_added,
+                                           port_removed=list(removed))
+
+    def _port_status(self, port_id):
+        return self.plugin.get_port(self.context, port_id)['status']
+
+    def test_update_ports_activates_and_deactivates(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(self.port(subnet=subnet),
+                                   self.port(subnet=subnet)) as (p1, p2):
+                ids = [p1['port']['id'], p2['port']['id']]
+                self.assertFalse(self.plugin.ofc.exists_ofc_ports(ids))
+
+                self._update_ports(added=ids)
+                self.assertEqual(sorted(ndb.get_portinfos(ids)), sorted(ids))
+                self.assertEqual(self.plugin.ofc.exists_ofc_ports(ids),
+                                 set(ids))
+                for port_id in ids:
+                    self.assertEqual(self._port_status(port_id), 'ACTIVE')
+
+                # a port reported again keeps being active
+                self._update_ports(added=ids[:1], removed=ids[1:])
+                self.assertEqual(ndb.get_portinfos(ids).keys(), ids[:1])
+                self.assertEqual(self.plugin.ofc.exists_ofc_ports(ids),
+                                 set(ids[:1]))
+                self.assertEqual(self._port_status(ids[0]), 'ACTIVE')
+                self.assertEqual(self._port_status(ids[1]), 'DOWN')
+
+    def test_update_ports_admin_down_port(self):
+        with self.port(admin_state_up=False) as port:
+            port_id = port['port']['id']
+            self._update_ports(added=[port_id])
+            self.assertTrue(ndb.get_portinfo(port_id))
+            self.assertFalse(self.plugin.ofc.exists_ofc_ports([port_id]))
+            self.assertEqual(self._port_status(port_id), 'DOWN')
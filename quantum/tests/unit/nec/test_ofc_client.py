@@ -0,0 +1,95 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import httplib
+import socket
+
+import mock
+import unittest2 as unittest
+
+from quantum.plugins.nec.common import exceptions as nexc
+from quantum.plugins.nec.common import ofc_client
+
+
+def _response(status=httplib.OK, data='{"id": "ofc-1"}', will_close=False):
+    res = mock.Mock()
+    res.status = status
+    res.read.return_value = data
+    res.will_close = will_close
+    return res
+
+
+class OFCClientTest(unittest.TestCase):
+    """Class consisting of OFCClient unit tests"""
+
+    def setUp(self):
+        self.client = ofc_client.OFCClient(pool_size=2)
+        patcher = mock.patch.object(self.client, 'get_connection_type')
+        self.addCleanup(patcher.stop)
+        self.conn_type = patcher.start().return_value
+
+    def test_reuse_connection(self):
+        """test keep-alive connections are reused"""
+        conn = self.conn_type.return_value
+        conn.getresponse.return_value = _response()
+        self.assertEqual(self.client.get("/tenants/1"), {"id": "ofc-1"})
+        self.assertEqual(self.client.get("/tenants/1"), {"id": "ofc-1"})
+        self.assertEqual(self.conn_type.call_count, 1)
+        self.assertEqual(conn.request.call_count, 2)
+        self.assertEqual(self.client.connections, [conn])
+
+    def test_close_connection_if_server_closes(self):
+        """test connections the OFC closes are not kept"""
+        conn = self.conn_type.return_value
+        conn.getresponse.return_value = _response(will_close=True)
+        self.client.delete("/tenants/1")
+        conn.close.assert_called_once_with()
+        self.assertEqual(self.client.connections, [])
+
+    def test_retry_stale_connection(self):
+        """test a request failing on an idle connection is retried"""
+        stale = mock.Mock()
+        stale.request.side_effect = httplib.BadStatusLine('')
+        self.client.connections.append(stale)
+        conn = self.conn_type.return_value
+        conn.getresponse.return_value = _response()
+        self.assertEqual(self.client.get("/tenants/1"), {"id": "ofc-1"})
+        stale.close.assert_called_once_with()
+        self.assertEqual(self.client.connections, [conn])
+
+    def test_no_resend_sent_post(self):
+        """test a POST sent on an idle connection is not sent again"""
+        stale = mock.Mock()
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+        self.client.connections.append(stale)
+        self.assertRaises(nexc.OFCException, self.client.post, "/tenants")
+        stale.close.assert_called_once_with()
+        self.assertFalse(self.conn_type.called)
+
+    def test_connection_failure(self):
+        """test a failure on a new connection raises OFCException"""
+        conn = self.conn_type.return_value
+        conn.request.side_effect = socket.error()
+        self.assertRaises(nexc.OFCException, self.client.get, "/tenants/1")
+        self.assertEqual(conn.request.call_count, 1)
+        self.assertEqual(self.client.connections, [])
+
+    def test_error_status(self):
+        """test an error status raises OFCException"""
+        conn = self.conn_type.return_value
+        conn.getresponse.return_value = _response(
+            status=httplib.INTERNAL_SERVER_ERROR)
+        self.assertRaises(nexc.OFCException, self.client.get, "/tenants/1")
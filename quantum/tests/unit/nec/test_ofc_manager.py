@@ -17,8 +17,12 @@
 
 import unittest
 
+import eventlet
+import mock
+
 from quantum.openstack.common import uuidutils
 from quantum.plugins.nec.common import config
+from quantum.plugins.nec.common import exceptions as nexc
 from quantum.plugins.nec.db import api as ndb
 from quantum.plugins.nec.db import models as nmodels
 from quantum.plugins.nec import ofc_manager
@@ -158,3 +162,69 @@ class OFCManagerTest(unittest.TestCase):
         self.assertTrue(ndb.find_ofc_item(nmodels.OFCFilter, f))
         self.ofc.delete_ofc_packet_filter(t, n, f)
         self.assertFalse(ndb.find_ofc_item(nmodels.OFCFilter, f))
+
+    def testm_run_concurrently(self):
+        """test run_concurrently"""
+        t, n, p, f, none = self.get_random_params()
+        results = self.ofc.run_concurrently(
+            [(self.ofc.driver.create_tenant, ('desc', tenant))
+             for tenant in (t, n)])
+        self.assertEqual(results, ["ofc-" + t[:-4], "ofc-" + n[:-4]])
+
+    def testn_run_concurrently_error(self):
+        """test run_concurrently raises after all calls finished"""
+        t, n, p, f, none = self.get_random_params()
+        done = []
+
+        def _fail():
+            raise nexc.OFCException(reason='failed')
+
+        def _succeed():
+            eventlet.sleep(0)
+            done.append(True)
+
+        self.assertRaises(nexc.OFCException, self.ofc.run_concurrently,
+                          [(_fail, ()), (_succeed, ())])
+        self.assertEqual(done, [True])
+
+    def testo_create_ofc_ports(self):
+        """test create_ofc_ports"""
+        t, n, p, f, none = self.get_random_params()
+        self.ofc.create_ofc_tenant(t)
+        self.ofc.create_ofc_network(t, n)
+        p2 = uuidutils.generate_uuid()
+        callers = set()
+        add_ofc_item = ndb.add_ofc_item
+
+        def _add_ofc_item(*args):
+            callers.add(eventlet.greenthread.getcurrent())
+            return add_ofc_item(*args)
+
+        with mock.patch.object(ndb, 'add_ofc_item',
+                               side_effect=_add_ofc_item):
+            errors = self.ofc.create_ofc_ports([(t, n, p, None),
+                                                (t, n, p2, None),
+                                                (t, none, f, None)])
+        # the database is only used from the calling greenthread
+        self.assertEqual(callers, set([eventlet.greenthread.getcurrent()]))
+        self.assertEqual(errors.keys(), [f])
+        self.assertIsInstance(errors[f], nexc.OFCConsistencyBroken)
+        self.assertEqual(self.ofc.exists_ofc_ports([p, p2, f]),
+                         set([p, p2]))
+
+    def testp_delete_ofc_ports(self):
+        """test delete_ofc_ports"""
+        t, n, p, f, none = self.get_random_params()
+        self.ofc.create_ofc_tenant(t)
+        self.ofc.create_ofc_network(t, n)
+        p2 = uuidutils.generate_uuid()
+        self.ofc.create_ofc_ports([(t, n, p, None), (t, n, p2, None)])
+        with mock.patch.object(self.ofc.driver, 'delete_port',
+                               side_effect=[None,
+                                            nexc.OFCException(reason='x')]):
+            errors = self.ofc.delete_ofc_ports([(t, n, p), (t, n, p2),
+                                                (t, n, none)])
+        self.assertEqual(set(errors), set([p2, none]))
+        self.assertIsInstance(errors[p2], nexc.OFCException)
+        self.assertIsInstance(errors[none], nexc.OFCConsistencyBroken)
+        self.assertEqual(self.ofc.exists_ofc_ports([p, p2]), set([p2]))
@@ -31,6 +31,7 @@ class TestConfig(object):
     use_ssl = False
     key_file = None
     cert_file = None
+    pool_size = 4
 
 
 def _ofc(id):
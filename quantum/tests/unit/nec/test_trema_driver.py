@@ -28,6 +28,7 @@ class TestConfig(object):
     """Configuration for this test"""
     host = '127.0.0.1'
     port = 8888
+    pool_size = 4
 
 
 class TremaDriverTestBase():
@@ -19,6 +19,7 @@ import mox
 import unittest2 as unittest
 
 from quantum.agent.linux import ovs_lib, utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import uuidutils
 
 
@@ -92,30 +93,31 @@ class OVS_Lib_Test(unittest.TestCase):
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=2,dl_src=ca:fe:de:ad:be:ef"
                        ",actions=strip_vlan,output:0"],
-                      root_helper=self.root_helper)
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=1,actions=normal"],
-                      root_helper=self.root_helper)
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=2,actions=drop"],
-                      root_helper=self.root_helper)
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=2,in_port=%s,actions=drop" % ofport],
-                      root_helper=self.root_helper)
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=4,in_port=%s,dl_vlan=%s,"
                        "actions=strip_vlan,set_tunnel:%s,normal"
                        % (ofport, vid, lsw_id)],
-                      root_helper=self.root_helper)
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
                        "hard_timeout=0,idle_timeout=0,"
                        "priority=3,tun_id=%s,actions="
                        "mod_vlan_vid:%s,output:%s"
-                       % (lsw_id, vid, ofport)], root_helper=self.root_helper)
+                       % (lsw_id, vid, ofport)],
+                      root_helper=self.root_helper, process_input=None)
         self.mox.ReplayAll()
 
         self.br.add_flow(priority=2, dl_src="ca:fe:de:ad:be:ef",
@@ -155,8 +157,8 @@ class OVS_Lib_Test(unittest.TestCase):
 
     def test_count_flows(self):
         utils.execute(["ovs-ofctl", "dump-flows", self.BR_NAME],
-                      root_helper=self.root_helper).AndReturn('ignore'
-                                                              '\nflow-1\n')
+                      root_helper=self.root_helper,
+                      process_input=None).AndReturn('ignore\nflow-1\n')
         self.mox.ReplayAll()
 
         # counts the number of flows as total lines of output - 2
@@ -168,11 +170,14 @@ class OVS_Lib_Test(unittest.TestCase):
         lsw_id = 40
         vid = 39
         utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME,
-                       "in_port=" + ofport], root_helper=self.root_helper)
+                       "in_port=" + ofport],
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME,
-                       "tun_id=%s" % lsw_id], root_helper=self.root_helper)
+                       "tun_id=%s" % lsw_id],
+                      root_helper=self.root_helper, process_input=None)
         utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME,
-                       "dl_vlan=%s" % vid], root_helper=self.root_helper)
+                       "dl_vlan=%s" % vid],
+                      root_helper=self.root_helper, process_input=None)
         self.mox.ReplayAll()
 
         self.br.delete_flows(in_port=ofport)
@@ -180,6 +185,35 @@ class OVS_Lib_Test(unittest.TestCase):
         self.br.delete_flows(dl_vlan=vid)
         self.mox.VerifyAll()
 
+    def test_deferred_flows(self):
+        add_flows = ["hard_timeout=0,idle_timeout=0,priority=2,"
+                     "in_port=%s,actions=drop" % ofport
+                     for ofport in (1, 2)]
+        utils.execute(["ovs-ofctl", "add-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="\n".join(add_flows) + "\n")
+        utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME, "in_port=3"],
+                      root_helper=self.root_helper, process_input=None)
+        utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME,
+                       "hard_timeout=0,idle_timeout=0,priority=0,"
+                       "in_port=3,actions=normal"],
+                      root_helper=self.root_helper, process_input=None)
+        utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="in_port=1\ndl_vlan=4\n")
+        self.mox.ReplayAll()
+
+        self.br.defer_apply_on()
+        self.br.add_flow(priority=2, in_port=1, actions="drop")
+        self.br.add_flow(priority=2, in_port=2, actions="drop")
+        self.br.delete_flows(in_port=3)
+        self.br.add_flow(in_port=3, actions="normal")
+        self.br.delete_flows(in_port=1)
+        self.br.delete_flows(dl_vlan=4)
+        self.br.defer_apply_off()
+        self.br.defer_apply_off()
+        self.mox.VerifyAll()
+
     def test_add_tunnel_port(self):
         pname = "tap99"
         ip = "9.9.9.9"
@@ -269,6 +303,46 @@ class OVS_Lib_Test(unittest.TestCase):
     def test_get_vif_ports_xen(self):
         self._test_get_vif_ports(True)
 
+    def test_get_vif_port_map(self):
+        vif_id = uuidutils.generate_uuid()
+        mac = "ca:fe:de:ad:be:ef"
+        xen_vif_id = uuidutils.generate_uuid()
+        interfaces = {'headings': ['name', 'external_ids', 'ofport'],
+                      'data': [
+                          ['tap99', ['map', [['iface-id', vif_id],
+                                             ['attached-mac', mac]]], 6],
+                          ['vif1.0', ['map', [['xs-vif-uuid', 'xs-uuid'],
+                                              ['attached-mac', mac]]], 7],
+                          ['patch-tun', ['map', []], 1],
+                          ['tap100', ['map', [['iface-id', 'no-ofport'],
+                                              ['attached-mac', mac]]],
+                           ['set', []]],
+                          ['tap-other-br', ['map', [['iface-id', 'x'],
+                                                    ['attached-mac', mac]]],
+                           2]]}
+
+        utils.execute(["ovs-vsctl", self.TO, "list-ports", self.BR_NAME],
+                      root_helper=self.root_helper).AndReturn(
+                          "tap99\nvif1.0\npatch-tun\ntap100\n")
+        utils.execute(["ovs-vsctl", self.TO, "--format=json", "--",
+                       "--columns=name,external_ids,ofport",
+                       "list", "Interface"],
+                      root_helper=self.root_helper).AndReturn(
+                          jsonutils.dumps(interfaces))
+        utils.execute(["xe", "vif-param-get", "param-name=other-config",
+                       "param-key=nicira-iface-id", "uuid=xs-uuid"],
+                      root_helper=self.root_helper).AndReturn(xen_vif_id)
+        self.mox.ReplayAll()
+
+        ports = self.br.get_vif_port_map()
+        self.assertEqual(sorted(ports), sorted([vif_id, xen_vif_id]))
+        self.assertEqual(ports[vif_id].port_name, 'tap99')
+        self.assertEqual(ports[vif_id].ofport, 6)
+        self.assertEqual(ports[vif_id].vif_mac, mac)
+        self.assertEqual(ports[xen_vif_id].port_name, 'vif1.0')
+        self.assertEqual(ports[xen_vif_id].switch.br_name, self.BR_NAME)
+        self.mox.VerifyAll()
+
     def test_clear_db_attribute(self):
         pname = "tap77"
         utils.execute(["ovs-vsctl", self.TO, "clear", "Port",
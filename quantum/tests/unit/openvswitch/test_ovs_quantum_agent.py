@@ -146,3 +146,12 @@ class TestOvsQuantumAgent(unittest.TestCase):
 
     def test_treat_devices_removed_ignores_missing_port(self):
         self.mock_treat_devices_removed(False)
+
+    def test_process_network_ports_defers_flows(self):
+        self.agent.int_br = mock.Mock()
+        with mock.patch.object(self.agent, 'treat_devices_added',
+                               side_effect=Exception()):
+            with self.assertRaises(Exception):
+                self.agent.process_network_ports({'added': set(['dev'])})
+        self.agent.int_br.defer_apply_on.assert_called_once_with()
+        self.agent.int_br.defer_apply_off.assert_called_once_with()
@@ -18,6 +18,9 @@
 from contextlib import nested
 import operator
 
+import mock
+
+from quantum.common import exceptions as q_exc
 from quantum.db import api as db
 from quantum.openstack.common import cfg
 # NOTE: this import is needed for correct plugin code work
@@ -33,9 +36,15 @@ class RyuDBTest(test_plugin.QuantumDbPluginV2TestCase):
         key_list.sort(key=operator.attrgetter('tunnel_key'))
         return [(key.network_id, key.tunnel_key) for key in key_list]
 
+    @staticmethod
+    def _free_ranges(session):
+        ranges = session.query(ryu_models_v2.TunnelKeyFreeRange).all()
+        return sorted((r.first_key, r.last_key) for r in ranges)
+
     def test_key_allocation(self):
         tunnel_key = db_api_v2.TunnelKey()
         session = db.get_session()
+        tunnel_key.sync_free_keys(session)
         with nested(self.network('network-0'),
                     self.network('network-1')
                     ) as (network_0,
@@ -58,3 +67,87 @@ class RyuDBTest(test_plugin.QuantumDbPluginV2TestCase):
 
                 tunnel_key.delete(session, network_id1)
                 self.assertEqual(tunnel_key.all_list(), [])
+
+    def test_key_allocation_reuses_released_key(self):
+        tunnel_key = db_api_v2.TunnelKey(1, 3)
+        session = db.get_session()
+        tunnel_key.sync_free_keys(session)
+        with nested(self.network('network-0'),
+                    self.network('network-1'),
+                    self.network('network-2'),
+                    self.network('network-3')) as networks:
+            ids = [network['network']['id'] for network in networks]
+            keys = [tunnel_key.allocate(session, net_id)
+                    for net_id in ids[:3]]
+            self.assertEqual(keys, [1, 2, 3])
+            self.assertRaises(q_exc.ResourceExhausted,
+                              tunnel_key.allocate, session, ids[3])
+
+            tunnel_key.delete(session, ids[1])
+            self.assertEqual(tunnel_key.allocate(session, ids[3]), 2)
+            self.assertEqual(self._tunnel_key_sort(tunnel_key.all_list()),
+                             [(ids[0], 1), (ids[3], 2), (ids[2], 3)])
+            for net_id in ids:
+                tunnel_key.delete(session, net_id)
+
+    def test_sync_free_keys(self):
+        session = db.get_session()
+        with nested(self.network('network-0'),
+                    self.network('network-1')) as (network_0, network_1):
+            for network, key in ((network_0, 2), (network_1, 4)):
+                session.add(ryu_models_v2.TunnelKey(
+                    network_id=network['network']['id'], tunnel_key=key))
+            session.flush()
+
+            tunnel_key = db_api_v2.TunnelKey(1, 5)
+            tunnel_key.sync_free_keys(session)
+            self.assertEqual(self._free_ranges(session),
+                             [(1, 1), (3, 3), (5, 5)])
+
+            tunnel_key = db_api_v2.TunnelKey(2, 10)
+            tunnel_key.sync_free_keys(session)
+            self.assertEqual(self._free_ranges(session),
+                             [(3, 3), (5, 10)])
+            for network in (network_0, network_1):
+                tunnel_key.delete(session, network['network']['id'])
+
+    def test_sync_free_keys_unchanged(self):
+        session = db.get_session()
+        tunnel_key = db_api_v2.TunnelKey(1, 5)
+        tunnel_key.sync_free_keys(session)
+        with mock.patch.object(session, 'execute') as execute:
+            tunnel_key.sync_free_keys(session)
+        self.assertFalse(execute.called)
+        self.assertEqual(self._free_ranges(session), [(1, 5)])
+
+    def test_delete_merges_free_ranges(self):
+        tunnel_key = db_api_v2.TunnelKey(1, 5)
+        session = db.get_session()
+        tunnel_key.sync_free_keys(session)
+        with nested(self.network('network-0'),
+                    self.network('network-1'),
+                    self.network('network-2'),
+                    self.network('network-3'),
+                    self.network('network-4')) as networks:
+            ids = [network['network']['id'] for network in networks]
+            for net_id in ids:
+                tunnel_key.allocate(session, net_id)
+            self.assertEqual(self._free_ranges(session), [])
+
+            # keys 2 and 4: no neighbouring free range
+            tunnel_key.delete(session, ids[1])
+            tunnel_key.delete(session, ids[3])
+            self.assertEqual(self._free_ranges(session), [(2, 2), (4, 4)])
+            # key 5: merged into the range before it
+            tunnel_key.delete(session, ids[4])
+            self.assertEqual(self._free_ranges(session), [(2, 2), (4, 5)])
+            # key 1: merged into the range after it
+            tunnel_key.delete(session, ids[0])
+            self.assertEqual(self._free_ranges(session), [(1, 2), (4, 5)])
+            # key 3: joins the ranges on both sides
+            tunnel_key.delete(session, ids[2])
+            self.assertEqual(self._free_ranges(session), [(1, 5)])
+
+            self.assertEqual(tunnel_key.allocate(session, ids[0]), 1)
+            self.assertEqual(self._free_ranges(session), [(2, 5)])
+            tunnel_key.delete(session, ids[0])
@@ -13,8 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+
 import mock
 
+from quantum import manager
+from quantum.openstack.common import cfg
 from quantum.tests.unit import test_db_plugin as test_plugin
 
 
@@ -64,3 +68,45 @@ class TestRyuPortsV2(test_plugin.TestPortsV2, RyuPluginV2TestCase):
 
 class TestRyuNetworksV2(test_plugin.TestNetworksV2, RyuPluginV2TestCase):
     pass
+
+
+class TestRyuStartupSync(RyuPluginV2TestCase):
+
+    def test_create_all_tenant_network(self):
+        cfg.CONF.set_override('sync_page_size', 1, 'OVS')
+        self.addCleanup(cfg.CONF.clear_override, 'sync_page_size', 'OVS')
+        plugin = manager.QuantumManager.get_plugin()
+        with contextlib.nested(self.subnet(cidr='10.0.1.0/24'),
+                               self.subnet(cidr='10.0.2.0/24')) as (s1, s2):
+            with contextlib.nested(self.port(subnet=s1),
+                                   self.port(subnet=s2)) as (p1, p2):
+                self._check_create_all_tenant_network(plugin, p1, p2)
+
+    def _check_create_all_tenant_network(self, plugin, p1, p2):
+        plugin.client.reset_mock()
+        plugin.tun_client.reset_mock()
+        plugin.iface_client.reset_mock()
+
+        plugin._create_all_tenant_network()
+
+        ports = [p1['port'], p2['port']]
+        net_ids = set(port['network_id'] for port in ports)
+        self.assertEqual(
+            set(args[0] for args, kwargs in
+                plugin.client.update_network.call_args_list),
+            net_ids)
+        self.assertEqual(
+            set(args[0] for args, kwargs in
+                plugin.tun_client.update_tunnel_key.call_args_list),
+            net_ids)
+        self.assertEqual(
+            sorted(args for args, kwargs in
+                   plugin.iface_client.update_network_id.call_args_list),
+            sorted((port['id'], port['network_id']) for port in ports))
+
+    def test_create_all_tenant_network_error(self):
+        plugin = manager.QuantumManager.get_plugin()
+        with self.network() as network:
+            plugin.client.update_network.side_effect = ValueError()
+            self.assertRaises(ValueError, plugin._create_all_tenant_network)
+            plugin.client.update_network.side_effect = None
@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import httplib
+import socket
+
 import unittest2 as unittest
 
 from quantum.common import utils
@@ -58,3 +61,27 @@ class TestParseMappings(unittest.TestCase):
 
     def test_parse_mappings_succeeds_for_no_mappings(self):
         self.assertEqual(self.parse(['']), {})
+
+
+class TestCanResendHttpRequest(unittest.TestCase):
+    def test_not_sent(self):
+        self.assertTrue(utils.can_resend_http_request(
+            'POST', False, socket.error()))
+
+    def test_sent_idempotent(self):
+        self.assertTrue(utils.can_resend_http_request(
+            'GET', True, httplib.BadStatusLine('')))
+        self.assertTrue(utils.can_resend_http_request(
+            'DELETE', True, socket.error()))
+
+    def test_sent_not_idempotent(self):
+        self.assertFalse(utils.can_resend_http_request(
+            'POST', True, httplib.BadStatusLine('')))
+
+    def test_sent_incomplete_response(self):
+        self.assertFalse(utils.can_resend_http_request(
+            'GET', True, httplib.IncompleteRead('')))
+
+    def test_timeout(self):
+        self.assertFalse(utils.can_resend_http_request(
+            'GET', False, socket.timeout()))
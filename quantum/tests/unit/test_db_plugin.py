@@ -1419,6 +1419,38 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
                         120)
                     self.assertTrue(log.mock_calls)
 
+    def test_update_fixed_ip_leases_expiration(self):
+        plugin = QuantumManager.get_plugin()
+        with self.subnet() as subnet:
+            with contextlib.nested(self.port(subnet=subnet),
+                                   self.port(subnet=subnet)) as ports:
+                ip_addresses = [port['port']['fixed_ips'][0]['ip_address']
+                                for port in ports]
+                update_context = context.Context('', ports[0]['port']
+                                                 ['tenant_id'])
+                reference = timeutils.utcnow()
+                with mock.patch.object(timeutils, 'utcnow') as mock_utcnow:
+                    mock_utcnow.return_value = reference
+                    plugin.update_fixed_ip_leases_expiration(
+                        update_context,
+                        subnet['subnet']['network_id'],
+                        {ip_addresses[0]: 500, ip_addresses[1]: 1000,
+                         '255.255.255.0': 10})
+
+                q = update_context.session.query(models_v2.IPAllocation)
+                q = q.filter(
+                    models_v2.IPAllocation.ip_address.in_(ip_addresses))
+                expirations = dict((ip_allocation.ip_address,
+                                    ip_allocation.expiration)
+                                   for ip_allocation in q)
+
+                self.assertEqual(
+                    expirations,
+                    {ip_addresses[0]:
+                     reference + datetime.timedelta(seconds=500),
+                     ip_addresses[1]:
+                     reference + datetime.timedelta(seconds=1000)})
+
     def test_hold_ip_address(self):
         plugin = QuantumManager.get_plugin()
         with self.subnet() as subnet:
@@ -13,11 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import unittest
 
 import mock
 
+from quantum import context
 from quantum.db import dhcp_rpc_base
+from quantum.tests.unit import test_db_plugin
 
 
 class TestDhcpRpcCallackMixin(unittest.TestCase):
@@ -48,6 +51,40 @@ class TestDhcpRpcCallackMixin(unittest.TestCase):
 
         self.assertEqual(len(self.log.mock_calls), 1)
 
+    def test_get_active_networks_info(self):
+        self.plugin.get_networks.return_value = [dict(id='c'), dict(id='b')]
+        self.plugin.get_subnets.return_value = [
+            dict(id='s1', network_id='b'), dict(id='s2', network_id='c')]
+        self.plugin.get_ports.return_value = [
+            dict(id='p1', network_id='c'), dict(id='p2', network_id='c')]
+
+        with mock.patch.object(self.callbacks, '_get_active_network_ids',
+                               return_value=['b', 'c']) as get_ids:
+            retval = self.callbacks.get_active_networks_info(
+                mock.Mock(), host='host', limit=2, marker='a')
+            get_ids.assert_called_once_with(mock.ANY, 'a', 2)
+
+        self.assertEqual([net['id'] for net in retval], ['b', 'c'])
+        self.assertEqual([s['id'] for s in retval[0]['subnets']], ['s1'])
+        self.assertEqual(retval[0]['ports'], [])
+        self.assertEqual([p['id'] for p in retval[1]['ports']], ['p1', 'p2'])
+        self.plugin.assert_has_calls([
+            mock.call.get_networks(mock.ANY, filters=dict(id=['b', 'c'])),
+            mock.call.get_subnets(mock.ANY,
+                                  filters=dict(network_id=['b', 'c'])),
+            mock.call.get_ports(mock.ANY,
+                                filters=dict(network_id=['b', 'c']))])
+
+    def test_get_active_networks_info_empty_page(self):
+        with mock.patch.object(self.callbacks, '_get_active_network_ids',
+                               return_value=[]):
+            retval = self.callbacks.get_active_networks_info(
+                mock.Mock(), host='host', limit=2, marker='a')
+
+        self.assertEqual(retval, [])
+        self.assertFalse(self.plugin.get_networks.called)
+        self.assertFalse(self.plugin.get_subnets.called)
+
     def test_get_network_info(self):
         network_retval = dict(id='a')
 
@@ -134,6 +171,16 @@ class TestDhcpRpcCallackMixin(unittest.TestCase):
                                                        device_id=['devid'])),
             mock.call.delete_port(mock.ANY, 'port_id')])
 
+    def test_update_leases_expiration(self):
+        leases = {'10.0.0.2': 120, '10.0.0.3': 60}
+        self.callbacks.update_leases_expiration(mock.Mock(), host='host',
+                                                network_id='netid',
+                                                leases=leases)
+
+        self.plugin.assert_has_calls([
+            mock.call.update_fixed_ip_leases_expiration(mock.ANY, 'netid',
+                                                        leases)])
+
     def test_release_port_fixed_ip(self):
         port_retval = dict(id='port_id', fixed_ips=[dict(subnet_id='a')])
         port_update = dict(id='port_id', fixed_ips=[])
@@ -147,3 +194,21 @@ class TestDhcpRpcCallackMixin(unittest.TestCase):
                                                        device_id=['devid'])),
             mock.call.update_port(mock.ANY, 'port_id',
                                   dict(port=port_update))])
+
+
+class TestDhcpRpcCallbackMixinDb(test_db_plugin.QuantumDbPluginV2TestCase):
+
+    def test_get_active_network_ids(self):
+        callbacks = dhcp_rpc_base.DhcpRpcCallbackMixin()
+        ctx = context.get_admin_context()
+        with contextlib.nested(self.network(), self.network(),
+                               self.network(),
+                               self.network(admin_state_up=False)) as nets:
+            ids = sorted(net['network']['id'] for net in nets
+                         if net['network']['admin_state_up'])
+            self.assertEqual(
+                callbacks._get_active_network_ids(ctx, None, 2), ids[:2])
+            self.assertEqual(
+                callbacks._get_active_network_ids(ctx, ids[1], 2), ids[2:])
+            self.assertEqual(
+                callbacks._get_active_network_ids(ctx, ids[2], 2), [])
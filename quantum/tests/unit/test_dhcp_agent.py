@@ -15,6 +15,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import os
 import socket
 import sys
@@ -68,7 +69,8 @@ fake_port1 = FakeModel('12345678-1234-aaaa-1234567890ab',
 
 fake_port2 = FakeModel('12345678-1234-aaaa-123456789000',
                        mac_address='aa:bb:cc:dd:ee:99',
-                       network_id='12345678-1234-5678-1234567890ab')
+                       network_id='12345678-1234-5678-1234567890ab',
+                       fixed_ips=[])
 
 fake_network = FakeModel('12345678-1234-5678-1234567890ab',
                          tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
@@ -161,30 +163,97 @@ class TestDhcpAgent(unittest.TestCase):
                 self.assertTrue(dhcp.needs_resync)
 
     def test_update_lease(self):
-        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+        with contextlib.nested(
+            mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi'),
+            mock.patch.object(dhcp_agent.eventlet, 'spawn_after'),
+            mock.patch.object(dhcp_agent.time, 'time')
+        ) as (plug, spawn_after, time):
+            time.return_value = 1000.0
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.update_lease('net_id', '192.168.1.1', 120)
+            spawn_after.assert_called_once_with(
+                cfg.CONF.lease_update_delay, dhcp._send_lease_updates,
+                'net_id')
+
+            time.return_value = 1001.0
+            dhcp._send_lease_updates('net_id')
+            plug.assert_has_calls(
+                [mock.call().update_leases_expiration(
+                    'net_id', {'192.168.1.1': 119})])
+            self.assertEqual(dhcp.pending_leases, {})
+
+    def test_update_lease_coalesced(self):
+        with contextlib.nested(
+            mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi'),
+            mock.patch.object(dhcp_agent.eventlet, 'spawn_after'),
+            mock.patch.object(dhcp_agent.time, 'time')
+        ) as (plug, spawn_after, time):
+            time.return_value = 1000.0
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.update_lease('net_id', '192.168.1.1', 120)
+            dhcp.update_lease('net_id', '192.168.1.2', 60)
+            dhcp.update_lease('net_id2', '192.168.1.1', 30)
+            time.return_value = 1010.0
+            dhcp.update_lease('net_id', '192.168.1.1', 300)
+            dhcp.update_lease('net_id', '192.168.1.2', 10)
+            self.assertEqual(spawn_after.call_count, 2)
+
+            dhcp._send_lease_updates('net_id')
+            dhcp._send_lease_updates('net_id2')
+            self.assertEqual(
+                plug.return_value.mock_calls,
+                [mock.call.update_leases_expiration(
+                    'net_id', {'192.168.1.1': 300, '192.168.1.2': 10}),
+                 mock.call.update_leases_expiration(
+                     'net_id2', {'192.168.1.1': 20})])
+
+    def test_update_lease_released(self):
+        with contextlib.nested(
+            mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi'),
+            mock.patch.object(dhcp_agent.eventlet, 'spawn_after'),
+            mock.patch.object(dhcp_agent.time, 'time')
+        ) as (plug, spawn_after, time):
+            time.return_value = 1000.0
             dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
             dhcp.update_lease('net_id', '192.168.1.1', 120)
+            dhcp.update_lease('net_id', '192.168.1.1', 0)
+
+            dhcp._send_lease_updates('net_id')
             plug.assert_has_calls(
-                [mock.call().update_lease_expiration(
-                    'net_id', '192.168.1.1', 120)])
+                [mock.call().update_leases_expiration(
+                    'net_id', {'192.168.1.1': 0})])
 
     def test_update_lease_failure(self):
-        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
-            plug.return_value.update_lease_expiration.side_effect = Exception
+        with contextlib.nested(
+            mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi'),
+            mock.patch.object(dhcp_agent.eventlet, 'spawn_after')
+        ) as (plug, spawn_after):
+            plug.return_value.update_leases_expiration.side_effect = Exception
+            spawn_after.side_effect = lambda delay, func, *args: func(*args)
 
             with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
                 dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
                 dhcp.update_lease('net_id', '192.168.1.1', 120)
                 plug.assert_has_calls(
-                    [mock.call().update_lease_expiration(
-                        'net_id', '192.168.1.1', 120)])
+                    [mock.call().update_leases_expiration(
+                        'net_id', {'192.168.1.1': 120})])
 
                 self.assertTrue(log.called)
                 self.assertTrue(dhcp.needs_resync)
 
-    def _test_sync_state_helper(self, known_networks, active_networks):
+    def _test_sync_state_helper(self, known_networks, active_networks,
+                                bulk=True):
+        networks = dict((net_id, dhcp_agent.DictModel(dict(id=net_id)))
+                        for net_id in active_networks)
         with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
             mock_plugin = mock.Mock()
+            if bulk:
+                mock_plugin.get_active_networks_info.return_value = (
+                    networks.values())
+            else:
+                mock_plugin.get_active_networks_info.side_effect = (
+                    AttributeError)
+                networks = dict.fromkeys(active_networks)
             mock_plugin.get_active_networks.return_value = active_networks
             plug.return_value = mock_plugin
 
@@ -198,15 +267,20 @@ class TestDhcpAgent(unittest.TestCase):
                 mocks['cache'].get_network_ids.return_value = known_networks
                 dhcp.sync_state()
 
-                exp_refresh = [
-                    mock.call(net_id) for net_id in active_networks]
+                exp_refresh = [mock.call(net_id, networks[net_id])
+                               for net_id in active_networks]
 
                 diff = set(known_networks) - set(active_networks)
                 exp_disable = [mock.call(net_id) for net_id in diff]
 
                 mocks['cache'].assert_has_calls([mock.call.get_network_ids()])
-                mocks['refresh_dhcp_helper'].assert_has_called(exp_refresh)
-                mocks['disable_dhcp_helper'].assert_has_called(exp_disable)
+                mocks['refresh_dhcp_helper'].assert_has_calls(
+                    exp_refresh, any_order=True)
+                mocks['disable_dhcp_helper'].assert_has_calls(
+                    exp_disable, any_order=True)
+                self.assertEqual(mock_plugin.get_active_networks.called,
+                                 not bulk)
+                self.assertFalse(dhcp.needs_resync)
 
     def test_sync_state_initial(self):
         self._test_sync_state_helper([], ['a'])
@@ -217,10 +291,17 @@ class TestDhcpAgent(unittest.TestCase):
     def test_sync_state_disabled_net(self):
         self._test_sync_state_helper(['b'], ['a'])
 
+    def test_sync_state_many_networks(self):
+        self._test_sync_state_helper(['b', 'z'],
+                                     [str(i) for i in range(10)] + ['b'])
+
+    def test_sync_state_without_bulk_rpc(self):
+        self._test_sync_state_helper(['b'], ['a', 'c'], bulk=False)
+
     def test_sync_state_plugin_error(self):
         with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
             mock_plugin = mock.Mock()
-            mock_plugin.get_active_networks.side_effect = Exception
+            mock_plugin.get_active_networks_info.side_effect = Exception
             plug.return_value = mock_plugin
 
             with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
@@ -289,6 +370,12 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
         self.call_driver.assert_called_once_with('enable', fake_network)
         self.cache.assert_has_calls([mock.call.put(fake_network)])
 
+    def test_enable_dhcp_helper_prefetched_network(self):
+        self.dhcp.enable_dhcp_helper(fake_network.id, fake_network)
+        self.assertFalse(self.plugin.get_network_info.called)
+        self.call_driver.assert_called_once_with('enable', fake_network)
+        self.cache.assert_has_calls([mock.call.put(fake_network)])
+
     def test_enable_dhcp_helper_down_network(self):
         self.plugin.get_network_info.return_value = fake_down_network
         self.dhcp.enable_dhcp_helper(fake_down_network.id)
@@ -451,17 +538,30 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
         self.call_driver.assert_called_once_with('restart',
                                                  fake_network)
 
+    def _run_spawned_reloads(self):
+        spawn_after_p = mock.patch.object(dhcp_agent.eventlet, 'spawn_after')
+        spawn_after = spawn_after_p.start()
+        self.addCleanup(spawn_after_p.stop)
+        spawn_after.side_effect = lambda delay, func, *args: func(*args)
+        return spawn_after
+
     def test_port_update_end(self):
+        spawn_after = self._run_spawned_reloads()
         payload = dict(port=vars(fake_port2))
         self.cache.get_network_by_id.return_value = fake_network
         self.dhcp.port_update_end(payload)
         self.cache.assert_has_calls(
             [mock.call.get_network_by_id(fake_port2.network_id),
-             mock.call.put_port(mock.ANY)])
+             mock.call.put_port(mock.ANY),
+             mock.call.get_network_by_id(fake_network.id)])
+        spawn_after.assert_called_once_with(
+            cfg.CONF.reload_allocations_delay,
+            self.dhcp._reload_allocations, fake_network.id)
         self.call_driver.assert_called_once_with('reload_allocations',
                                                  fake_network)
 
     def test_port_delete_end(self):
+        self._run_spawned_reloads()
         payload = dict(port_id=fake_port2.id)
         self.cache.get_network_by_id.return_value = fake_network
         self.cache.get_port_by_id.return_value = fake_port2
@@ -470,11 +570,35 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
 
         self.cache.assert_has_calls(
             [mock.call.get_port_by_id(fake_port2.id),
-             mock.call.get_network_by_id(fake_network.id),
-             mock.call.remove_port(fake_port2)])
+             mock.call.remove_port(fake_port2),
+             mock.call.get_network_by_id(fake_network.id)])
         self.call_driver.assert_called_once_with('reload_allocations',
                                                  fake_network)
 
+    def test_port_events_coalesced(self):
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.return_value = fake_port2
+        with mock.patch.object(dhcp_agent.eventlet,
+                               'spawn_after') as spawn_after:
+            self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+            self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+            self.dhcp.port_delete_end(dict(port_id=fake_port2.id))
+            spawn_after.assert_called_once_with(
+                cfg.CONF.reload_allocations_delay,
+                self.dhcp._reload_allocations, fake_network.id)
+            self.assertFalse(self.call_driver.called)
+
+            self.dhcp._reload_allocations(fake_network.id)
+            self.call_driver.assert_called_once_with('reload_allocations',
+                                                     fake_network)
+            self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+            self.assertEqual(spawn_after.call_count, 2)
+
+    def test_reload_allocations_network_gone(self):
+        self.cache.get_network_by_id.return_value = None
+        self.dhcp._reload_allocations(fake_network.id)
+        self.assertFalse(self.call_driver.called)
+
     def test_port_delete_end_unknown_port(self):
         payload = dict(port_id='unknown')
         self.cache.get_port_by_id.return_value = None
@@ -505,6 +629,27 @@ class TestDhcpPluginApiProxy(unittest.TestCase):
         self.make_msg.assert_called_once_with('get_active_networks',
                                               host='foo')
 
+    def test_get_active_networks_info(self):
+        self.call.return_value = [dict(id='a'), dict(id='b')]
+        retval = self.proxy.get_active_networks_info()
+        self.assertEqual([net.id for net in retval], ['a', 'b'])
+        self.assertEqual(self.call.call_count, 1)
+        self.make_msg.assert_called_once_with(
+            'get_active_networks_info', host='foo',
+            limit=100, marker=None)
+
+    def test_get_active_networks_info_paged(self):
+        self.proxy.page_size = 2
+        self.call.side_effect = [[dict(id='a'), dict(id='b')],
+                                 [dict(id='c')]]
+        retval = self.proxy.get_active_networks_info()
+        self.assertEqual([net.id for net in retval], ['a', 'b', 'c'])
+        self.make_msg.assert_has_calls([
+            mock.call('get_active_networks_info', host='foo', limit=2,
+                      marker=None),
+            mock.call('get_active_networks_info', host='foo', limit=2,
+                      marker='b')])
+
     def test_get_network_info(self):
         self.call.return_value = dict(a=1)
         retval = self.proxy.get_network_info('netid')
@@ -551,6 +696,15 @@ class TestDhcpPluginApiProxy(unittest.TestCase):
                                               lease_remaining=1,
                                               host='foo')
 
+    def test_update_leases_expiration(self):
+        with mock.patch.object(self.proxy, 'cast') as mock_cast:
+            self.proxy.update_leases_expiration('netid', {'ipaddr': 1})
+            self.assertTrue(mock_cast.called)
+        self.make_msg.assert_called_once_with('update_leases_expiration',
+                                              network_id='netid',
+                                              leases={'ipaddr': 1},
+                                              host='foo')
+
 
 class TestNetworkCache(unittest.TestCase):
     def test_put_network(self):
@@ -654,11 +808,103 @@ class TestNetworkCache(unittest.TestCase):
         self.assertEqual(len(nc.port_lookup), 1)
         self.assertNotIn(fake_port2, fake_network.ports)
 
+    def test_remove_port_keeps_order(self):
+        fake_port3 = FakeModel('12345678-1234-aaaa-123456789333',
+                               network_id=fake_network.id,
+                               fixed_ips=[FakeModel('',
+                                                    ip_address='172.9.9.3')])
+        fake_network2 = FakeModel(fake_network.id,
+                                  subnets=[fake_subnet1],
+                                  ports=[fake_port1, fake_port2, fake_port3])
+
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network2)
+        nc.remove_port(fake_port1)
+
+        self.assertEqual(list(fake_network2.ports), [fake_port2, fake_port3])
+        self.assertEqual(nc.get_port_by_id(fake_port3.id), fake_port3)
+        self.assertEqual(nc.get_port_by_id(fake_port2.id), fake_port2)
+        self.assertIsNone(nc.get_port_by_id(fake_port1.id))
+
+    def test_put_port_existing_keeps_order(self):
+        port = FakeModel(fake_port1.id, network_id=fake_network.id,
+                         fixed_ips=[FakeModel('', ip_address='172.9.9.4')])
+        fake_network2 = FakeModel(fake_network.id,
+                                  subnets=[fake_subnet1],
+                                  ports=[fake_port1, fake_port2])
+
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network2)
+        nc.put_port(port)
+
+        self.assertEqual(list(fake_network2.ports), [port, fake_port2])
+        self.assertEqual(nc.get_port_by_id(fake_port1.id), port)
+
+    def test_put_port_existing_changed_ip(self):
+        port = FakeModel(fake_port1.id, network_id=fake_network.id,
+                         fixed_ips=[FakeModel('', ip_address='172.9.9.4')])
+        fake_network2 = FakeModel(fake_network.id,
+                                  subnets=[fake_subnet1],
+                                  ports=[fake_port1, fake_port2])
+
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network2)
+        nc.put_port(port)
+
+        self.assertIsNone(nc.get_port_by_ip_address(fake_network.id,
+                                                    '172.9.9.9'))
+        self.assertEqual(nc.get_port_by_ip_address(fake_network.id,
+                                                   '172.9.9.4'), port)
+        self.assertEqual(nc.ip_lookup[fake_network.id], {'172.9.9.4': port})
+
+    def test_remove_port_unindexes_ips(self):
+        fake_port3 = FakeModel('12345678-1234-aaaa-123456789333',
+                               network_id=fake_network.id,
+                               fixed_ips=[FakeModel('',
+                                                    ip_address='172.9.9.3')])
+        fake_network2 = FakeModel(fake_network.id,
+                                  subnets=[fake_subnet1],
+                                  ports=[fake_port1, fake_port3])
+
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network2)
+        nc.remove_port(fake_port1)
+
+        self.assertIsNone(nc.get_port_by_ip_address(fake_network.id,
+                                                    '172.9.9.9'))
+        self.assertEqual(nc.get_port_by_ip_address(fake_network.id,
+                                                   '172.9.9.3'), fake_port3)
+        self.assertEqual(nc.ip_lookup[fake_network.id],
+                         {'172.9.9.3': fake_port3})
+
+    def test_put_port_does_not_rebuild_ports(self):
+        fake_network2 = FakeModel(fake_network.id,
+                                  subnets=[fake_subnet1],
+                                  ports=[fake_port1])
+
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network2)
+        ports = fake_network2.ports
+        nc.put_port(fake_port2)
+        nc.remove_port(fake_port1)
+
+        self.assertIs(fake_network2.ports, ports)
+        self.assertEqual(list(ports), [fake_port2])
+
     def test_get_port_by_id(self):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
         self.assertEqual(nc.get_port_by_id(fake_port1.id), fake_port1)
 
+    def test_get_port_by_ip_address(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        self.assertEqual(nc.get_port_by_ip_address(fake_network.id,
+                                                   '172.9.9.9'), fake_port1)
+        self.assertIsNone(nc.get_port_by_ip_address(fake_network.id,
+                                                    '172.9.9.10'))
+        self.assertIsNone(nc.get_port_by_ip_address('other', '172.9.9.9'))
+
 
 class TestDeviceManager(unittest.TestCase):
     def setUp(self):
@@ -21,6 +21,7 @@ import inspect
 import os
 import unittest
 
+import mock
 import mox
 
 from quantum.agent.linux import iptables_manager
@@ -292,3 +293,29 @@ class IptablesManagerStateLessTestCase(unittest.TestCase):
 
     def test_nat_not_found(self):
         self.assertFalse('nat' in self.iptables.ipv4)
+
+
+class IptablesManagerLockTestCase(unittest.TestCase):
+
+    def _test_apply_lock_names(self, namespace, expected):
+        iptables = iptables_manager.IptablesManager(root_helper='sudo',
+                                                    use_ipv6=True,
+                                                    namespace=namespace)
+        iptables.execute = mock.Mock(return_value='')
+        with mock.patch.object(iptables_manager.lockutils, 'lock') as lock:
+            iptables.apply()
+        self.assertEqual(lock.mock_calls,
+                         [mock.call(expected[0], 'quantum-', True),
+                          mock.call().__enter__(),
+                          mock.call().__exit__(None, None, None),
+                          mock.call(expected[1], 'quantum-', True),
+                          mock.call().__enter__(),
+                          mock.call().__exit__(None, None, None)])
+
+    def test_apply_lock_root_namespace(self):
+        self._test_apply_lock_names(None, ['iptables', 'ip6tables'])
+
+    def test_apply_lock_per_namespace(self):
+        self._test_apply_lock_names('qrouter-1',
+                                    ['iptables-qrouter-1',
+                                     'ip6tables-qrouter-1'])
@@ -154,6 +154,31 @@ class TestDhcpBase(unittest.TestCase):
                     chmod.assert_called_once_with('/baz', 0644)
                     rename.assert_called_once_with('/baz', '/foo')
 
+    def test_replace_file_if_changed(self):
+        with mock.patch('__builtin__.open') as mock_open:
+            mock_open.return_value.__enter__ = lambda s: s
+            mock_open.return_value.__exit__ = mock.Mock()
+            mock_open.return_value.read.return_value = 'foo'
+            with mock.patch.object(dhcp, 'replace_file') as replace:
+                self.assertTrue(dhcp.replace_file_if_changed('/foo', 'bar'))
+                replace.assert_called_once_with('/foo', 'bar')
+
+    def test_replace_file_if_changed_unchanged(self):
+        with mock.patch('__builtin__.open') as mock_open:
+            mock_open.return_value.__enter__ = lambda s: s
+            mock_open.return_value.__exit__ = mock.Mock()
+            mock_open.return_value.read.return_value = 'bar'
+            with mock.patch.object(dhcp, 'replace_file') as replace:
+                self.assertFalse(dhcp.replace_file_if_changed('/foo', 'bar'))
+                self.assertFalse(replace.called)
+
+    def test_replace_file_if_changed_missing(self):
+        with mock.patch('__builtin__.open') as mock_open:
+            mock_open.side_effect = IOError
+            with mock.patch.object(dhcp, 'replace_file') as replace:
+                self.assertTrue(dhcp.replace_file_if_changed('/foo', 'bar'))
+                replace.assert_called_once_with('/foo', 'bar')
+
     def test_restart(self):
         class SubClass(dhcp.DhcpBase):
             def __init__(self):
@@ -556,6 +581,15 @@ tag:tag1,option:classless-static-route,%s,%s""".lstrip() % (fake_v6,
         self.execute.assert_called_once_with(exp_args, root_helper='sudo',
                                              check_exit_code=True)
 
+    def test_reload_allocations_unchanged(self):
+        with mock.patch.object(dhcp, 'replace_file_if_changed') as replace:
+            replace.return_value = False
+            dm = dhcp.Dnsmasq(self.conf, FakeDualNetwork(),
+                              namespace='qdhcp-ns')
+            dm.reload_allocations()
+            self.assertEqual(replace.call_count, 2)
+        self.assertFalse(self.execute.called)
+
     def _test_lease_relay_script_helper(self, action, lease_remaining,
                                         path_exists=True):
         relay_path = '/dhcp/relay_socket'
@@ -100,8 +100,11 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call('tap0', 'sudo', namespace=ns),
              mock.call().addr.list(scope='global', filters=['permanent']),
+             mock.call().batch(),
+             mock.call().batch().__enter__(),
              mock.call().addr.add(4, '192.168.1.2/24', '192.168.1.255'),
-             mock.call().addr.delete(4, '172.16.77.240/24')])
+             mock.call().addr.delete(4, '172.16.77.240/24'),
+             mock.call().batch().__exit__(None, None, None)])
 
 
 class TestOVSInterfaceDriver(TestBase):
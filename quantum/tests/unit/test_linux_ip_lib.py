@@ -183,15 +183,20 @@ class TestIpWrapper(unittest.TestCase):
                                              'sudo', None)
 
     def test_get_namespaces(self):
-        self.execute.return_value = '\n'.join(NETNS_SAMPLE)
-        retval = ip_lib.IPWrapper.get_namespaces('sudo')
-        self.assertEqual(retval,
-                         ['12345678-1234-5678-abcd-1234567890ab',
-                          'bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb',
-                          'cccccccc-cccc-cccc-cccc-cccccccccccc'])
+        with mock.patch('os.listdir') as listdir:
+            listdir.return_value = NETNS_SAMPLE
+            retval = ip_lib.IPWrapper.get_namespaces('sudo')
+            self.assertEqual(retval,
+                             ['12345678-1234-5678-abcd-1234567890ab',
+                              'bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb',
+                              'cccccccc-cccc-cccc-cccc-cccccccccccc'])
+            listdir.assert_called_once_with('/var/run/netns')
+            self.assertFalse(self.execute.called)
 
-        self.execute.assert_called_once_with('', 'netns', ('list',),
-                                             root_helper='sudo')
+    def test_get_namespaces_no_netns_dir(self):
+        with mock.patch('os.listdir') as listdir:
+            listdir.side_effect = OSError
+            self.assertEqual(ip_lib.IPWrapper.get_namespaces('sudo'), [])
 
     def test_add_tuntap(self):
         ip_lib.IPWrapper('sudo').add_tuntap('tap0')
@@ -620,18 +625,18 @@ class TestIpNetnsCommand(TestIPCmdBase):
             self._assert_sudo([], ('delete', 'ns'), force_root_namespace=True)
 
     def test_namespace_exists(self):
-        retval = '\n'.join(NETNS_SAMPLE)
-        self.parent._as_root.return_value = retval
-        self.assertTrue(
-            self.netns_cmd.exists('bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb'))
-        self._assert_sudo('o', ('list',), force_root_namespace=True)
+        with mock.patch('os.listdir') as listdir:
+            listdir.return_value = NETNS_SAMPLE
+            self.assertTrue(
+                self.netns_cmd.exists('bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb'))
+            self.assertFalse(self.parent._as_root.called)
 
     def test_namespace_doest_not_exist(self):
-        retval = '\n'.join(NETNS_SAMPLE)
-        self.parent._as_root.return_value = retval
-        self.assertFalse(
-            self.netns_cmd.exists('bbbbbbbb-1111-2222-3333-bbbbbbbbbbbb'))
-        self._assert_sudo('o', ('list',), force_root_namespace=True)
+        with mock.patch('os.listdir') as listdir:
+            listdir.return_value = NETNS_SAMPLE
+            self.assertFalse(
+                self.netns_cmd.exists('bbbbbbbb-1111-2222-3333-bbbbbbbbbbbb'))
+            self.assertFalse(self.parent._as_root.called)
 
     def test_execute(self):
         self.parent.namespace = 'ns'
@@ -655,13 +660,119 @@ class TestIpNetnsCommand(TestIPCmdBase):
 
 class TestDeviceExists(unittest.TestCase):
     def test_device_exists(self):
+        with mock.patch('os.path.exists') as exists:
+            exists.return_value = True
+            with mock.patch.object(ip_lib.IPDevice, '_execute') as _execute:
+                self.assertTrue(ip_lib.device_exists('eth0'))
+                exists.assert_called_once_with('/sys/class/net/eth0')
+                self.assertFalse(_execute.called)
+
+    def test_device_does_not_exist(self):
+        with mock.patch('os.path.exists') as exists:
+            exists.return_value = False
+            self.assertFalse(ip_lib.device_exists('eth0'))
+
+    def test_device_exists_namespace(self):
         with mock.patch.object(ip_lib.IPDevice, '_execute') as _execute:
             _execute.return_value = LINK_SAMPLE[1]
-            self.assertTrue(ip_lib.device_exists('eth0'))
-            _execute.assert_called_once_with('o', 'link', ('show', 'eth0'))
+            self.assertTrue(ip_lib.device_exists('eth0', 'sudo', 'ns'))
+            _execute.assert_called_once_with('o', 'link', ('show', 'eth0'),
+                                             'sudo', 'ns')
 
-    def test_device_does_not_exist(self):
+    def test_device_does_not_exist_namespace(self):
         with mock.patch.object(ip_lib.IPDevice, '_execute') as _execute:
             _execute.return_value = ''
             _execute.side_effect = RuntimeError
-            self.assertFalse(ip_lib.device_exists('eth0'))
+            self.assertFalse(ip_lib.device_exists('eth0', 'sudo', 'ns'))
+
+
+class TestIpBatch(unittest.TestCase):
+    def setUp(self):
+        self.execute_p = mock.patch('quantum.agent.linux.utils.execute')
+        self.execute = self.execute_p.start()
+
+    def tearDown(self):
+        self.execute_p.stop()
+
+    def test_batch_single_execute(self):
+        device = ip_lib.IPDevice('tap0', 'sudo')
+        with device.batch():
+            device.link.set_up()
+            device.addr.add(4, '192.168.1.2/24', '192.168.1.255')
+            device.addr.delete(4, '172.16.77.240/24')
+            self.assertFalse(self.execute.called)
+        self.execute.assert_called_once_with(
+            ['ip', '-batch', '-'], root_helper='sudo',
+            process_input='link set tap0 up\n'
+                          'addr add 192.168.1.2/24 brd 192.168.1.255 '
+                          'scope global dev tap0\n'
+                          'addr del 172.16.77.240/24 dev tap0\n')
+
+    def test_batch_namespace(self):
+        ip = ip_lib.IPWrapper('sudo', 'ns')
+        with ip.batch():
+            ip.device('lo').link.set_up()
+            ip.device('tap0').link.set_up()
+        self.execute.assert_called_once_with(
+            ['ip', 'netns', 'exec', 'ns', 'ip', '-batch', '-'],
+            root_helper='sudo',
+            process_input='link set lo up\nlink set tap0 up\n')
+
+    def test_batch_not_kept_by_devices(self):
+        ip = ip_lib.IPWrapper('sudo')
+        with ip.batch():
+            device = ip.device('tap0')
+            device.link.set_up()
+        self.execute.reset_mock()
+        device.link.set_down()
+        self.execute.assert_called_once_with(
+            ['ip', 'link', 'set', 'tap0', 'down'], root_helper='sudo')
+
+    def test_batch_empty(self):
+        with ip_lib.IPDevice('tap0', 'sudo').batch():
+            pass
+        self.assertFalse(self.execute.called)
+
+    def test_batch_flushed_before_read(self):
+        self.execute.return_value = ''
+        device = ip_lib.IPDevice('tap0', 'sudo', 'ns')
+        with device.batch():
+            device.link.set_up()
+            device.addr.list()
+            self.assertEqual(self.execute.call_count, 2)
+        self.execute.assert_has_calls(
+            [mock.call(['ip', 'netns', 'exec', 'ns', 'ip', '-batch', '-'],
+                       root_helper='sudo', process_input='link set tap0 up\n'),
+             mock.call(['ip', 'netns', 'exec', 'ns', 'ip', 'addr', 'show',
+                        'tap0'], root_helper='sudo')])
+
+    def test_batch_other_namespace_not_queued(self):
+        device = ip_lib.IPDevice('tap0', 'sudo')
+        with device.batch():
+            device.link.set_address('aa:bb:cc:dd:ee:ff')
+            device.link.set_netns('ns')
+            device.link.set_up()
+        self.execute.assert_has_calls(
+            [mock.call(['ip', '-batch', '-'], root_helper='sudo',
+                       process_input='link set tap0 address '
+                                     'aa:bb:cc:dd:ee:ff\n'
+                                     'link set tap0 netns ns\n'),
+             mock.call(['ip', 'netns', 'exec', 'ns', 'ip', 'link', 'set',
+                        'tap0', 'up'], root_helper='sudo')])
+
+    def test_batch_discarded_on_error(self):
+        device = ip_lib.IPDevice('tap0', 'sudo')
+        try:
+            with device.batch():
+                device.link.set_up()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(self.execute.called)
+        self.assertIsNone(device._batch)
+
+    def test_batch_no_root_helper(self):
+        def use_batch():
+            with ip_lib.IPDevice('tap0').batch():
+                pass
+        self.assertRaises(exceptions.SudoRequired, use_batch)
@@ -0,0 +1,57 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging as std_logging
+
+import mock
+import unittest2 as unittest
+
+from quantum.openstack.common import log as logging
+
+
+class TestDeferredLogging(unittest.TestCase):
+    def setUp(self):
+        self.log = logging.getLogger('quantum.tests.unit.test_log')
+        self.logger = self.log.logger
+        self.level = self.logger.level
+        self.addCleanup(self.logger.setLevel, self.level)
+        self.handler = mock.Mock(level=std_logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.render = mock.Mock(return_value='rendered')
+
+    def test_debug_disabled(self):
+        self.logger.setLevel(std_logging.INFO)
+        with mock.patch.object(self.log, 'process') as process:
+            self.log.debug('%s', logging.DeferredArg(self.render, 1, a=2))
+            self.assertFalse(process.called)
+        self.assertFalse(self.render.called)
+        self.assertFalse(self.handler.handle.called)
+
+    def test_debug_enabled(self):
+        self.logger.setLevel(std_logging.DEBUG)
+        arg = logging.DeferredArg(self.render, 1, a=2)
+        self.log.debug('%s %r', arg, arg)
+        record = self.handler.handle.call_args[0][0]
+        self.assertEqual(record.getMessage(), "rendered 'rendered'")
+        self.render.assert_called_once_with(1, a=2)
+
+    def test_log_disabled_level(self):
+        self.logger.setLevel(std_logging.WARNING)
+        self.log.log(std_logging.INFO, '%s', logging.DeferredArg(self.render))
+        self.assertFalse(self.render.called)
+        self.assertFalse(self.handler.handle.called)
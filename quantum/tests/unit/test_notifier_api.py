@@ -0,0 +1,109 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+import unittest2 as unittest
+
+from quantum.openstack.common import cfg
+from quantum.openstack.common.notifier import api as notifier_api
+from quantum.openstack.common.notifier import test_notifier
+
+
+class TestNotifierQueue(unittest.TestCase):
+    def setUp(self):
+        cfg.CONF.set_override('notification_driver', [test_notifier.__name__])
+        cfg.CONF.set_override('notification_queue_size', 2)
+        notifier_api._reset_drivers()
+        notifier_api._reset_queue()
+        del test_notifier.NOTIFICATIONS[:]
+        self.addCleanup(cfg.CONF.reset)
+        self.addCleanup(notifier_api._reset_drivers)
+        self.addCleanup(notifier_api._reset_queue)
+        self.spawn_n_p = mock.patch.object(notifier_api.eventlet, 'spawn_n')
+        self.spawn_n = self.spawn_n_p.start()
+        self.addCleanup(self.spawn_n_p.stop)
+
+    def _notify(self, event_type):
+        notifier_api.notify(None, 'publisher', event_type, notifier_api.INFO,
+                            {})
+
+    def _send_queued(self):
+        # Run the sending loop until it waits for notifications again
+        eventlet.spawn(*self.spawn_n.call_args[0])
+        eventlet.sleep(0)
+
+    def _sent_event_types(self):
+        return [msg['event_type'] for msg in test_notifier.NOTIFICATIONS]
+
+    def test_notify_synchronous(self):
+        cfg.CONF.set_override('notification_queue_size', 0)
+        self._notify('a')
+        self.assertEqual(self._sent_event_types(), ['a'])
+        self.assertFalse(self.spawn_n.called)
+
+    def test_notify_queued(self):
+        self._notify('a')
+        self._notify('b')
+        self.assertEqual(self.spawn_n.call_count, 1)
+        self.assertEqual(test_notifier.NOTIFICATIONS, [])
+
+        self._send_queued()
+        self.assertEqual(self._sent_event_types(), ['a', 'b'])
+        self.assertEqual(notifier_api.get_stats(),
+                         dict(queued=2, sent=2, failed=0, dropped=0))
+
+    def test_notify_failed(self):
+        self._notify('a')
+        self._notify('b')
+        with mock.patch.object(test_notifier, 'notify',
+                               side_effect=[Exception(), None]):
+            self._send_queued()
+        self.assertEqual(notifier_api.get_stats(),
+                         dict(queued=2, sent=1, failed=1, dropped=0))
+
+    def test_notify_drop_newest(self):
+        for event_type in 'abc':
+            self._notify(event_type)
+        self._send_queued()
+        self.assertEqual(self._sent_event_types(), ['a', 'b'])
+        self.assertEqual(notifier_api.get_stats(),
+                         dict(queued=2, sent=2, failed=0, dropped=1))
+
+    def test_notify_drop_oldest(self):
+        cfg.CONF.set_override('notification_overflow_policy', 'drop_oldest')
+        for event_type in 'abc':
+            self._notify(event_type)
+        self._send_queued()
+        self.assertEqual(self._sent_event_types(), ['b', 'c'])
+        self.assertEqual(notifier_api.get_stats(),
+                         dict(queued=3, sent=2, failed=0, dropped=1))
+
+    def test_notify_invalid_overflow_policy(self):
+        cfg.CONF.set_override('notification_overflow_policy', 'invalid')
+        with mock.patch.object(notifier_api.LOG, 'error') as log:
+            for event_type in 'abc':
+                self._notify(event_type)
+            self.assertTrue(log.called)
+        self.assertEqual(notifier_api.get_stats()['dropped'], 1)
+
+    def test_flush(self):
+        self.spawn_n_p.stop()
+        self.addCleanup(self.spawn_n_p.start)
+        self._notify('a')
+        notifier_api.flush()
+        self.assertEqual(self._sent_event_types(), ['a'])
@@ -0,0 +1,240 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+import types
+
+import mock
+import unittest2 as unittest
+
+from quantum.openstack.common import importutils
+from quantum.openstack.common.rpc import common as rpc_common
+
+
+class FakeZMQError(Exception):
+    pass
+
+
+def _import_impl_zmq():
+    """Import impl_zmq, with stand-ins for the modules it cannot import.
+
+    The tests replace the ZeroMQ sockets, so impl_zmq only needs the zmq
+    constants and exception when pyzmq is not installed.
+    """
+    import quantum.openstack.common as common_pkg
+
+    fakes = {}
+    if importutils.try_import('eventlet.green.zmq') is None:
+        fake_zmq = types.ModuleType('eventlet.green.zmq')
+        fake_zmq.ZMQError = FakeZMQError
+        for i, name in enumerate(('PUSH', 'PULL', 'PUB', 'SUB',
+                                  'SUBSCRIBE', 'UNSUBSCRIBE')):
+            setattr(fake_zmq, name, i)
+        fakes['eventlet.green.zmq'] = fake_zmq
+    if importutils.try_import(common_pkg.__name__ + '.processutils') is None:
+        fakes[common_pkg.__name__ + '.processutils'] = types.ModuleType(
+            common_pkg.__name__ + '.processutils')
+
+    sys.modules.update(fakes)
+    patchers = [mock.patch.object(common_pkg, 'processutils', create=True,
+                                  new=fakes[name])
+                for name in fakes if name.endswith('.processutils')]
+    for patcher in patchers:
+        patcher.start()
+    try:
+        from quantum.openstack.common.rpc import impl_zmq
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+        for name in fakes:
+            del sys.modules[name]
+    return impl_zmq
+
+
+impl_zmq = _import_impl_zmq()
+
+
+class TestZmqReplyProxy(unittest.TestCase):
+    def setUp(self):
+        self.sock_cls_p = mock.patch.object(impl_zmq, 'ZmqSocket')
+        self.sock = self.sock_cls_p.start().return_value
+        self.addCleanup(self.sock_cls_p.stop)
+        self.sock.sock.closed = False
+        self.spawn_p = mock.patch.object(impl_zmq.eventlet, 'spawn')
+        self.spawn_p.start()
+        self.addCleanup(self.spawn_p.stop)
+        self.sleep_p = mock.patch.object(impl_zmq.eventlet, 'sleep')
+        self.sleep = self.sleep_p.start()
+        self.addCleanup(self.sleep_p.stop)
+        self.proxy = impl_zmq.ZmqReplyProxy()
+
+    def _recv(self, *results):
+        results = list(results)
+
+        def recv():
+            if not results:
+                # Stop the receiving loop
+                self.sock.sock.closed = True
+                raise impl_zmq.zmq.ZMQError()
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        self.sock.recv.side_effect = recv
+
+    def test_receive_routes_replies(self):
+        waiter1 = self.proxy.register('msg-1')
+        waiter2 = self.proxy.register('msg-2')
+        self._recv(['msg-2', 'reply2'], ['msg-0', 'unknown'],
+                   ['msg-1', 'reply1'])
+        self.proxy._receive()
+        self.assertEqual(waiter1.get_nowait(), ['msg-1', 'reply1'])
+        self.assertEqual(waiter2.get_nowait(), ['msg-2', 'reply2'])
+        self.assertTrue(waiter1.empty())
+        self.assertTrue(waiter2.empty())
+
+    def test_unregister(self):
+        self.proxy.register('msg-1')
+        self.proxy.unregister('msg-1')
+        self.sock.subscribe.assert_called_once_with('msg-1')
+        self.sock.unsubscribe.assert_called_once_with('msg-1')
+        self.assertEqual(self.proxy.waiters, {})
+
+    def test_receive_stops_when_closed(self):
+        self._recv()
+        self.proxy._receive()
+        self.assertFalse(self.sleep.called)
+
+    def test_receive_backs_off_on_errors(self):
+        waiter = self.proxy.register('msg-1')
+        error = impl_zmq.zmq.ZMQError()
+        self._recv(error, error, error, ['msg-1', 'reply'], error)
+        self.proxy._receive()
+        self.assertEqual([call[0][0] for call in self.sleep.call_args_list],
+                         [0.1, 0.2, 0.4, 0.1])
+        self.assertEqual(waiter.get_nowait(), ['msg-1', 'reply'])
+
+
+class TestZmqOutboundClients(unittest.TestCase):
+    def setUp(self):
+        self.client_cls_p = mock.patch.object(impl_zmq, 'ZmqClient')
+        self.client_cls = self.client_cls_p.start()
+        self.addCleanup(self.client_cls_p.stop)
+        self.client_cls.side_effect = lambda addr: mock.Mock(addr=addr)
+        self.clients_p = mock.patch.object(impl_zmq, 'outbound_clients',
+                                           new={})
+        self.clients_p.start()
+        self.addCleanup(self.clients_p.stop)
+
+    def _cast(self, addr='tcp://host1:9501'):
+        impl_zmq._cast(addr, rpc_common.CommonRpcContext(), 'msg-id',
+                       'topic', {'method': 'm'}, timeout=10)
+
+    def test_client_reused(self):
+        self._cast()
+        self._cast()
+        self._cast('tcp://host2:9501')
+        self.assertEqual(self.client_cls.call_count, 2)
+        client = impl_zmq.outbound_clients['tcp://host1:9501']
+        self.assertEqual(client.cast.call_count, 2)
+
+    def test_client_evicted_on_socket_error(self):
+        self._cast()
+        client = impl_zmq.outbound_clients['tcp://host1:9501']
+        client.cast.side_effect = impl_zmq.zmq.ZMQError()
+        self.assertRaises(rpc_common.RPCException, self._cast)
+        client.close.assert_called_once_with()
+        self.assertEqual(impl_zmq.outbound_clients, {})
+
+        self._cast()
+        self.assertEqual(self.client_cls.call_count, 2)
+
+    def test_client_evicted_on_timeout(self):
+        self._cast()
+        client = impl_zmq.outbound_clients['tcp://host1:9501']
+        client.cast.side_effect = rpc_common.Timeout()
+        self.assertRaises(rpc_common.Timeout, self._cast)
+        client.close.assert_called_once_with()
+        self.assertEqual(impl_zmq.outbound_clients, {})
+
+    def test_cleanup_closes_clients(self):
+        self._cast()
+        self._cast('tcp://host2:9501')
+        clients = impl_zmq.outbound_clients.values()
+        impl_zmq.cleanup()
+        for client in clients:
+            client.close.assert_called_once_with()
+        self.assertEqual(impl_zmq.outbound_clients, {})
+
+
+class TestZmqMultiSend(unittest.TestCase):
+    def setUp(self):
+        self.matchmaker_p = mock.patch.object(impl_zmq, '_get_matchmaker')
+        self.matchmaker = self.matchmaker_p.start().return_value
+        self.addCleanup(self.matchmaker_p.stop)
+        self.matchmaker.queues.return_value = [('topic.host1', 'host1'),
+                                               ('topic.host2', 'host2'),
+                                               ('topic.host3', 'host3')]
+        # Run the casts to the peers inline
+        self.spawn_n_p = mock.patch.object(
+            impl_zmq.eventlet, 'spawn_n',
+            side_effect=lambda func, *args: func(*args))
+        self.spawn_n = self.spawn_n_p.start()
+        self.addCleanup(self.spawn_n_p.stop)
+        self.counters_p = mock.patch.dict(impl_zmq.delivery_counters,
+                                          sent=0, failed=0, timeout=0)
+        self.counters_p.start()
+        self.addCleanup(self.counters_p.stop)
+        self.cast = impl_zmq._cast
+
+    def _multi_send(self):
+        impl_zmq._multi_send(self.cast, {}, 'topic', {'method': 'm'})
+
+    def test_cast_sent_to_each_peer_once(self):
+        with mock.patch.object(impl_zmq, '_cast_to_peer') as cast_to_peer:
+            self._multi_send()
+        self.assertEqual(
+            [call[0][:3] for call in cast_to_peer.call_args_list],
+            [('tcp://host1:9501', {}, 'topic.host1'),
+             ('tcp://host2:9501', {}, 'topic.host2'),
+             ('tcp://host3:9501', {}, 'topic.host3')])
+        self.assertEqual(self.spawn_n.call_count, 3)
+
+    def test_failing_peer_does_not_stop_others(self):
+        with mock.patch.object(impl_zmq, '_cast',
+                               side_effect=[rpc_common.RPCException(),
+                                            rpc_common.Timeout(),
+                                            None]) as cast:
+            self._multi_send()
+        self.assertEqual([call[0][0] for call in cast.call_args_list],
+                         ['tcp://host1:9501', 'tcp://host2:9501',
+                          'tcp://host3:9501'])
+        self.assertEqual(impl_zmq.delivery_counters,
+                         dict(sent=1, failed=1, timeout=1))
+
+    def test_counters(self):
+        with mock.patch.object(impl_zmq, '_cast'):
+            self._multi_send()
+            self._multi_send()
+        self.assertEqual(impl_zmq.delivery_counters,
+                         dict(sent=6, failed=0, timeout=0))
+
+    def test_no_matchmaker_results(self):
+        self.matchmaker.queues.return_value = []
+        with mock.patch.object(impl_zmq, '_cast_to_peer') as cast_to_peer:
+            self.assertRaises(rpc_common.Timeout, self._multi_send)
+        self.assertFalse(cast_to_peer.called)
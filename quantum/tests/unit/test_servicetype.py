@@ -450,6 +450,96 @@ class ServiceTypeManagerTestCase(ServiceTypeTestCaseBase):
             self.assertEquals(res.status_int, webexc.HTTPConflict.code)
             mgr.decrease_service_type_refcount(ctx, svc_type_data['id'])
 
+    def test_get_service_type_cached(self):
+        with self.service_type() as svc_type:
+            svc_type_id = svc_type[self.resource_name]['id']
+            mgr = servicetype_db.ServiceTypeManager.get_instance()
+            ctx = context.Context('', '', is_admin=True)
+            mgr.get_service_type(ctx, svc_type_id)
+            with mock.patch.object(ctx.session, 'query') as query:
+                res = mgr.get_service_type(ctx, svc_type_id, fields=['id'])
+                self.assertEqual({'id': svc_type_id}, res)
+                res = mgr.get_default_service_type(ctx, fields=['name'])
+                self.assertEqual({'name': servicetype_db.DEFAULT_SVCTYPE_NAME},
+                                 res)
+                self.assertFalse(query.called)
+
+    def test_service_type_cache_invalidated_on_update(self):
+        with self.service_type() as svc_type:
+            svc_type_id = svc_type[self.resource_name]['id']
+            mgr = servicetype_db.ServiceTypeManager.get_instance()
+            ctx = context.Context('', '', is_admin=True)
+            self.assertEqual('svc_type',
+                             mgr.get_service_type(ctx, svc_type_id)['name'])
+            self._update_service_type(svc_type_id, 'svc_type_new', None)
+            self.assertEqual('svc_type_new',
+                             mgr.get_service_type(ctx, svc_type_id)['name'])
+        self.assertRaises(servicetype_db.ServiceTypeNotFound,
+                          mgr.get_service_type, ctx, svc_type_id)
+
+    def test_service_type_cache_expires(self):
+        with self.service_type() as svc_type:
+            svc_type_id = svc_type[self.resource_name]['id']
+            mgr = servicetype_db.ServiceTypeManager.get_instance()
+            ctx = context.Context('', '', is_admin=True)
+            with mock.patch.object(servicetype_db.time, 'time') as now:
+                now.return_value = 1000
+                mgr.get_service_type(ctx, svc_type_id)
+                # Changed through another server
+                ctx.session.query(servicetype_db.ServiceType).filter_by(
+                    id=svc_type_id).update({'name': 'svc_type_new'})
+                now.return_value = 1029
+                self.assertEqual('svc_type', mgr.get_service_type(
+                    ctx, svc_type_id)['name'])
+                now.return_value = 1030
+                self.assertEqual('svc_type_new', mgr.get_service_type(
+                    ctx, svc_type_id)['name'])
+
+    def test_service_type_cache_miss_reload_rate_limited(self):
+        mgr = servicetype_db.ServiceTypeManager.get_instance()
+        ctx = context.Context('', '', is_admin=True)
+        with mock.patch.object(servicetype_db.time, 'time') as now:
+            now.return_value = 1000
+            mgr.get_default_service_type(ctx)
+            with mock.patch.object(ctx.session, 'query') as query:
+                self.assertRaises(servicetype_db.ServiceTypeNotFound,
+                                  mgr.get_service_type, ctx, 'no-such-id')
+                self.assertFalse(query.called)
+            now.return_value = 1001
+            with mock.patch.object(ctx.session, 'query',
+                                   wraps=ctx.session.query) as query:
+                self.assertRaises(servicetype_db.ServiceTypeNotFound,
+                                  mgr.get_service_type, ctx, 'no-such-id')
+                self.assertEqual(1, query.call_count)
+
+    def test_service_type_refcount_missing_service_type(self):
+        mgr = servicetype_db.ServiceTypeManager.get_instance()
+        ctx = context.Context('', '', is_admin=True)
+        self.assertRaises(servicetype_db.ServiceTypeNotFound,
+                          mgr.increase_service_type_refcount,
+                          ctx, 'no-such-id')
+        self.assertRaises(servicetype_db.ServiceTypeNotFound,
+                          mgr.decrease_service_type_refcount,
+                          ctx, 'no-such-id')
+
+    def test_decrease_service_type_refcount_stops_at_zero(self):
+        with self.service_type() as svc_type:
+            svc_type_id = svc_type[self.resource_name]['id']
+            mgr = servicetype_db.ServiceTypeManager.get_instance()
+            ctx = context.Context('', '', is_admin=True)
+            self.assertEqual(
+                1, mgr.increase_service_type_refcount(ctx, svc_type_id))
+            self.assertEqual(
+                2, mgr.increase_service_type_refcount(ctx, svc_type_id))
+            self.assertEqual(2, mgr.get_service_type(
+                ctx, svc_type_id)['num_instances'])
+            self.assertEqual(
+                [1, 0, None],
+                [mgr.decrease_service_type_refcount(ctx, svc_type_id)
+                 for i in range(3)])
+            self.assertEqual(0, mgr.get_service_type(
+                ctx, svc_type_id)['num_instances'])
+
     def test_create_dummy_increases_service_type_refcount(self):
         dummy = self._create_dummy()
         svc_type_res = self._show_service_type(dummy['service_type'])
@@ -0,0 +1,62 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+
+import mock
+
+from quantum import context
+from quantum.db import models_v2
+from quantum.manager import QuantumManager
+from quantum.tests.unit import test_db_plugin
+from quantum import usage_audit
+
+
+class UsageAuditTestCase(test_db_plugin.QuantumDbPluginV2TestCase):
+    def _get_chunks(self, chunk_size):
+        plugin = QuantumManager.get_plugin()
+        with mock.patch.object(plugin, 'get_networks',
+                               wraps=plugin.get_networks) as get_networks:
+            chunks = list(usage_audit.get_chunks(
+                context.get_admin_context(), models_v2.Network,
+                get_networks, chunk_size))
+        return chunks, get_networks
+
+    def test_get_chunks(self):
+        with contextlib.nested(self.network(), self.network(),
+                               self.network()) as nets:
+            ids = sorted(net['network']['id'] for net in nets)
+            chunks, get_networks = self._get_chunks(2)
+
+            self.assertEqual([[net['id'] for net in chunk]
+                              for chunk in chunks],
+                             [ids[:2], ids[2:]])
+            self.assertEqual(get_networks.call_count, 2)
+            for call in get_networks.call_args_list:
+                self.assertIn('filters', call[1])
+
+    def test_get_chunks_exact_multiple(self):
+        with contextlib.nested(self.network(), self.network()) as nets:
+            ids = sorted(net['network']['id'] for net in nets)
+            chunks, get_networks = self._get_chunks(1)
+
+            self.assertEqual([[net['id'] for net in chunk]
+                              for chunk in chunks],
+                             [ids[:1], ids[1:]])
+
+    def test_get_chunks_empty(self):
+        chunks, get_networks = self._get_chunks(2)
+        self.assertEqual(chunks, [])
+        self.assertFalse(get_networks.called)
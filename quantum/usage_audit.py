@@ -0,0 +1,93 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2012 New Dream Network, LLC (DreamHost)
+# Author: Julien Danjou <julien@danjou.info>
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Cron script to generate usage notifications for networks, ports and
+subnets.
+
+"""
+
+from quantum.common import config
+from quantum import context
+from quantum.db import l3_db
+from quantum.db import models_v2
+from quantum import manager
+from quantum.openstack.common import cfg
+from quantum.openstack.common.notifier import api as notifier_api
+
+audit_opts = [
+    cfg.IntOpt('audit_chunk_size', default=500,
+               help=_('Number of resources retrieved from the plugin at '
+                      'once.')),
+    cfg.BoolOpt('audit_batch_notifications', default=False,
+                help=_('Send a single <resource>.exists notification for '
+                       'each chunk of resources, with the resources listed '
+                       'under the plural resource name, instead of one '
+                       'notification per resource.')),
+]
+
+
+def get_chunks(context, model, get_resources, chunk_size):
+    """Yield the resources returned by get_resources by chunks ordered by id.
+
+    The ids of each chunk are read from the model table, starting after the
+    last id of the previous chunk, so only one chunk is held in memory.
+    """
+    query = context.session.query(model.id).order_by(model.id)
+    last_id = None
+    while True:
+        chunk_query = query
+        if last_id is not None:
+            chunk_query = query.filter(model.id > last_id)
+        ids = [row.id for row in chunk_query.limit(chunk_size)]
+        if not ids:
+            return
+        resources = get_resources(context, filters={'id': ids})
+        yield sorted(resources, key=lambda resource: resource['id'])
+        if len(ids) < chunk_size:
+            return
+        last_id = ids[-1]
+
+
+def audit(context, resource, model, get_resources):
+    publisher_id = notifier_api.publisher_id('network')
+    event_type = '%s.exists' % resource
+    for chunk in get_chunks(context, model, get_resources,
+                            cfg.CONF.audit_chunk_size):
+        if cfg.CONF.audit_batch_notifications:
+            notifier_api.notify(context, publisher_id, event_type,
+                                notifier_api.INFO,
+                                {'%ss' % resource: chunk})
+            continue
+        for item in chunk:
+            notifier_api.notify(context, publisher_id, event_type,
+                                notifier_api.INFO, {resource: item})
+
+
+def main():
+    cfg.CONF.register_cli_opts(audit_opts)
+    cfg.CONF(project='quantum')
+    config.setup_logging(cfg.CONF)
+
+    admin_context = context.get_admin_context()
+    plugin = manager.QuantumManager.get_plugin()
+    audit(admin_context, 'network', models_v2.Network, plugin.get_networks)
+    audit(admin_context, 'subnet', models_v2.Subnet, plugin.get_subnets)
+    audit(admin_context, 'port', models_v2.Port, plugin.get_ports)
+    audit(admin_context, 'router', l3_db.Router, plugin.get_routers)
+    audit(admin_context, 'floatingip', l3_db.FloatingIP,
+          plugin.get_floatingips)
+    notifier_api.flush()
@@ -63,6 +63,7 @@ if sys.platform == 'win32':
         'quantum.plugins.hyperv.agent.hyperv_quantum_agent:main',
         'quantum-server = quantum.server:main',
         'quantum-db-manage = quantum.db.migration.cli:main',
+        'quantum-usage-audit = quantum.usage_audit:main',
     ]
 
     ProjectScripts = []
@@ -129,6 +130,7 @@ else:
         'quantum-debug = quantum.debug.shell:main',
         'quantum-ovs-cleanup = quantum.agent.ovs_cleanup_util:main',
         'quantum-db-manage = quantum.db.migration.cli:main',
+        'quantum-usage-audit = quantum.usage_audit:main',
     ]
 
     ProjectScripts = [